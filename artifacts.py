@@ -0,0 +1,111 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import streamlit as st
+
+from render_cache import RenderCache
+from storage import DATA_DIR
+
+# -----------------------
+# Ablage erzeugter Dateien
+# -----------------------
+#
+# Ein Klick auf st.download_button löst einen Rerun aus; alles, was nur im
+# `if st.button(...)`-Zweig existierte, ist danach weg. Erzeugte ZIP/DOCX-
+# Dateien werden deshalb unter einer Job-ID abgelegt: kleine direkt in
+# st.session_state, große auf der Festplatte (prozessweiter LRU-Speicher).
+# Die Download-Buttons werden bei jedem Lauf aus dieser Ablage gezeichnet.
+
+SESSION_KEY = "artifacts"
+
+# Bis zu dieser Größe bleiben Dateien in st.session_state
+INLINE_MAX_BYTES = 2 * 1024 * 1024
+
+# Grenzen pro Sitzung (Anzahl und Bytes im Speicher) und für die Festplatte (alle Sitzungen)
+SESSION_MAX_ITEMS = 10
+SESSION_MAX_BYTES = 16 * 1024 * 1024
+DISK_MAX_BYTES = 512 * 1024 * 1024
+
+_disk_store = None
+_disk_lock = threading.Lock()
+
+
+def disk_store():
+    global _disk_store
+    with _disk_lock:
+        if _disk_store is None:
+            _disk_store = RenderCache(os.path.join(DATA_DIR, "artifacts"), max_bytes=DISK_MAX_BYTES)
+        return _disk_store
+
+
+def _session_artifacts():
+    if SESSION_KEY not in st.session_state:
+        st.session_state[SESSION_KEY] = OrderedDict()
+    return st.session_state[SESSION_KEY]
+
+
+def _evict(artifacts):
+    inline_bytes = sum(len(a["data"]) for a in artifacts.values() if a["data"] is not None)
+    while artifacts and (len(artifacts) > SESSION_MAX_ITEMS or inline_bytes > SESSION_MAX_BYTES):
+        _, oldest = artifacts.popitem(last=False)
+        if oldest["data"] is not None:
+            inline_bytes -= len(oldest["data"])
+
+
+def save_artifact(data, file_name, mime, label, job_id=None):
+    """Legt eine erzeugte Datei ab und gibt ihre Job-ID zurück."""
+    job_id = job_id or uuid.uuid4().hex[:12]
+    artifact = {
+        "job_id": job_id,
+        "file_name": file_name,
+        "mime": mime,
+        "label": label,
+        "size": len(data),
+        "created_at": time.time(),
+        "data": None,
+    }
+    if len(data) <= INLINE_MAX_BYTES:
+        artifact["data"] = data
+    else:
+        disk_store().put(job_id, data)
+
+    artifacts = _session_artifacts()
+    artifacts[job_id] = artifact
+    artifacts.move_to_end(job_id)
+    _evict(artifacts)
+    return job_id
+
+
+def load_artifact(artifact):
+    """Bytes einer abgelegten Datei oder None, falls sie inzwischen verdrängt wurde."""
+    if artifact["data"] is not None:
+        return artifact["data"]
+    return disk_store().get(artifact["job_id"])
+
+
+def show_download_buttons(title=None):
+    """Zeichnet für jede noch vorhandene Datei dieser Sitzung einen Download-Button (neueste zuerst)."""
+    artifacts = _session_artifacts()
+    available = []
+    for artifact in reversed(list(artifacts.values())):
+        data = load_artifact(artifact)
+        if data is None:
+            artifacts.pop(artifact["job_id"], None)
+        else:
+            available.append((artifact, data))
+    if not available:
+        return
+    if title:
+        st.subheader(title)
+    for artifact, data in available:
+        created = time.strftime("%H:%M:%S", time.localtime(artifact["created_at"]))
+        st.download_button(
+            label=f"{artifact['label']} ({created}, {artifact['size'] / 1024:.0f} KB)",
+            data=data,
+            file_name=artifact["file_name"],
+            mime=artifact["mime"],
+            key=f"download_{artifact['job_id']}"
+        )
@@ -0,0 +1,160 @@
+"""Arbeitsblätter ohne Streamlit in großer Zahl erzeugen (z. B. zum Schuljahresbeginn).
+
+    python batch_generate.py --variant tough --sets 2000 --output sets/
+    python batch_generate.py --variant standard --sets 500 --seed 42 --output sets.zip
+
+Verwendet dieselben Generatoren und Dokumentfunktionen wie die Apps (v1.py für
+"standard", streamlit_app.py für "tough") und verteilt die Sätze auf alle
+CPU-Kerne. Jeder Satz wird aus (Seed, Satznummer) erzeugt; mit gleichem --seed
+ergibt sich unabhängig von --workers dieselbe Ausgabe. Ohne --seed wird ein
+zufälliger Seed gewählt und ausgegeben.
+
+Mit --unique kommt jede Aufgabe im ganzen Lauf nur einmal vor, soweit der
+Wertebereich der Generatoren reicht. Bei "tough" sind die Parameterräume
+beschrieben (problem_space.py): jeder Satz zieht seine eigenen Positionen
+derselben Permutationen, ohne Abstimmung und weiter reproduzierbar. Bei
+"standard" teilen sich die Prozesse einen Eindeutigkeits-Index im Shared
+Memory (problem_pool.py) und ziehen Wiederholungen neu; welcher Satz eine
+Aufgabe zuerst erhält, hängt dann von der Reihenfolge der Prozesse ab, und
+die Ausgabe ist nur mit --workers 1 reproduzierbar.
+"""
+import argparse
+import importlib
+import multiprocessing
+import os
+import random
+import sys
+import time
+import zipfile
+
+import docx_writer
+import problem_pool
+import problem_space
+
+# Variante -> (Modul, Dateiname je Satz wie in der App)
+VARIANTS = {
+    "standard": ("v1", "Matheaufgaben_Set_{}.docx"),
+    "tough": ("streamlit_app", "Matheaufgaben_Set_SCHWER_{}.docx"),
+}
+
+def load_variant(variant):
+    """Modul der Variante; nach dem ersten Aufruf aus sys.modules."""
+    return importlib.import_module(VARIANTS[variant][0])
+
+
+def start_unique_run(variant, num_sets, start, num_problems):
+    """Bereitet einen Lauf ohne Wiederholungen vor; gibt (unique für generate_problems, Pool zum Freigeben oder None) zurück."""
+    if problem_space.described(load_variant(variant).GENERATORS):
+        return (None, num_sets, start), None
+    pool = problem_pool.SharedProblemPool.create(num_sets * num_problems)
+    return (pool.name, num_sets, start), pool
+
+
+def generate_problems(variant, seed, index, num_problems=50, unique=None):
+    """Aufgaben von Satz `index` der Variante; mit unique (siehe start_unique_run) ohne Wiederholungen im Lauf."""
+    module = load_variant(variant)
+    problem_space.seed_set(seed, index)
+    if unique is None:
+        return module.create_single_problem_set(num_problems=num_problems)
+    pool_name, num_sets, start = unique
+    if pool_name is None:
+        sampler = problem_space.Sampler(module.GENERATORS, seed, stride=num_sets, offset=index - start)
+        return module.create_single_problem_set(num_problems=num_problems, generators=sampler.generators())
+    with problem_pool.SharedProblemPool.attach(pool_name) as pool:
+        generators = [pool.unique(generator, i) for i, generator in enumerate(module.GENERATORS)]
+        return module.create_single_problem_set(num_problems=num_problems, generators=generators)
+
+
+def render_set(variant, seed, index, num_problems=50, fast=True, unique=None):
+    """Erzeugt Satz `index` der Variante als DOCX-Bytes."""
+    module = load_variant(variant)
+    problems = generate_problems(variant, seed, index, num_problems, unique)
+    return module.create_word_document(problems, index, fast=fast)
+
+
+def _init_worker(variant):
+    # Modul einmal pro Prozess laden, nicht beim ersten Satz
+    load_variant(variant)
+
+
+def _render_task(task):
+    variant, seed, index, num_problems, fast, unique = task
+    return index, render_set(variant, seed, index, num_problems, fast, unique)
+
+
+class DirectoryWriter:
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def write(self, name, data):
+        with open(os.path.join(self.path, name), "wb") as f:
+            f.write(data)
+
+    def close(self):
+        pass
+
+
+class ZipWriter:
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # DOCX-Dateien sind bereits komprimiert; erneutes Deflate kostet nur Zeit
+        self.zf = zipfile.ZipFile(path, "w", zipfile.ZIP_STORED)
+
+    def write(self, name, data):
+        # Fester Zeitstempel wie in docx_writer: gleicher Seed, gleiches Archiv
+        self.zf.writestr(zipfile.ZipInfo(name, date_time=docx_writer.ZIP_DATE_TIME), data)
+
+    def close(self):
+        self.zf.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--variant", choices=sorted(VARIANTS), default="tough")
+    parser.add_argument("--sets", type=int, default=100)
+    parser.add_argument("--start", type=int, default=1, help="erste Satznummer")
+    parser.add_argument("--problems", type=int, default=50, help="Aufgaben pro Satz")
+    parser.add_argument("--seed", type=int, help="Basis-Seed (Standard: zufällig)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--python-docx", action="store_true", help="Dokumente über python-docx statt direkt als OOXML schreiben")
+    parser.add_argument("--unique", action="store_true", help="jede Aufgabe nur einmal im ganzen Lauf")
+    parser.add_argument("--output", required=True, help="Verzeichnis oder .zip-Datei")
+    args = parser.parse_args(argv)
+
+    seed = args.seed if args.seed is not None else random.SystemRandom().randrange(2 ** 32)
+    file_name = VARIANTS[args.variant][1]
+    writer = ZipWriter(args.output) if args.output.endswith(".zip") else DirectoryWriter(args.output)
+    unique, unique_pool = start_unique_run(args.variant, args.sets, args.start, args.problems) if args.unique else (None, None)
+    tasks = [
+        (args.variant, seed, index, args.problems, not args.python_docx, unique)
+        for index in range(args.start, args.start + args.sets)
+    ]
+    print(f"{args.sets} Sätze ({args.variant}), Seed {seed}, {args.workers} Prozesse -> {args.output}", file=sys.stderr)
+
+    start = time.perf_counter()
+    last_report = start
+    done = 0
+    try:
+        with multiprocessing.Pool(args.workers, initializer=_init_worker, initargs=(args.variant,)) as pool:
+            # Geordnet, damit die Einträge unabhängig von --workers in Satzreihenfolge stehen
+            for index, data in pool.imap(_render_task, tasks, chunksize=max(1, len(tasks) // (args.workers * 16))):
+                writer.write(file_name.format(index), data)
+                done += 1
+                now = time.perf_counter()
+                if now - last_report >= 1 or done == len(tasks):
+                    last_report = now
+                    print(f"\r{done}/{len(tasks)} Sätze, {done / (now - start):.0f} Sätze/s", end="", file=sys.stderr)
+        writer.close()
+        print(file=sys.stderr)
+        if unique_pool is not None:
+            stats = unique_pool.stats()
+            print(f"{stats['problems']} verschiedene Aufgaben, {stats['rejected']} Wiederholungen neu gezogen", file=sys.stderr)
+    finally:
+        if unique_pool is not None:
+            unique_pool.unlink()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
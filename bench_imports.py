@@ -0,0 +1,115 @@
+"""Import-Profil der Einstiegspunkte beim Kaltstart (python -X importtime).
+
+    python bench_imports.py                          # alle Apps
+    python bench_imports.py v11.py --repeat 5 --output bench_imports.json
+    python bench_imports.py --check                  # Exit-Code 1 bei schweren Importen
+
+Für jede App werden die Import-Anweisungen auf Modulebene in einem frischen
+Prozess mit -X importtime ausgeführt; das entspricht dem, was Streamlit vor
+dem ersten Seitenaufbau laden muss. Berichtet werden die Gesamtzeit (Median
+über --repeat Läufe), die teuersten Pakete und welche der schweren Pakete
+(groq, PyPDF2, docx, openai, google.generativeai) dabei schon geladen
+werden. Diese sollen erst beim ersten Gebrauch importiert werden; mit
+--check endet das Skript mit Exit-Code 1, wenn eine App das nicht einhält.
+"""
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+APPS = ["streamlit_app.py"] + [f"v{i}.py" for i in range(1, 12)]
+
+HEAVY = ["groq", "PyPDF2", "docx", "openai", "google.generativeai"]
+
+# Führt jede Anweisung einzeln aus, damit ein nicht installiertes Paket den Rest nicht verdeckt
+RUNNER = """
+import json, sys
+missing = []
+for statement in {statements!r}:
+    try:
+        exec(statement, {{}})
+    except ImportError as e:
+        missing.append(str(e))
+print(json.dumps({{"missing": missing, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def startup_imports(path):
+    """Quelltext aller import-Anweisungen auf oberster Ebene der Datei."""
+    with open(path, encoding="utf-8") as f:
+        source = f.read()
+    tree = ast.parse(source)
+    return [
+        ast.get_source_segment(source, node)
+        for node in tree.body
+        if isinstance(node, (ast.Import, ast.ImportFrom))
+    ]
+
+
+def parse_importtime(stderr):
+    """Zeilen 'import time: self | cumulative | name' -> Liste (name, self_us, cumulative_us, Tiefe)."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def profile(app, repeat):
+    code = RUNNER.format(statements=startup_imports(os.path.join(ROOT, app)), heavy=HEAVY)
+    totals = []
+    for _ in range(repeat):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        )
+        rows = parse_importtime(proc.stderr)
+        totals.append(sum(row[1] for row in rows))
+    state = json.loads(proc.stdout.strip().splitlines()[-1])
+    top_level = sorted((row for row in rows if row[3] == 0), key=lambda row: -row[2])
+    return {
+        "total_ms": statistics.median(totals) / 1000,
+        "modules": len(rows),
+        "top": [{"name": name, "cumulative_ms": cumulative / 1000} for name, _, cumulative, _ in top_level[:5]],
+        "heavy": state["heavy"],
+        "missing": state["missing"],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("apps", nargs="*", default=APPS)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default="bench_imports.json")
+    parser.add_argument("--check", action="store_true", help="Exit-Code 1, wenn eine App schwere Pakete beim Start lädt")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for app in args.apps:
+        result = results[app] = profile(app, args.repeat)
+        top = ", ".join(f"{t['name']} {t['cumulative_ms']:.0f}" for t in result["top"][:3])
+        heavy = ", ".join(result["heavy"]) or "-"
+        print(f"{app:17} {result['total_ms']:8.1f} ms {result['modules']:5} Module  schwer: {heavy:20} teuerste: {top}")
+        for message in result["missing"]:
+            print(f"{'':17} nicht installiert: {message}")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"python": sys.version.split()[0], "results": results}, f, indent=2)
+
+    offenders = [app for app, result in results.items() if result["heavy"]]
+    if args.check and offenders:
+        print(f"Schwere Importe beim Start: {', '.join(offenders)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,284 @@
+"""Benchmark der Lehrplan-Extraktion mit synthetischen PDF- und DOCX-Dateien.
+
+    python bench_ingestion.py                       # 10, 50, 100, 500 Seiten
+    python bench_ingestion.py --pages 10 100 --repeat 5 --output bench_ingestion.json
+
+Jede Messung läuft in einem eigenen Prozess, damit der Spitzenspeicher (RSS)
+nicht von vorherigen Läufen verfälscht wird. Die Ergebnisse landen als JSON
+in --output; mit --compare wird gegen einen früheren Lauf geprüft und bei
+einer Verlangsamung über --tolerance mit Exit-Code 1 beendet.
+"""
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import sys
+import time
+import tracemalloc
+
+import syllabus
+
+# Extraktionswege je Dateityp: Name -> Funktion(file) -> str
+MODES = {
+    "pdf": {
+        "pdf_text": syllabus.extract_text_from_pdf,
+        "pdf_normalized": lambda f: syllabus.ingest_syllabus(f, "pdf")["text"],
+    },
+    "docx": {
+        "docx_object_model": syllabus.extract_text_from_docx_object_model,
+        "docx_streaming": syllabus.extract_text_from_docx,
+        "docx_normalized": lambda f: syllabus.ingest_syllabus(f, "docx")["text"],
+    },
+}
+
+TOPICS = [
+    "Natürliche Zahlen", "Größen und Einheiten", "Geometrische Grundbegriffe",
+    "Brüche", "Daten und Zufall", "Flächeninhalt und Umfang", "Symmetrie",
+]
+WORDS = (
+    "Die Schülerinnen und Schüler beschreiben begründen vergleichen runden schätzen "
+    "berechnen Zahlen Größen Figuren Körper Achsensymmetrie Koordinaten Brüche "
+    "Diagramme Häufigkeiten Sachsituationen Lösungswege Darstellungen mathematisch"
+).split()
+
+LINES_PER_PAGE = 40
+
+
+# -----------------------
+# Synthetischer Korpus
+# -----------------------
+
+def synthetic_pages(num_pages, seed=0):
+    """Seiten als Liste von Zeilen: Kopfzeile, Überschrift, Fließtext, Tabelle, Fußzeile."""
+    rng = random.Random(seed)
+    pages = []
+    for page_no in range(1, num_pages + 1):
+        lines = ["Fachlehrplan Gymnasium Mathematik – Sachsen-Anhalt", "Stand: 01.08.2022"]
+        lines.append(f"{page_no}. {rng.choice(TOPICS)}")
+        for _ in range(LINES_PER_PAGE - 12):
+            lines.append(" ".join(rng.choice(WORDS) for _ in range(12)))
+        lines.append("Kompetenz | Inhalt | Stunden")
+        for _ in range(5):
+            lines.append(f"{rng.choice(WORDS)} | {rng.choice(TOPICS)} | {rng.randint(2, 20)}")
+        lines.append(f"Seite {page_no} von {num_pages}")
+        pages.append(lines)
+    return pages
+
+
+def _pdf_string(text):
+    escaped = text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    return "(" + escaped + ")"
+
+
+def build_pdf(pages):
+    """Minimales PDF mit einer Helvetica-Schrift (WinAnsi) und einem Textstrom pro Seite."""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # Seitenbaum, wird unten gefüllt
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    ]
+    kids = []
+    for lines in pages:
+        stream = ["BT /F1 10 Tf 14 TL 50 800 Td"]
+        stream += [f"{_pdf_string(line)} Tj T*" for line in lines]
+        stream.append("ET")
+        content = "\n".join(stream).encode("cp1252", errors="replace")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        kids.append(b"%d 0 R" % len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [" + b" ".join(kids) + b"] /Count %d >>" % len(kids)
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+
+# Textfeld wie von Word gespeichert: DrawingML (mc:Choice) und derselbe Inhalt als VML (mc:Fallback)
+TEXT_BOX_XML = """<w:r %s
+    xmlns:mc="http://schemas.openxmlformats.org/markup-compatibility/2006"
+    xmlns:wp="http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing"
+    xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main"
+    xmlns:wps="http://schemas.microsoft.com/office/word/2010/wordprocessingShape"
+    xmlns:v="urn:schemas-microsoft-com:vml">
+  <mc:AlternateContent>
+    <mc:Choice Requires="wps">
+      <w:drawing>
+        <wp:inline>
+          <wp:extent cx="2743200" cy="457200"/>
+          <wp:docPr id="%d" name="Textfeld %d"/>
+          <a:graphic>
+            <a:graphicData uri="http://schemas.microsoft.com/office/word/2010/wordprocessingShape">
+              <wps:wsp>
+                <wps:spPr><a:prstGeom prst="rect"/></wps:spPr>
+                <wps:txbx><w:txbxContent><w:p><w:r><w:t>%s</w:t></w:r></w:p></w:txbxContent></wps:txbx>
+                <wps:bodyPr/>
+              </wps:wsp>
+            </a:graphicData>
+          </a:graphic>
+        </wp:inline>
+      </w:drawing>
+    </mc:Choice>
+    <mc:Fallback>
+      <w:pict>
+        <v:shape style="width:216pt;height:36pt">
+          <v:textbox><w:txbxContent><w:p><w:r><w:t>%s</w:t></w:r></w:p></w:txbxContent></v:textbox>
+        </v:shape>
+      </w:pict>
+    </mc:Fallback>
+  </mc:AlternateContent>
+</w:r>"""
+
+
+def build_docx(pages):
+    """DOCX mit Überschriften, Absätzen, einem Textfeld und einer Tabelle pro Seite (über python-docx)."""
+    from xml.sax.saxutils import escape
+
+    from docx import Document
+    from docx.oxml import parse_xml
+    from docx.oxml.ns import nsdecls
+    document = Document()
+    for number, lines in enumerate(pages, 1):
+        heading = document.add_heading(lines[2], level=1)
+        note = escape(f"Hinweis: {lines[2]}")
+        heading._p.append(parse_xml(TEXT_BOX_XML % (nsdecls("w"), number, number, note, note)))
+        body = lines[3:-7]
+        for line in body:
+            document.add_paragraph(line)
+        rows = [line.split(" | ") for line in lines[-7:-1]]
+        table = document.add_table(rows=len(rows), cols=3)
+        for r, row in enumerate(rows):
+            for c, cell in enumerate(row):
+                table.cell(r, c).text = cell
+        document.add_page_break()
+    bio = io.BytesIO()
+    document.save(bio)
+    return bio.getvalue()
+
+
+BUILDERS = {"pdf": build_pdf, "docx": build_docx}
+
+
+# -----------------------
+# Messung
+# -----------------------
+
+def _measure(filetype, mode, data, repeat, queue):
+    func = MODES[filetype][mode]
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        text = func(io.BytesIO(data))
+        timings.append(time.perf_counter() - start)
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # tracemalloc bremst stark, daher ein separater Lauf nur für den Python-Spitzenspeicher
+    tracemalloc.start()
+    func(io.BytesIO(data))
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    queue.put({
+        "seconds_min": min(timings),
+        "seconds_median": sorted(timings)[len(timings) // 2],
+        "python_peak_bytes": traced_peak,
+        # ru_maxrss ist unter Linux in KiB angegeben
+        "rss_growth_bytes": (rss_after - rss_before) * 1024,
+        "output_chars": len(text),
+    })
+
+
+def run_case(filetype, mode, data, repeat):
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_measure, args=(filetype, mode, data, repeat, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 50, 100, 500])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--filetypes", nargs="+", choices=sorted(MODES), default=sorted(MODES))
+    parser.add_argument("--output", default="bench_ingestion.json")
+    parser.add_argument("--compare", help="früherer JSON-Bericht als Referenz")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="erlaubte Verlangsamung (0.25 = +25 %%)")
+    args = parser.parse_args(argv)
+
+    results = []
+    for num_pages in args.pages:
+        pages = synthetic_pages(num_pages)
+        for filetype in args.filetypes:
+            data = BUILDERS[filetype](pages)
+            for mode in MODES[filetype]:
+                result = run_case(filetype, mode, data, args.repeat)
+                result.update({
+                    "filetype": filetype,
+                    "mode": mode,
+                    "pages": num_pages,
+                    "input_bytes": len(data),
+                    "pages_per_second": num_pages / result["seconds_min"],
+                })
+                results.append(result)
+                print(
+                    f"{filetype:5} {mode:18} {num_pages:4} S. "
+                    f"{result['seconds_min'] * 1000:9.1f} ms "
+                    f"{result['pages_per_second']:8.0f} S./s "
+                    f"Py-Peak {result['python_peak_bytes'] / 2**20:7.1f} MiB "
+                    f"RSS +{result['rss_growth_bytes'] / 2**20:6.1f} MiB "
+                    f"{result['output_chars']:9,} Zeichen"
+                )
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "repeat": args.repeat,
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Ergebnisse gespeichert in {args.output}")
+
+    if args.compare:
+        return 1 if compare(args.compare, results, args.tolerance) else 0
+    return 0
+
+
+def compare(baseline_path, results, tolerance):
+    """Vergleicht mit einem früheren Bericht; gibt die Liste der Regressionen zurück."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["filetype"], r["mode"], r["pages"]): r for r in json.load(f)["results"]}
+    regressions = []
+    for result in results:
+        old = baseline.get((result["filetype"], result["mode"], result["pages"]))
+        if old is None:
+            continue
+        ratio = result["seconds_min"] / old["seconds_min"]
+        marker = "REGRESSION" if ratio > 1 + tolerance else "ok"
+        print(f"{result['filetype']:5} {result['mode']:18} {result['pages']:4} S. x{ratio:5.2f} {marker}")
+        if ratio > 1 + tolerance:
+            regressions.append(result)
+    return regressions
+
+
+if __name__ == "__main__":
+    sys.exit(main())
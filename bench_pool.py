@@ -0,0 +1,108 @@
+"""Antwortzeit des Generieren-Knopfs mit und ohne Vorrat fertiger Sätze.
+
+    python bench_pool.py --app v1.py --requests 50 --output bench_pool.json
+    python bench_pool.py --app streamlit_app.py --slots 10 --size 3 --gap 1.0
+
+Simuliert Anfragen mit zufälliger Satzzahl (1 bis --slots), die wie in den
+Apps ein ZIP mit einem Dokument pro Satz erzeugen: einmal ohne Vorrat (jeder
+Satz wird beim Klick erzeugt und gerendert), einmal mit einem vorab gefüllten
+WorksheetPool. Zwischen zwei Anfragen liegen --gap Sekunden, in denen der
+Vorrat nachgefüllt werden kann. Berichtet werden P50/P99 und die Trefferquote.
+"""
+import argparse
+import io
+import json
+import random
+import statistics
+import sys
+import time
+import zipfile
+
+import worker_pool
+from worksheet_pool import WorksheetPool
+
+
+def build_zip(documents):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+        for i, data in enumerate(documents, 1):
+            zf.writestr(f"Matheaufgaben_Set_{i}.docx", data)
+    return buffer.getvalue()
+
+
+def on_demand(module, num_sets):
+    return build_zip(
+        module.create_word_document(module.create_single_problem_set(num_problems=50), i)
+        for i in range(1, num_sets + 1)
+    )
+
+
+def from_pool(module, pool, num_sets):
+    documents = []
+    _, ready = pool.take()
+    for i in range(1, num_sets + 1):
+        data = ready.get(i)
+        pool.count(data is not None)
+        if data is None:
+            documents.append(module.create_word_document(module.create_single_problem_set(num_problems=50), i))
+        else:
+            documents.append(data)
+    return build_zip(documents)
+
+
+def percentiles(seconds):
+    ms = sorted(1000 * s for s in seconds)
+    return {
+        "p50_ms": statistics.median(ms),
+        "p99_ms": ms[min(len(ms) - 1, round(0.99 * (len(ms) - 1)))],
+        "max_ms": ms[-1],
+    }
+
+
+def measure(request, sizes, gap):
+    seconds = []
+    for num_sets in sizes:
+        start = time.perf_counter()
+        request(num_sets)
+        seconds.append(time.perf_counter() - start)
+        time.sleep(gap)
+    return percentiles(seconds)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--app", default="v1.py")
+    parser.add_argument("--slots", type=int, default=30, help="höchste Satzzahl pro Anfrage")
+    parser.add_argument("--size", type=int, default=2, help="vorbereitete Läufe im Vorrat")
+    parser.add_argument("--refill-below", type=int, default=1)
+    parser.add_argument("--requests", type=int, default=30)
+    parser.add_argument("--gap", type=float, default=0.5, help="Sekunden zwischen zwei Anfragen")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="bench_pool.json")
+    args = parser.parse_args(argv)
+
+    module = worker_pool.load_module(args.app)
+    rng = random.Random(args.seed)
+    sizes = [rng.randint(1, args.slots) for _ in range(args.requests)]
+
+    results = {"on_demand": measure(lambda n: on_demand(module, n), sizes, args.gap)}
+
+    pool = WorksheetPool(args.app, args.slots, size=args.size, refill_below=args.refill_below)
+    while pool.stats()["ready"] < pool.stats()["capacity"]:
+        time.sleep(0.1)
+    results["pool"] = measure(lambda n: from_pool(module, pool, n), sizes, args.gap)
+    results["pool"].update(pool.stats())
+    pool.close()
+
+    for name, result in results.items():
+        print(f"{name:10} P50 {result['p50_ms']:8.1f} ms  P99 {result['p99_ms']:8.1f} ms  max {result['max_ms']:8.1f} ms")
+    print(f"Trefferquote: {results['pool']['hit_rate']:.0%}")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"app": args.app, "sizes": sizes, "results": results}, f, indent=2)
+    worker_pool.default_processes().shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
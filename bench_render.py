@@ -0,0 +1,96 @@
+"""Benchmark der Arbeitsblatt-Erstellung: python-docx gegen den direkten OOXML-Writer.
+
+    python bench_render.py --sets 200 --pack 30 --output bench_render.json
+
+Beide Wege rendern dieselben Aufgabensätze aus streamlit_app.py. Vor der
+Messung wird geprüft, dass die direkt geschriebenen Dateien sich mit
+python-docx öffnen lassen und dieselben Absätze mit denselben Formatvorlagen
+enthalten. Zusätzlich wird ein Klassensatz (--pack Varianten) einmal als ZIP
+mit einem Dokument pro Satz und einmal als ein einziges Dokument erzeugt.
+"""
+import argparse
+import io
+import json
+import random
+import sys
+import time
+import zipfile
+
+from docx import Document
+
+import streamlit_app
+
+RENDERERS = {
+    "python_docx": lambda problems, i: streamlit_app.create_word_document(problems, i),
+    "direct_ooxml": lambda problems, i: streamlit_app.create_word_document(problems, i, fast=True),
+}
+
+
+def paragraphs(docx_bytes):
+    return [(p.style.name, p.text) for p in Document(io.BytesIO(docx_bytes)).paragraphs]
+
+
+def check_equivalent(problem_sets):
+    for i, problems in enumerate(problem_sets, 1):
+        expected = paragraphs(RENDERERS["python_docx"](problems, i))
+        actual = paragraphs(RENDERERS["direct_ooxml"](problems, i))
+        if expected != actual:
+            raise AssertionError(f"Set {i}: direkte Ausgabe weicht ab:\n{expected[:3]}\n{actual[:3]}")
+
+
+def pack_as_zip(problem_sets):
+    bio = io.BytesIO()
+    with zipfile.ZipFile(bio, "w", zipfile.ZIP_DEFLATED) as zf:
+        for i, problems in enumerate(problem_sets, 1):
+            zf.writestr(f"Matheaufgaben_Set_SCHWER_{i}.docx", streamlit_app.create_word_document(problems, i))
+    return bio.getvalue()
+
+
+PACKS = {
+    "zip_per_set": pack_as_zip,
+    "single_document": streamlit_app.create_combined_word_document,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sets", type=int, default=200)
+    parser.add_argument("--pack", type=int, default=30, help="Varianten im Klassensatz")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="bench_render.json")
+    args = parser.parse_args(argv)
+
+    random.seed(args.seed)
+    problem_sets = [streamlit_app.create_single_problem_set(num_problems=50) for _ in range(args.sets)]
+    check_equivalent(problem_sets[:5])
+
+    results = {}
+    for name, render in RENDERERS.items():
+        start = time.perf_counter()
+        sizes = [len(render(problems, i)) for i, problems in enumerate(problem_sets, 1)]
+        elapsed = time.perf_counter() - start
+        results[name] = {
+            "seconds": elapsed,
+            "ms_per_set": 1000 * elapsed / args.sets,
+            "bytes_per_set": sum(sizes) / len(sizes),
+        }
+        print(f"{name:13} {results[name]['ms_per_set']:7.2f} ms/Set {results[name]['bytes_per_set']:9,.0f} Bytes/Set")
+
+    speedup = results["python_docx"]["seconds"] / results["direct_ooxml"]["seconds"]
+    print(f"Beschleunigung: x{speedup:.1f}")
+
+    packs = {}
+    pack_sets = problem_sets[:args.pack]
+    for name, build in PACKS.items():
+        start = time.perf_counter()
+        size = len(build(pack_sets))
+        packs[name] = {"seconds": time.perf_counter() - start, "bytes": size}
+        print(f"Klassensatz ({len(pack_sets)} Sätze) {name:15} {packs[name]['seconds'] * 1000:8.1f} ms {size:10,} Bytes")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"sets": args.sets, "results": results, "speedup": speedup, "packs": packs}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
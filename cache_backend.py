@@ -0,0 +1,513 @@
+"""Cache für mehrere Replikate: im Prozess (LRU) oder gemeinsam über das Redis-Protokoll.
+
+    MATHEAUFGABEN_CACHE_URL=redis://cache:6379/0 streamlit run v11.py
+    python cache_backend.py serve --port 6390
+    python cache_backend.py stats --url redis://127.0.0.1:6390/0
+
+Ohne MATHEAUFGABEN_CACHE_URL hält jeder Prozess einen eigenen LRU-Cache im
+Speicher (MATHEAUFGABEN_CACHE_MAX_BYTES, Standard 64 MB). Mit einer
+redis://-URL teilen sich alle Replikate einen Redis-kompatiblen Server; der
+Client spricht RESP direkt über einen Socket und braucht kein Paket.
+"serve" startet einen kleinen Ersatz-Server mit demselben Protokoll für
+Entwicklung und Tests, wenn kein Redis zur Verfügung steht.
+
+Genutzt wird der Cache für fertige Dokumente mit wiederholbaren Eingaben
+(render_cache.py, Namensraum "documents": "seed_log.py regenerate" und ZIP-
+Abrufe des HTTP-Dienstes mit festem seed) und für extrahierte Lehrpläne
+(syllabus.py, Namensraum "syllabus"). Antworten des Sprachmodells werden
+bewusst nicht zwischengespeichert: jede Anfrage soll neue Aufgaben liefern,
+die Wiederverwendung übernimmt die Aufgabenbank (question_bank.py).
+"""
+import argparse
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+CACHE_URL = os.environ.get("MATHEAUFGABEN_CACHE_URL", "")
+LOCAL_MAX_BYTES = int(os.environ.get("MATHEAUFGABEN_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+
+KEY_PREFIX = "matheaufgaben:"
+CONNECT_TIMEOUT_SECONDS = 1.0
+# Antworten können ganze Dokumente sein; gelesen wird deshalb länger als verbunden
+READ_TIMEOUT_SECONDS = 10.0
+# Nach einem Verbindungsfehler wird der Server so lange übergangen
+RETRY_SECONDS = 30
+
+
+# -----------------------
+# Im Prozess
+# -----------------------
+
+class LocalBackend:
+    """LRU-Cache im Speicher, begrenzt auf max_bytes über alle Namensräume."""
+
+    def __init__(self, max_bytes=LOCAL_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (Namensraum, Schlüssel) -> (Bytes, Ablaufzeit oder None)
+        self._size = 0
+        self._metrics = {}
+
+    def _namespace(self, namespace):
+        if namespace not in self._metrics:
+            self._metrics[namespace] = {"hits": 0, "misses": 0, "entries": 0, "bytes": 0, "evictions": 0}
+        return self._metrics[namespace]
+
+    def _remove(self, entry_key):
+        value, _ = self._entries.pop(entry_key)
+        metrics = self._namespace(entry_key[0])
+        metrics["entries"] -= 1
+        metrics["bytes"] -= len(value)
+        self._size -= len(value)
+
+    def get(self, namespace, key):
+        entry_key = (namespace, key)
+        with self._lock:
+            metrics = self._namespace(namespace)
+            entry = self._entries.get(entry_key)
+            if entry is not None and entry[1] is not None and entry[1] <= time.monotonic():
+                self._remove(entry_key)
+                metrics["evictions"] += 1
+                entry = None
+            if entry is None:
+                metrics["misses"] += 1
+                return None
+            self._entries.move_to_end(entry_key)
+            metrics["hits"] += 1
+            return entry[0]
+
+    def set(self, namespace, key, value, ttl=None):
+        """Legt value (Bytes) ab; mit ttl in Sekunden läuft der Eintrag danach ab."""
+        entry_key = (namespace, key)
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            if entry_key in self._entries:
+                self._remove(entry_key)
+            self._entries[entry_key] = (value, time.monotonic() + ttl if ttl else None)
+            metrics = self._namespace(namespace)
+            metrics["entries"] += 1
+            metrics["bytes"] += len(value)
+            self._size += len(value)
+            while self._size > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._namespace(oldest[0])["evictions"] += 1
+
+    def delete(self, namespace, key):
+        with self._lock:
+            if (namespace, key) in self._entries:
+                self._remove((namespace, key))
+
+    def stats(self):
+        """Namensraum -> Treffer, Fehlschläge, Trefferquote, Einträge, Bytes, Verdrängungen."""
+        with self._lock:
+            return {namespace: _with_hit_rate(metrics) for namespace, metrics in self._metrics.items()}
+
+    def close(self):
+        pass
+
+
+def _with_hit_rate(metrics):
+    metrics = dict(metrics)
+    total = metrics.get("hits", 0) + metrics.get("misses", 0)
+    metrics["hit_rate"] = metrics.get("hits", 0) / total if total else 0.0
+    return metrics
+
+
+# -----------------------
+# Redis-Protokoll
+# -----------------------
+#
+# Einträge liegen unter matheaufgaben:<Namensraum>:<Schlüssel>, die Zähler pro
+# Namensraum in einem Hash matheaufgaben:stats:<Namensraum> und gelten damit
+# für alle Replikate. Redis verdrängt selbst (maxmemory-policy allkeys-lru)
+# und sagt nicht, aus welchem Namensraum; Verdrängungen und Speicher kommen
+# deshalb aus INFO und gelten für den ganzen Server; pro Namensraum werden
+# stattdessen Schreibvorgänge und geschriebene Bytes gezählt.
+#
+# Ist der Server nicht erreichbar, verhält sich der Cache wie ein leerer:
+# get() liefert None, set() tut nichts, und für RETRY_SECONDS wird kein
+# neuer Verbindungsversuch unternommen. Eine Fehlerantwort auf einen
+# einzelnen Befehl (z. B. OOM bei vollem Server) betrifft nur diesen Befehl.
+#
+# Treffer und Fehlschläge von get() werden im Prozess gesammelt und mit dem
+# nächsten Befehl an den Server geschickt, damit get() eine Anfrage bleibt.
+
+class ProtocolError(Exception):
+    pass
+
+
+class ReplyError(ProtocolError):
+    """Fehlerantwort des Servers auf einen Befehl ("-ERR ..."); die Verbindung bleibt benutzbar."""
+
+
+def encode_command(*args):
+    parts = [f"*{len(args)}\r\n".encode()]
+    for arg in args:
+        if isinstance(arg, str):
+            arg = arg.encode("utf-8")
+        elif isinstance(arg, int):
+            arg = str(arg).encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+    return b"".join(parts)
+
+
+def read_reply(stream):
+    """Eine RESP-Antwort aus einem gepufferten Binärstrom; Fehlerantworten als ReplyError."""
+    line = stream.readline()
+    if not line.endswith(b"\r\n"):
+        raise ConnectionError("Verbindung geschlossen")
+    kind, body = line[:1], line[1:-2]
+    if kind == b"+":
+        return body.decode()
+    if kind == b"-":
+        raise ReplyError(body.decode())
+    if kind == b":":
+        return int(body)
+    if kind == b"$":
+        length = int(body)
+        if length < 0:
+            return None
+        data = stream.read(length + 2)
+        if len(data) != length + 2:
+            raise ConnectionError("Verbindung geschlossen")
+        return data[:-2]
+    if kind == b"*":
+        length = int(body)
+        return None if length < 0 else [read_reply(stream) for _ in range(length)]
+    raise ProtocolError(f"unbekannte Antwort {line!r}")
+
+
+class _Connection:
+    def __init__(self, host, port, db, password):
+        self.sock = socket.create_connection((host, port), timeout=CONNECT_TIMEOUT_SECONDS)
+        self.sock.settimeout(READ_TIMEOUT_SECONDS)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.stream = self.sock.makefile("rb")
+        setup = []
+        if password:
+            setup.append(("AUTH", password))
+        if db:
+            setup.append(("SELECT", db))
+        for reply in self.pipeline(setup):
+            if isinstance(reply, ReplyError):
+                self.close()
+                raise reply
+
+    def pipeline(self, commands):
+        """Sendet alle Befehle auf einmal und liest die Antworten in Reihenfolge; Fehlerantworten als ReplyError-Objekt."""
+        if not commands:
+            return []
+        self.sock.sendall(b"".join(encode_command(*command) for command in commands))
+        replies = []
+        for _ in commands:
+            try:
+                replies.append(read_reply(self.stream))
+            except ReplyError as e:
+                replies.append(e)
+        return replies
+
+    def close(self):
+        self.stream.close()
+        self.sock.close()
+
+
+class RedisBackend:
+    """Gemeinsamer Cache auf einem Redis-kompatiblen Server; Verbindungen werden wiederverwendet."""
+
+    def __init__(self, url):
+        parsed = urlparse(url)
+        self.url = url
+        self.host = parsed.hostname or "127.0.0.1"
+        self.port = parsed.port or 6379
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.password = parsed.password
+        self.errors = 0
+        self._idle = []
+        self._lock = threading.Lock()
+        self._down_until = 0.0
+        self._counts = {}  # (Namensraum, Zähler) -> noch nicht gesendete Erhöhung
+
+    def _run(self, commands):
+        """Antworten auf commands (None für eine Fehlerantwort), oder None, wenn der Server nicht erreichbar ist."""
+        if time.monotonic() < self._down_until:
+            return None
+        with self._lock:
+            connection = self._idle.pop() if self._idle else None
+            counts, self._counts = self._counts, {}
+        counters = [
+            ("HINCRBY", f"{KEY_PREFIX}stats:{namespace}", field, amount)
+            for (namespace, field), amount in counts.items()
+        ]
+        try:
+            if connection is None:
+                connection = _Connection(self.host, self.port, self.db, self.password)
+            replies = connection.pipeline(counters + list(commands))[len(counters):]
+        except (OSError, ConnectionError, ProtocolError, ValueError):
+            if connection is not None:
+                connection.close()
+            with self._lock:
+                # Nicht gesendete Zähler gehen mit der nächsten Anfrage mit
+                for field, amount in counts.items():
+                    self._counts[field] = self._counts.get(field, 0) + amount
+                self.errors += 1
+                self._down_until = time.monotonic() + RETRY_SECONDS
+            return None
+        failed = sum(isinstance(reply, ReplyError) for reply in replies)
+        with self._lock:
+            self._idle.append(connection)
+            self.errors += failed
+        return [None if isinstance(reply, ReplyError) else reply for reply in replies]
+
+    def _count(self, namespace, field):
+        with self._lock:
+            self._counts[namespace, field] = self._counts.get((namespace, field), 0) + 1
+
+    def get(self, namespace, key):
+        replies = self._run([("GET", f"{KEY_PREFIX}{namespace}:{key}")])
+        if replies is None:
+            return None
+        value = replies[0]
+        self._count(namespace, "misses" if value is None else "hits")
+        return value
+
+    def set(self, namespace, key, value, ttl=None):
+        command = ["SET", f"{KEY_PREFIX}{namespace}:{key}", value]
+        if ttl:
+            command += ["PX", int(ttl * 1000)]
+        self._run([
+            command,
+            ("SADD", f"{KEY_PREFIX}namespaces", namespace),
+            ("HINCRBY", f"{KEY_PREFIX}stats:{namespace}", "writes", 1),
+            ("HINCRBY", f"{KEY_PREFIX}stats:{namespace}", "bytes_written", len(value)),
+        ])
+
+    def delete(self, namespace, key):
+        self._run([("DEL", f"{KEY_PREFIX}{namespace}:{key}")])
+
+    def stats(self):
+        """Namensraum -> Zähler aller Replikate; unter "server" Speicher und Verdrängungen laut INFO."""
+        replies = self._run([("SMEMBERS", f"{KEY_PREFIX}namespaces"), ("INFO", "all")])
+        if replies is None:
+            return {"server": {"url": self.url, "reachable": False, "errors": self.errors}}
+        namespaces = sorted(name.decode() for name in replies[0] or [])
+        info = dict(
+            line.split(":", 1) for line in (replies[1] or b"").decode().splitlines() if ":" in line and not line.startswith("#")
+        )
+        hashes = self._run([("HGETALL", f"{KEY_PREFIX}stats:{namespace}") for namespace in namespaces]) or []
+        result = {}
+        for namespace, fields in zip(namespaces, hashes):
+            counters = {"hits": 0, "misses": 0, "writes": 0, "bytes_written": 0}
+            fields = fields or []
+            counters.update({fields[i].decode(): int(fields[i + 1]) for i in range(0, len(fields), 2)})
+            result[namespace] = _with_hit_rate(counters)
+        result["server"] = {
+            "url": self.url,
+            "reachable": True,
+            "errors": self.errors,
+            "used_memory": int(info.get("used_memory", 0)),
+            "evictions": int(info.get("evicted_keys", 0)),
+            "expired": int(info.get("expired_keys", 0)),
+        }
+        return result
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+
+def open_backend(url=CACHE_URL):
+    """Backend zur URL: leer für den Cache im Prozess, redis:// für einen gemeinsamen Server."""
+    if not url:
+        return LocalBackend()
+    if urlparse(url).scheme != "redis":
+        raise ValueError(f"Nicht unterstützte Cache-URL: {url}")
+    return RedisBackend(url)
+
+
+_default_backend = None
+_default_lock = threading.Lock()
+
+
+def default_backend():
+    """Prozessweite Instanz, von allen Sitzungen geteilt."""
+    global _default_backend
+    with _default_lock:
+        if _default_backend is None:
+            _default_backend = open_backend()
+        return _default_backend
+
+
+def get_json(namespace, key):
+    data = default_backend().get(namespace, key)
+    return None if data is None else json.loads(data)
+
+
+def set_json(namespace, key, value, ttl=None):
+    default_backend().set(namespace, key, json.dumps(value, ensure_ascii=False).encode("utf-8"), ttl)
+
+
+# -----------------------
+# Ersatz-Server
+# -----------------------
+#
+# Versteht die Befehle, die RedisBackend benutzt (und PING, FLUSHDB), hält
+# alles im Speicher und verdrängt Zeichenketten nach LRU, sobald maxmemory
+# überschritten ist. Kein Ersatz für Redis im Betrieb.
+
+class _StandInStore:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.strings = OrderedDict()  # Schlüssel -> (Bytes, Ablaufzeit oder None)
+        self.hashes = {}
+        self.sets = {}
+        self.size = 0
+        self.evicted = 0
+        self.expired = 0
+
+    def _drop(self, key):
+        value, _ = self.strings.pop(key)
+        self.size -= len(value)
+
+    def execute(self, name, args):
+        with self.lock:
+            if name == "PING":
+                return "PONG"
+            if name in ("SELECT", "AUTH"):
+                return "OK"
+            if name == "GET":
+                entry = self.strings.get(args[0])
+                if entry is not None and entry[1] is not None and entry[1] <= time.monotonic():
+                    self._drop(args[0])
+                    self.expired += 1
+                    entry = None
+                if entry is None:
+                    return None
+                self.strings.move_to_end(args[0])
+                return entry[0]
+            if name == "SET":
+                key, value = args[0], args[1]
+                expires = None
+                if len(args) >= 4 and args[2].upper() in (b"PX", b"EX"):
+                    factor = 0.001 if args[2].upper() == b"PX" else 1
+                    expires = time.monotonic() + int(args[3]) * factor
+                if key in self.strings:
+                    self._drop(key)
+                self.strings[key] = (value, expires)
+                self.size += len(value)
+                while self.size > self.max_bytes and self.strings:
+                    self._drop(next(iter(self.strings)))
+                    self.evicted += 1
+                return "OK"
+            if name == "DEL":
+                removed = [key for key in args if key in self.strings]
+                for key in removed:
+                    self._drop(key)
+                return len(removed)
+            if name == "HINCRBY":
+                fields = self.hashes.setdefault(args[0], {})
+                fields[args[1]] = fields.get(args[1], 0) + int(args[2])
+                return fields[args[1]]
+            if name == "HGETALL":
+                return [item for field, value in self.hashes.get(args[0], {}).items() for item in (field, str(value).encode())]
+            if name == "SADD":
+                members = self.sets.setdefault(args[0], set())
+                added = len(set(args[1:]) - members)
+                members.update(args[1:])
+                return added
+            if name == "SMEMBERS":
+                return sorted(self.sets.get(args[0], set()))
+            if name == "INFO":
+                return (
+                    f"# Memory\r\nused_memory:{self.size}\r\nmaxmemory:{self.max_bytes}\r\n"
+                    f"# Stats\r\nevicted_keys:{self.evicted}\r\nexpired_keys:{self.expired}\r\n"
+                ).encode()
+            if name == "FLUSHDB":
+                self.__init__(self.max_bytes)
+                return "OK"
+            raise ProtocolError(f"ERR unknown command '{name}'")
+
+
+def encode_reply(reply):
+    if isinstance(reply, ProtocolError):
+        return f"-{reply}\r\n".encode()
+    if isinstance(reply, str):
+        return f"+{reply}\r\n".encode()
+    if isinstance(reply, int):
+        return f":{reply}\r\n".encode()
+    if reply is None:
+        return b"$-1\r\n"
+    if isinstance(reply, bytes):
+        return b"$%d\r\n%s\r\n" % (len(reply), reply)
+    return b"*%d\r\n" % len(reply) + b"".join(encode_reply(item) for item in reply)
+
+
+class _StandInHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        while True:
+            try:
+                command = read_reply(self.rfile)
+            except (ConnectionError, ProtocolError, ValueError):
+                return
+            if not isinstance(command, list) or not command:
+                return
+            try:
+                reply = self.server.store.execute(command[0].decode().upper(), command[1:])
+            except ProtocolError as e:
+                reply = e
+            self.wfile.write(encode_reply(reply))
+
+
+class StandInServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, max_bytes):
+        super().__init__(address, _StandInHandler)
+        self.store = _StandInStore(max_bytes)
+
+
+# -----------------------
+# Kommandozeile
+# -----------------------
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve", help="Ersatz-Server mit Redis-Protokoll starten")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=6390)
+    serve.add_argument("--max-bytes", type=int, default=LOCAL_MAX_BYTES)
+    stats = commands.add_parser("stats", help="Zähler pro Namensraum")
+    stats.add_argument("--url", default=CACHE_URL)
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        server = StandInServer((args.host, args.port), args.max_bytes)
+        print(f"Ersatz-Server auf redis://{args.host}:{server.server_address[1]}/0", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    if not args.url:
+        print("Der Cache im Prozess hat keine Zähler außerhalb des Prozesses; --url angeben", file=sys.stderr)
+        return 1
+    for namespace, metrics in open_backend(args.url).stats().items():
+        print(f"{namespace:12} " + "  ".join(f"{name} {value}" for name, value in metrics.items()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+
+from storage import DATA_DIR
+
+# -----------------------
+# Checkpoints für mehrteilige LLM-Generierungen
+# -----------------------
+#
+# Jede fertige Modellantwort (ein Chunk in v8, ein Satz in v9–v11) wird unter
+# data/checkpoints/<job_id>/<index>.txt abgelegt, bevor der nächste Aufruf
+# startet. Bricht ein Lauf ab, erhält ein neuer Versuch mit denselben Eingaben
+# dieselbe Job-ID (resumable_job_id), auch in einer neuen Sitzung, und setzt
+# beim ersten fehlenden Teil fort.
+# Nach einem erfolgreichen Lauf werden die Checkpoints gelöscht.
+
+CHECKPOINTS_DIR = os.path.join(DATA_DIR, "checkpoints")
+# Job-ID = Hash über die Eingaben + zufälliger Teil pro Lauf
+SPEC_HASH_CHARS = 16
+RUN_SUFFIX_CHARS = 8
+
+# Liegengebliebene Checkpoints werden nach dieser Zeit gelöscht
+MAX_AGE_SECONDS = 24 * 60 * 60
+
+
+class CheckpointStore:
+    """Texte pro (Job-ID, Index) auf dem Datenträger; von allen Sitzungen geteilt."""
+
+    def __init__(self, directory=CHECKPOINTS_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _job_dir(self, job_id):
+        return os.path.join(self.directory, job_id)
+
+    def _path(self, job_id, index):
+        return os.path.join(self._job_dir(job_id), f"{index:04d}.txt")
+
+    def get(self, job_id, index):
+        try:
+            with open(self._path(job_id, index), encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, job_id, index, text):
+        path = self._path(job_id, index)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+    def exists(self, job_id):
+        return os.path.isdir(self._job_dir(job_id))
+
+    def open_run(self, prefix):
+        """ID des offenen Laufs, dessen ID mit prefix beginnt, oder eine neue (mit angelegtem Verzeichnis)."""
+        with self._lock:
+            self.prune()
+            for name in sorted(os.listdir(self.directory)):
+                if name.startswith(prefix) and os.path.isdir(self._job_dir(name)):
+                    return name
+            job_id = prefix + uuid.uuid4().hex[:RUN_SUFFIX_CHARS]
+            os.makedirs(self._job_dir(job_id))
+            return job_id
+
+    def completed(self, job_id):
+        """Indizes der bereits gespeicherten Teile, aufsteigend."""
+        try:
+            names = os.listdir(self._job_dir(job_id))
+        except FileNotFoundError:
+            return []
+        return sorted(int(name[:-4]) for name in names if name.endswith(".txt"))
+
+    def discard(self, job_id):
+        shutil.rmtree(self._job_dir(job_id), ignore_errors=True)
+
+    def prune(self, max_age=MAX_AGE_SECONDS):
+        cutoff = time.time() - max_age
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    shutil.rmtree(path, ignore_errors=True)
+            except FileNotFoundError:
+                pass
+
+    def run(self, job_id, steps, on_step=None):
+        """Führt die Schritte der Reihe nach aus und überspringt gespeicherte.
+
+        steps: Funktionen ohne Argumente, die jeweils einen Text liefern.
+        on_step(index, resumed) wird nach jedem Schritt aufgerufen.
+        """
+        results = []
+        for index, step in enumerate(steps):
+            resumed = self.get(job_id, index) is not None
+            results.append(self.step(job_id, index, step))
+            if on_step:
+                on_step(index, resumed)
+        return results
+
+    def step(self, job_id, index, step):
+        """Gespeicherter Text von Teil `index` oder step(), danach gespeichert.
+
+        Unabhängig von den anderen Teilen; so können Teile auch parallel laufen.
+        """
+        text = self.get(job_id, index)
+        if text is None:
+            text = step()
+            self.put(job_id, index, text)
+        return text
+
+
+_default_store = None
+_default_lock = threading.Lock()
+
+
+def default_store():
+    """Prozessweite Instanz, von allen Sitzungen geteilt."""
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = CheckpointStore()
+        return _default_store
+
+
+def resumable_job_id(*spec):
+    """Job-ID für einen Lauf mit diesen Eingaben (JSON-fähig, z. B. App, Lehrplan-Hash, Einstellungen).
+
+    Die ID beginnt mit einem Hash über spec. Liegt für diesen Hash noch ein
+    Checkpoint-Verzeichnis vor, ist ein früherer Lauf abgebrochen oder läuft
+    noch, und seine ID wird wiederverwendet, auch aus einer anderen Sitzung
+    oder nach einem Neustart des Servers. Sonst beginnt ein neuer Lauf mit
+    frischen Aufgaben; sein Verzeichnis wird sofort angelegt, damit ein
+    zweiter Klick vor dem ersten Checkpoint nicht einen zweiten Lauf startet.
+    """
+    spec_hash = hashlib.sha256(json.dumps(spec, ensure_ascii=False).encode("utf-8")).hexdigest()[:SPEC_HASH_CHARS]
+    return default_store().open_run(spec_hash)
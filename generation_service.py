@@ -0,0 +1,332 @@
+"""Lokaler HTTP-Dienst für Arbeitsblätter (nur Standardbibliothek).
+
+    python generation_service.py --port 8765
+    curl -o sets.zip 'http://127.0.0.1:8765/worksheets?variant=tough&sets=30&seed=7'
+    curl -o sets.docx 'http://127.0.0.1:8765/worksheets?variant=standard&sets=5&format=docx'
+    curl 'http://127.0.0.1:8765/worksheets?sets=2&format=json'
+    curl -o llm.docx -d '{"syllabus_text": "...", "num_sets": 2}' http://127.0.0.1:8765/llm-worksheets
+
+Endpunkte:
+    GET  /health          Zustand der Worker-Pools
+    GET  /worksheets      prozedurale Sätze (variant=standard|tough, sets, seed,
+                          problems, format=zip|docx|json, unique=1 für keine
+                          Wiederholung im ganzen Abruf); ZIP und DOCX werden
+                          per Chunked Transfer gestreamt, sobald der erste
+                          Satz fertig ist; ZIP-Einträge kommen bei festem
+                          seed aus dem Render-Cache
+    POST /llm-worksheets  Sätze vom Sprachmodell wie in v11 (GROQ_API_KEY nötig)
+
+Prozedurale Sätze laufen in einem Prozess-Pool (ein Satz pro Aufgabe, mit
+batch_generate.render_set, also reproduzierbar über seed, außer bei
+variant=standard mit unique=1), LLM-Sätze in einem Thread-Pool. Beide Pools
+haben eine begrenzte Warteschlange; ist sie voll, antwortet der Dienst sofort
+mit 503 und Retry-After.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import batch_generate
+import cache_backend
+import llm_worksheets
+import render_cache
+import seed_log
+import worksheet_pipeline
+from worker_pool import PoolSaturated, WorkerPool
+
+MAX_SETS = 1000
+MAX_PROBLEMS = 200
+MAX_LLM_SETS = 10
+MAX_BODY_BYTES = 2 * 1024 * 1024
+REQUEST_TIMEOUT_SECONDS = 600
+
+DOCX_MIME = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+
+class BadRequest(Exception):
+    pass
+
+
+class ChunkedWriter:
+    """Dateiähnliches Objekt, das jeden write() als HTTP-Chunk sendet (für zipfile ohne seek)."""
+
+    def __init__(self, wfile):
+        self.wfile = wfile
+
+    def write(self, data):
+        if data:
+            self.wfile.write(b"%x\r\n" % len(data) + bytes(data) + b"\r\n")
+        return len(data)
+
+    def flush(self):
+        self.wfile.flush()
+
+    def close(self):
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+def _int_param(params, name, default, low, high):
+    try:
+        value = int(params.get(name, [default])[0])
+    except (TypeError, ValueError):
+        raise BadRequest(f"{name} muss eine ganze Zahl sein")
+    if not low <= value <= high:
+        raise BadRequest(f"{name} muss zwischen {low} und {high} liegen")
+    return value
+
+
+def _set_key(variant, seed, index, num_problems, fast, unique):
+    """Render-Cache-Schlüssel eines Satzes aus batch_generate.render_set (nur bei festem seed sinnvoll)."""
+    path = batch_generate.load_variant(variant).__file__
+    return render_cache.document_key(path, "set", seed_log.code_version(path), seed, index, num_problems, fast, unique)
+
+
+def _results(futures):
+    """Ergebnisse in Reihenfolge; bei Zeitüberschreitung oder Fehler werden die übrigen Aufgaben verworfen."""
+    try:
+        return [future.result(REQUEST_TIMEOUT_SECONDS) for future in futures]
+    finally:
+        # Abgebrochene Anfragen sollen den Pool nicht weiter belegen
+        for future in futures:
+            future.cancel()
+
+
+class GenerationHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "Matheaufgaben/1.0"
+
+    # --- Antworten ---
+
+    def _send(self, status, body, content_type, headers=()):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status, data, headers=()):
+        self._send(status, json.dumps(data, ensure_ascii=False).encode("utf-8"), "application/json; charset=utf-8", headers)
+
+    def _send_file(self, data, content_type, file_name):
+        self._send(200, data, content_type, [("Content-Disposition", f'attachment; filename="{file_name}"')])
+
+    def _dispatch(self, handler):
+        try:
+            handler()
+        except BadRequest as e:
+            self._send_json(400, {"error": str(e)})
+        except PoolSaturated as e:
+            self._send_json(503, {"error": str(e), "retry_after": e.retry_after}, [("Retry-After", str(e.retry_after))])
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        except Exception as e:
+            self.log_error("Fehler bei %s: %r", self.path, e)
+            self._send_json(500, {"error": f"{type(e).__name__}: {e}"})
+
+    # --- Routen ---
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/health":
+            self._dispatch(lambda: self._send_json(200, {
+                "status": "ok",
+                "procedural": self.server.cpu_pool.stats(),
+                "llm": self.server.llm_pool.stats(),
+                "cache": cache_backend.default_backend().stats(),
+            }))
+        elif url.path == "/worksheets":
+            self._dispatch(lambda: self.worksheets(parse_qs(url.query)))
+        else:
+            self._send_json(404, {"error": "unbekannter Pfad"})
+
+    def do_POST(self):
+        if urlparse(self.path).path == "/llm-worksheets":
+            self._dispatch(self.llm_worksheets)
+        else:
+            self._send_json(404, {"error": "unbekannter Pfad"})
+
+    def worksheets(self, params):
+        variant = params.get("variant", ["tough"])[0]
+        if variant not in batch_generate.VARIANTS:
+            raise BadRequest(f"variant muss eine von {sorted(batch_generate.VARIANTS)} sein")
+        output = params.get("format", ["zip"])[0]
+        if output not in ("zip", "docx", "json"):
+            raise BadRequest("format muss zip, docx oder json sein")
+        num_sets = _int_param(params, "sets", 1, 1, MAX_SETS)
+        num_problems = _int_param(params, "problems", 50, 1, MAX_PROBLEMS)
+        seed = _int_param(params, "seed", random.SystemRandom().randrange(2 ** 32), 0, 2 ** 63)
+        indices = range(1, num_sets + 1)
+        if params.get("unique") == ["1"]:
+            unique, unique_pool = batch_generate.start_unique_run(variant, num_sets, 1, num_problems)
+        else:
+            unique, unique_pool = None, None
+        # Nur mit festem seed wiederholen sich Anfragen; bei standard mit unique=1 hängt
+        # das Ergebnis von der Reihenfolge der Prozesse ab
+        cached = "seed" in params and unique_pool is None
+        try:
+            self.render(variant, output, seed, indices, num_problems, unique, cached)
+        finally:
+            if unique_pool is not None:
+                unique_pool.unlink()
+
+    def render(self, variant, output, seed, indices, num_problems, unique, cached=False):
+        pool = self.server.cpu_pool
+        if output == "json":
+            futures = pool.submit_many(
+                batch_generate.generate_problems, [(variant, seed, index, num_problems, unique) for index in indices]
+            )
+            problem_sets = _results(futures)
+            self._send_json(200, {
+                "variant": variant,
+                "seed": seed,
+                "sets": [{"index": index, "problems": problems} for index, problems in zip(indices, problem_sets)],
+            })
+            return
+
+        # Höchstens zwei Sätze pro Prozess laufen dem Schreiben voraus
+        window = 2 * pool.workers
+        if output == "zip":
+            file_name = batch_generate.VARIANTS[variant][1]
+            tasks = {index: (variant, seed, index, num_problems, True, unique) for index in indices}
+            cache = render_cache.default_cache()
+            keys = {index: _set_key(*tasks[index]) for index in indices} if cached else {}
+            # Nur Sätze, die hier noch nicht gerendert vorliegen, kommen in den Pool
+            todo = [index for index in indices if not cached or keys[index] not in cache]
+            results = pool.imap(batch_generate.render_set, [tasks[index] for index in todo], window, REQUEST_TIMEOUT_SECONDS)
+
+            def members():
+                fresh = set(todo)
+                for index in indices:
+                    if index in fresh:
+                        data = next(results)
+                        if cached:
+                            cache.store(keys[index], data)
+                    else:
+                        # Inzwischen verdrängt: dann einzeln neu rendern
+                        data = cache.get_or_render(
+                            keys[index],
+                            lambda: pool.submit(batch_generate.render_set, *tasks[index]).result(REQUEST_TIMEOUT_SECONDS),
+                        )
+                    yield file_name.format(index), data
+
+            self._stream(
+                results, "application/zip", f"Matheaufgaben_{variant}_{seed}.zip", seed,
+                lambda writer: worksheet_pipeline.write_archive(writer, members()),
+            )
+        else:
+            module = batch_generate.load_variant(variant)
+            results = pool.imap(
+                batch_generate.generate_problems, [(variant, seed, index, num_problems, unique) for index in indices],
+                window, REQUEST_TIMEOUT_SECONDS,
+            )
+            self._stream(
+                results, DOCX_MIME, f"Matheaufgaben_{variant}_{seed}.docx", seed,
+                lambda writer: worksheet_pipeline.write_combined_document(writer, module.combined_worksheets(results)),
+            )
+
+    def _stream(self, results, content_type, file_name, seed, write):
+        """Sendet per Chunked Transfer, was write(writer) schreibt, während results noch entsteht.
+
+        results wird in jedem Fall geschlossen, auch wenn der Client schon vor
+        dem ersten Satz auflegt; sonst blieben die Plätze im Pool belegt.
+        """
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Disposition", f'attachment; filename="{file_name}"')
+            self.send_header("Transfer-Encoding", "chunked")
+            self.send_header("X-Seed", str(seed))
+            self.end_headers()
+            writer = ChunkedWriter(self.wfile)
+            write(writer)
+            writer.close()
+        except Exception as e:
+            # Der Status ist schon gesendet (oder der Client weg): Verbindung ohne abschließenden Chunk schließen,
+            # damit der Client den Abbruch bemerkt
+            self.close_connection = True
+            if not isinstance(e, (BrokenPipeError, ConnectionResetError)):
+                self.log_error("Abbruch beim Streamen von %s: %r", self.path, e)
+        finally:
+            # Übrige Aufgaben verwerfen, falls nicht alles geschrieben wurde
+            results.close()
+
+    def llm_worksheets(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if not 0 < length <= MAX_BODY_BYTES:
+            raise BadRequest(f"JSON-Body mit höchstens {MAX_BODY_BYTES} Bytes erwartet")
+        try:
+            body = json.loads(self.rfile.read(length))
+        except ValueError:
+            raise BadRequest("Body ist kein gültiges JSON")
+        syllabus_text = body.get("syllabus_text")
+        if not isinstance(syllabus_text, str) or not syllabus_text.strip():
+            raise BadRequest("syllabus_text fehlt")
+        params = {name: [body[name]] for name in ("num_sets", "questions_per_set") if name in body}
+        num_sets = _int_param(params, "num_sets", 1, 1, MAX_LLM_SETS)
+        questions_per_set = _int_param(params, "questions_per_set", 50, 1, 100)
+
+        client = self.server.groq_client()
+        futures = self.server.llm_pool.submit_many(
+            llm_worksheets.generate_set,
+            [(client, syllabus_text, set_idx, questions_per_set) for set_idx in range(1, num_sets + 1)],
+        )
+        texts = _results(futures)
+        self._send_file(llm_worksheets.build_document(texts), DOCX_MIME, f"mathematik_anspruchsvoll_{num_sets}_sets.docx")
+
+
+class GenerationServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, cpu_pool, llm_pool):
+        super().__init__(address, GenerationHandler)
+        self.cpu_pool = cpu_pool
+        self.llm_pool = llm_pool
+        self._client = None
+        self._client_lock = threading.Lock()
+
+    def groq_client(self):
+        with self._client_lock:
+            if self._client is None:
+                api_key = os.environ.get("GROQ_API_KEY")
+                if not api_key:
+                    raise RuntimeError("GROQ_API_KEY ist nicht gesetzt")
+                self._client = llm_worksheets.groq_client(api_key)
+            return self._client
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Prozesse für prozedurale Sätze")
+    parser.add_argument("--queue", type=int, default=2000, help="max. angenommene, unfertige Sätze")
+    parser.add_argument("--llm-workers", type=int, default=4, help="gleichzeitige Modellaufrufe")
+    parser.add_argument("--llm-queue", type=int, default=40, help="max. angenommene, unfertige LLM-Sätze")
+    args = parser.parse_args(argv)
+
+    cpu_pool = WorkerPool(ProcessPoolExecutor(args.workers), args.workers, args.queue)
+    llm_pool = WorkerPool(ThreadPoolExecutor(args.llm_workers, thread_name_prefix="llm"), args.llm_workers, args.llm_queue)
+    server = GenerationServer((args.host, args.port), cpu_pool, llm_pool)
+    print(f"Dienst läuft auf http://{args.host}:{args.port} ({args.workers} Prozesse, {args.llm_workers} LLM-Threads)", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        cpu_pool.shutdown()
+        llm_pool.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
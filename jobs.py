@@ -0,0 +1,322 @@
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+import artifacts
+from storage import DATA_DIR
+from worker_pool import FairPool
+
+# -----------------------
+# Hintergrund-Jobs für lange Generierungen
+# -----------------------
+#
+# Ein Job besteht aus einer Liste von Schritten (ein Schritt pro Aufgabensatz)
+# und einer Abschlussfunktion, die aus den Ergebnissen die Datei baut. Er läuft
+# in einem eigenen Thread des Prozesses, nicht im Skript-Thread der Sitzung:
+# Reruns, weitere Klicks oder ein Neuladen der Seite brechen ihn nicht ab.
+# Der Fortschritt wird nach jedem Schritt nach data/jobs/<id>.json geschrieben,
+# das Ergebnis nach data/jobs/<id>.bin. Die Job-IDs der Seite stehen in der URL
+# (?jobs=...), damit sich ein neu geladener Tab wieder anhängen kann.
+#
+# Die Schritte aller Jobs teilen sich einen FairPool (worker_pool): reihum pro
+# Sitzung und mit höchstens MAX_PER_USER gleichzeitigen Schritten je Sitzung,
+# damit ein großer Auftrag die kleinen der anderen nicht ausbremst.
+
+JOBS_DIR = os.path.join(DATA_DIR, "jobs")
+QUERY_PARAM = "jobs"
+
+# Fertige Jobs werden nach dieser Zeit beim nächsten submit() gelöscht
+MAX_AGE_SECONDS = 24 * 60 * 60
+POLL_SECONDS = 1.0
+
+WORKERS = max(4, os.cpu_count() or 1)
+MAX_PER_USER = max(1, WORKERS // 2)
+
+ACTIVE = ("queued", "running")
+
+
+class Job:
+    """Zustand eines Jobs; wird nach jedem Schritt als JSON gespeichert."""
+
+    def __init__(self, job_id, title, total, file_name, mime, **state):
+        self.id = job_id
+        self.title = title
+        self.total = total
+        self.file_name = file_name
+        self.mime = mime
+        self.user = state.get("user")
+        self.status = state.get("status", "queued")
+        self.done = state.get("done", 0)
+        self.error = state.get("error")
+        self.created_at = state.get("created_at", time.time())
+        self.finished_at = state.get("finished_at")
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "title": self.title,
+            "total": self.total,
+            "file_name": self.file_name,
+            "mime": self.mime,
+            "user": self.user,
+            "status": self.status,
+            "done": self.done,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        data = dict(data)
+        return cls(data.pop("id"), data.pop("title"), data.pop("total"), data.pop("file_name"), data.pop("mime"), **data)
+
+    @property
+    def active(self):
+        return self.status in ACTIVE
+
+
+class JobRunner:
+    """Führt Jobs aus; ihre Schritte laufen fair verteilt im prozessweiten Pool (siehe default_runner)."""
+
+    def __init__(self, directory=JOBS_DIR, max_workers=WORKERS, max_per_user=MAX_PER_USER):
+        self.directory = directory
+        self._jobs = {}
+        self._flights = {}  # Schlüssel gleichartiger Anfragen -> ID des laufenden Jobs
+        self._lock = threading.Lock()
+        self.pool = FairPool(
+            ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job"), max_workers, max_per_user
+        )
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _state_path(self, job_id):
+        return os.path.join(self.directory, job_id + ".json")
+
+    def _result_path(self, job_id):
+        return os.path.join(self.directory, job_id + ".bin")
+
+    def _write(self, path, data):
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _save(self, job):
+        self._write(self._state_path(job.id), json.dumps(job.to_dict()).encode("utf-8"))
+
+    def submit(self, title, steps, finish, file_name, mime, job_id=None, checkpoints=None, flight_key=None, user=None):
+        """Startet einen Job und gibt seine ID zurück.
+
+        steps: Funktionen ohne Argumente, eine pro Aufgabensatz.
+        finish: erhält die Liste der Schritt-Ergebnisse und gibt die Datei als Bytes zurück.
+        checkpoints: optionaler CheckpointStore für Schritte, die Text liefern. Mit
+        derselben job_id setzt ein neuer Versuch nach dem letzten gespeicherten Schritt fort.
+        flight_key: läuft bereits ein Job mit diesem Schlüssel (siehe singleflight.flight_key),
+        wird dessen ID zurückgegeben, statt dieselbe Arbeit ein zweites Mal zu starten.
+        user: Warteschlange im FairPool, in der Regel die Sitzung (siehe session_user).
+        """
+        self.prune()
+        steps = list(steps)
+        with self._lock:
+            if job_id in self._jobs and self._jobs[job_id].active:
+                return job_id
+            running_id = self._flights.get(flight_key)
+            if running_id is not None and self._jobs[running_id].active:
+                return running_id
+            job = Job(job_id or uuid.uuid4().hex[:12], title, len(steps), file_name, mime, user=user)
+            self._jobs[job.id] = job
+            if flight_key is not None:
+                self._flights[flight_key] = job.id
+        self._save(job)
+        # Der Job-Thread wartet nur auf seine Schritte; gerechnet wird im Pool
+        threading.Thread(target=self._run, args=(job, steps, finish, checkpoints), name=f"job-{job.id}", daemon=True).start()
+        return job.id
+
+    def _step_done(self, job):
+        job.done += 1
+        self._save(job)
+
+    def _run(self, job, steps, finish, checkpoints):
+        job.status = "running"
+        self._save(job)
+        if checkpoints is not None:
+            steps = [functools.partial(checkpoints.step, job.id, index, step) for index, step in enumerate(steps)]
+        futures = [self.pool.submit(job.user, step) for step in steps]
+        try:
+            for future in as_completed(futures):
+                future.result()
+                self._step_done(job)
+            results = [future.result() for future in futures]
+            data = self.pool.submit(job.user, finish, results).result()
+            self._write(self._result_path(job.id), data)
+            job.status = "done"
+            if checkpoints is not None:
+                checkpoints.discard(job.id)
+        except Exception as e:
+            # Noch wartende Schritte freigeben
+            for future in futures:
+                future.cancel()
+            job.status = "failed"
+            job.error = f"{type(e).__name__}: {e}"
+        job.finished_at = time.time()
+        self._save(job)
+        with self._lock:
+            for key in [key for key, job_id in self._flights.items() if job_id == job.id]:
+                del self._flights[key]
+
+    def get(self, job_id):
+        """Job aus diesem Prozess oder vom Datenträger; None, wenn unbekannt."""
+        with self._lock:
+            if job_id in self._jobs:
+                return self._jobs[job_id]
+        try:
+            with open(self._state_path(job_id), encoding="utf-8") as f:
+                job = Job.from_dict(json.load(f))
+        except (OSError, ValueError, KeyError):
+            return None
+        if job.active:
+            # Aktiv gespeichert, aber von keinem Thread dieses Prozesses bearbeitet
+            # (z. B. nach einem Neustart des Servers)
+            job.status = "interrupted"
+        return job
+
+    def result(self, job_id):
+        try:
+            with open(self._result_path(job_id), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def prune(self, max_age=MAX_AGE_SECONDS):
+        """Löscht Zustand und Ergebnis abgeschlossener Jobs, die älter als max_age sind."""
+        cutoff = time.time() - max_age
+        with self._lock:
+            running = {job_id for job_id, job in self._jobs.items() if job.active}
+            for job_id in [job_id for job_id, job in self._jobs.items() if not job.active]:
+                if self._jobs[job_id].created_at < cutoff:
+                    del self._jobs[job_id]
+        for name in os.listdir(self.directory):
+            job_id, ext = os.path.splitext(name)
+            if ext not in (".json", ".bin") or job_id in running:
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+_default_runner = None
+_default_lock = threading.Lock()
+
+
+def default_runner():
+    """Prozessweite Instanz, von allen Sitzungen geteilt."""
+    global _default_runner
+    with _default_lock:
+        if _default_runner is None:
+            _default_runner = JobRunner()
+        return _default_runner
+
+
+# -----------------------
+# UI
+# -----------------------
+
+def session_user():
+    """Kennung der aktuellen Sitzung; jede Sitzung hat eine eigene Warteschlange im FairPool."""
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else None
+
+
+def tracked_jobs():
+    value = st.query_params.get(QUERY_PARAM, "")
+    return [job_id for job_id in value.split(",") if job_id]
+
+
+def track(job_id):
+    """Merkt sich den Job in der URL, damit er nach einem Neuladen wieder angezeigt wird."""
+    st.query_params[QUERY_PARAM] = ",".join(tracked_jobs() + [job_id])
+
+
+def start_job(title, steps, finish, file_name, mime, job_id=None, checkpoints=None, flight_key=None):
+    job_id = default_runner().submit(
+        title, steps, finish, file_name, mime,
+        job_id=job_id, checkpoints=checkpoints, flight_key=flight_key, user=session_user()
+    )
+    if job_id not in tracked_jobs():
+        track(job_id)
+    return job_id
+
+
+def _render_jobs(job_ids):
+    """Zeichnet den Stand der Jobs; gibt (neu abgeholt, noch aktiv) zurück."""
+    runner = default_runner()
+    collected = st.session_state.setdefault("collected_jobs", set())
+    new_results = False
+    active_users = set()
+    for job_id in job_ids:
+        job = runner.get(job_id)
+        if job is None:
+            continue
+        if job.active:
+            active_users.add(job.user)
+            st.progress(job.done / job.total if job.total else 0.0, text=f"⏳ {job.title}: {job.done}/{job.total} Sätze")
+        elif job.status == "done":
+            if job_id not in collected:
+                data = runner.result(job_id)
+                if data is not None:
+                    artifacts.save_artifact(data, job.file_name, job.mime, job.title, job_id=job_id)
+                    new_results = True
+                collected.add(job_id)
+        elif job.status == "failed":
+            st.error(f"❌ {job.title}: {job.error}")
+        else:
+            st.warning(f"⚠️ {job.title}: abgebrochen nach {job.done}/{job.total} Sätzen (Server neu gestartet).")
+    if active_users:
+        _queue_caption(runner.pool, active_users)
+    return new_results, bool(active_users)
+
+
+def _queue_caption(pool, users):
+    """Auslastung des geteilten Pools und der Anteil dieser Seite."""
+    stats = pool.stats()
+    own_running, own_queued = map(sum, zip(*(pool.load(user) for user in users)))
+    others = stats["queued"] - own_queued
+    st.caption(
+        f"🧮 Warteschlange: {stats['running']}/{stats['workers']} Plätze belegt, "
+        f"{stats['queued']} Schritte wartend ({stats['users']} Sitzungen). "
+        f"Ihre: {own_running} in Arbeit, {own_queued} wartend"
+        + (f"; {others} von anderen Sitzungen werden abwechselnd mit Ihren bearbeitet." if others else ".")
+    )
+
+
+@st.fragment(run_every=POLL_SECONDS)
+def _live_jobs_panel(job_ids):
+    new_results, active = _render_jobs(job_ids)
+    if new_results or not active:
+        # Downloads werden außerhalb des Fragments gezeichnet; ohne aktive Jobs endet das Polling
+        st.rerun(scope="app")
+
+
+def show_jobs():
+    """Zeigt Fortschritt und Fehler der Jobs dieser Seite; fertige Ergebnisse landen in der Download-Ablage.
+
+    Solange ein Job läuft, wird nur dieses Fragment jede Sekunde neu ausgeführt.
+    Vor artifacts.show_download_buttons() aufrufen.
+    """
+    job_ids = tracked_jobs()
+    runner = default_runner()
+    jobs = [runner.get(job_id) for job_id in job_ids]
+    if any(job is not None and job.active for job in jobs):
+        _live_jobs_panel(job_ids)
+    else:
+        _render_jobs(job_ids)
@@ -0,0 +1,164 @@
+"""Aufgabensätze vom Sprachmodell (Groq) für v11 und den HTTP-Dienst.
+
+generate_set() fragt einen Satz beim Modell an, build_document() setzt die
+Antworten zu einem DOCX zusammen. generate_bank_questions() und
+parse_bank_questions() liefern einzelne, nach Thema markierte Aufgaben für
+die Aufgabenbank (question_bank.py). Alles läuft ohne Streamlit.
+"""
+import io
+import re
+
+import docx_writer
+
+MODEL = "llama-3.3-70b-versatile"
+
+DIFFICULTIES = {
+    "Schwer": "anspruchsvolle Aufgaben mit mehreren Denk- und Rechenschritten",
+    "Sehr schwer": "hohe kognitive Anforderungen, Vergleich, Begründung, Transfer",
+}
+
+TOPICS = ["Natürliche Zahlen", "Brüche", "Geometrie", "Größen und Einheiten", "Sachaufgaben", "Logik"]
+OTHER_TOPIC = "Sonstiges"
+
+# "12. ", "12) ", "- ", "* " am Zeilenanfang
+NUMBERING_RE = re.compile(r"^\s*(?:\d+\s*[.)]|[-*•])\s*")
+MIN_QUESTION_CHARS = 20
+FORBIDDEN_RE = re.compile(r"\b(?:Lösung|Lösungsweg|Hinweis|Tipp)\s*:", re.IGNORECASE)
+
+
+def groq_client(api_key):
+    """Groq-Client; das Paket wird erst hier importiert."""
+    from groq import Groq
+    return Groq(api_key=api_key)
+
+
+def generate_set(client, syllabus_text, set_idx, questions_per_set):
+    """Ein Aufgabensatz vom Modell; Nummerierung fortlaufend über alle Sätze."""
+    question_number_global = (set_idx - 1) * questions_per_set + 1
+
+    prompt = f"""
+Du bist ein sehr erfahrener deutscher Mathematiklehrer am Gymnasium
+mit Schwerpunkt auf leistungsstarken Lerngruppen.
+
+Erstelle **genau {questions_per_set} unterschiedliche Mathematikaufgaben**
+auf Grundlage des folgenden **Lehrplans Klasse 5 (Gymnasium Sachsen-Anhalt)**.
+
+🎯 ZIEL:
+- Inhaltlich Klasse 5
+- **Denk- und Anspruchsniveau mindestens Klasse 6**
+
+🔀 ZUFÄLLIGKEIT (sehr wichtig):
+- Verteile die Aufgaben **zufällig und ausgewogen** auf alle Lehrplanbereiche
+- Verwende **unterschiedliche Zahlenräume, Kontexte, Darstellungen**
+- Vermeide erkennbare Muster oder Wiederholungen
+- Jede Aufgabe soll sich klar von den anderen unterscheiden
+
+📘 DIDAKTISCHE VORGABEN (KMK-Stil):
+- Schulbuchnahe, präzise Formulierungen
+- Klare Arbeitsaufträge
+- Häufig mehrschrittige Lösungswege erforderlich
+- Vergleichs-, Begründungs- und Transferaufgaben einbauen
+
+📌 AUFGABENTYPEN (mischen):
+- Anspruchsvolle Textaufgaben
+- Mehrschrittige Rechnungen
+- Geometrische Denkaufgaben
+- Brüche & natürliche Zahlen kombiniert
+- Sachprobleme mit Auswahl relevanter Informationen
+- Logische Schlussfolgerungen und Vergleiche
+
+🚫 STRIKT:
+- **Keine Lösungen**
+- **Keine Hinweise**
+- **Keine Zwischenschritte**
+
+🔢 Nummerierung:
+- Fortlaufend ab {question_number_global}
+
+📚 Lehrplan:
+{syllabus_text}
+"""
+
+    response = client.chat.completions.create(
+        model=MODEL,
+        messages=[{"role": "user", "content": prompt}]
+    )
+    return response.choices[0].message.content
+
+
+def build_document(questions_texts):
+    """Setzt die Antworten aller Sätze zu einem DOCX zusammen."""
+    doc = docx_writer.new_document()
+    doc.add_heading("Mathematik – Anspruchsvolle Aufgabensätze", 0)
+    doc.add_paragraph(
+        "Lehrplan Klasse 5 (Gymnasium Sachsen-Anhalt)\n"
+        "Anforderungsniveau: Klasse 6 / erhöhte Kompetenzstufe\n"
+    )
+
+    for set_idx, questions_text in enumerate(questions_texts, 1):
+        doc.add_heading(f"Aufgabensatz {set_idx}", level=1)
+        for line in questions_text.split("\n"):
+            if line.strip():
+                doc.add_paragraph(line.strip())
+
+    output = io.BytesIO()
+    doc.save(output)
+    return output.getvalue()
+
+
+def generate_bank_questions(client, syllabus_text, difficulty, count=50):
+    """Rohantwort des Modells mit count Aufgaben im Format "Thema | Aufgabe", eine pro Zeile."""
+    prompt = f"""
+Du bist ein sehr erfahrener deutscher Mathematiklehrer am Gymnasium
+mit Schwerpunkt auf leistungsstarken Lerngruppen.
+
+Erstelle **genau {count} unterschiedliche Mathematikaufgaben**
+auf Grundlage des folgenden **Lehrplans Klasse 5 (Gymnasium Sachsen-Anhalt)**.
+
+- Inhaltlich Klasse 5, Denk- und Anspruchsniveau mindestens Klasse 6
+- Schwierigkeitsgrad: **{difficulty}** ({DIFFICULTIES[difficulty]})
+- Schulbuchnahe, präzise Formulierungen im KMK-Stil
+- Jede Aufgabe ist für sich verständlich und unterscheidet sich klar von den anderen
+- **Keine Lösungen, keine Hinweise, keine Zwischenschritte**
+
+📋 FORMAT (streng einhalten, sonst nichts ausgeben):
+Eine Aufgabe pro Zeile, ohne Nummer, in der Form
+Thema | Aufgabentext
+Thema ist genau einer dieser Begriffe: {", ".join(TOPICS)}
+
+📚 Lehrplan:
+{syllabus_text}
+"""
+
+    response = client.chat.completions.create(
+        model=MODEL,
+        messages=[{"role": "user", "content": prompt}]
+    )
+    return response.choices[0].message.content
+
+
+def parse_bank_questions(text):
+    """Prüft die Antwort zeilenweise; gibt [(Thema, Aufgabe)] ohne Nummerierung und Duplikate zurück.
+
+    Verworfen werden Zeilen ohne Trenner, zu kurze Aufgaben und solche mit Lösung oder Hinweis.
+    """
+    questions = []
+    seen = set()
+    for line in text.split("\n"):
+        topic, separator, question = line.partition("|")
+        if not separator:
+            continue
+        topic = NUMBERING_RE.sub("", topic).strip(" *")
+        question = " ".join(NUMBERING_RE.sub("", question).split())
+        if len(question) < MIN_QUESTION_CHARS or FORBIDDEN_RE.search(question):
+            continue
+        if question.lower() in seen:
+            continue
+        seen.add(question.lower())
+        questions.append((topic if topic in TOPICS else OTHER_TOPIC, question))
+    return questions
+
+
+def number_questions(questions, start):
+    """Aufgaben als Text eines Satzes, fortlaufend nummeriert ab start (wie generate_set)."""
+    return "\n".join(f"{number}. {question}" for number, question in enumerate(questions, start))
@@ -0,0 +1,169 @@
+import fcntl
+import hashlib
+import os
+import struct
+import tempfile
+import threading
+from multiprocessing import shared_memory
+
+# -----------------------
+# Gemeinsamer Aufgaben-Pool im Shared Memory
+# -----------------------
+#
+# Mehrere Worker-Prozesse (batch_generate, generation_service) erzeugen Sätze
+# parallel. Damit eine Aufgabe in einem Durchlauf nur einmal vorkommt, liegt
+# der Eindeutigkeits-Index mit allen angenommenen Aufgaben in einem Segment
+# von multiprocessing.shared_memory; jeder Prozess hängt sich über den Namen
+# an und liest die Aufgaben als memoryview, ohne pickle.
+#
+# Aufbau des Segments:
+#
+#   Kopf      magic, Kapazität, Tabellengröße, Arena-Größe, Anzahl, belegte Arena, verworfen
+#   Tabelle   uint64-Fingerabdrücke, offene Adressierung (0 = frei)
+#   Einträge  je Aufgabe: uint32 Offset, uint32 Länge, uint32 Generator-Index
+#   Arena     UTF-8-Texte hintereinander
+#
+# Schreiben ist über eine Sperrdatei (flock) serialisiert; Lesen braucht keine
+# Sperre, weil die Anzahl erst nach dem vollständigen Eintrag erhöht wird.
+
+MAGIC = 0x4D415448  # "MATH"
+HEADER = struct.Struct("<IIIIIII")
+ENTRY = struct.Struct("<III")
+BYTES_PER_PROBLEM = 256
+
+# Wie oft ein Generator neu gezogen wird, bevor eine Wiederholung hingenommen wird
+MAX_REDRAWS = 20
+
+
+class ProblemPoolFull(Exception):
+    pass
+
+
+def fingerprint(text):
+    value = int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+    return value or 1
+
+
+class SharedProblemPool:
+    """Eindeutige Aufgaben in einem Shared-Memory-Segment; mit create() anlegen, mit attach() anhängen."""
+
+    def __init__(self, shm, owner):
+        self.shm = shm
+        self.owner = owner
+        magic, self.capacity, self.table_size, self.arena_size, _, _, _ = HEADER.unpack_from(shm.buf, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{shm.name} ist kein Aufgaben-Pool")
+        table_start = HEADER.size
+        entries_start = table_start + 8 * self.table_size
+        self._arena_start = entries_start + ENTRY.size * self.capacity
+        self._table = shm.buf[table_start:entries_start].cast("Q")
+        self._entries = shm.buf[entries_start:self._arena_start]
+        self._arena = shm.buf[self._arena_start:self._arena_start + self.arena_size]
+        self._lock_path = os.path.join(tempfile.gettempdir(), f"{shm.name.lstrip('/')}.lock")
+        self._thread_lock = threading.Lock()
+
+    @classmethod
+    def create(cls, capacity, arena_size=None, name=None):
+        """Legt ein neues Segment für bis zu capacity Aufgaben an; der Ersteller gibt es mit unlink() frei."""
+        table_size = 1 << max(4, (2 * capacity - 1).bit_length())
+        arena_size = arena_size or capacity * BYTES_PER_PROBLEM
+        size = HEADER.size + 8 * table_size + ENTRY.size * capacity + arena_size
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        HEADER.pack_into(shm.buf, 0, MAGIC, capacity, table_size, arena_size, 0, 0, 0)
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name):
+        # Kindprozesse teilen den resource_tracker des Erstellers; das Segment
+        # wird erst mit dessen unlink() freigegeben
+        return cls(shared_memory.SharedMemory(name=name), owner=False)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def _counts(self):
+        return HEADER.unpack_from(self.shm.buf, 0)[4:]
+
+    def __len__(self):
+        return self._counts()[0]
+
+    def _slot(self, value):
+        # Position des Fingerabdrucks oder des ersten freien Platzes (lineares Sondieren)
+        mask = self.table_size - 1
+        slot = value & mask
+        while self._table[slot] not in (0, value):
+            slot = (slot + 1) & mask
+        return slot
+
+    def __contains__(self, text):
+        value = fingerprint(text)
+        return self._table[self._slot(value)] == value
+
+    def add(self, text, generator=0):
+        """Nimmt text auf, falls noch nicht vorhanden. Gibt False bei einer Wiederholung zurück.
+
+        Löst ProblemPoolFull aus, wenn Kapazität oder Arena erschöpft sind.
+        """
+        value = fingerprint(text)
+        data = text.encode("utf-8")
+        with self._thread_lock, open(self._lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            count, used, rejected = self._counts()
+            slot = self._slot(value)
+            if self._table[slot] == value:
+                HEADER.pack_into(self.shm.buf, 0, MAGIC, self.capacity, self.table_size, self.arena_size, count, used, rejected + 1)
+                return False
+            if count >= self.capacity or used + len(data) > self.arena_size:
+                raise ProblemPoolFull(f"Pool {self.name} ist voll ({count} Aufgaben)")
+            self._arena[used:used + len(data)] = data
+            ENTRY.pack_into(self._entries, ENTRY.size * count, used, len(data), generator)
+            self._table[slot] = value
+            # Anzahl zuletzt: Leser sehen nur vollständige Einträge
+            HEADER.pack_into(self.shm.buf, 0, MAGIC, self.capacity, self.table_size, self.arena_size, count + 1, used + len(data), rejected)
+        return True
+
+    def record(self, index):
+        """(memoryview auf den UTF-8-Text, Generator-Index) ohne Kopie."""
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        offset, length, generator = ENTRY.unpack_from(self._entries, ENTRY.size * index)
+        return self._arena[offset:offset + length], generator
+
+    def text(self, index):
+        return bytes(self.record(index)[0]).decode("utf-8")
+
+    def stats(self):
+        count, used, rejected = self._counts()
+        return {"problems": count, "capacity": self.capacity, "arena_bytes": used, "rejected": rejected}
+
+    def unique(self, generator, generator_index=0):
+        """Generator, der bis zu MAX_REDRAWS-mal neu zieht, bis seine Aufgabe noch nicht im Pool ist."""
+        def draw():
+            for _ in range(MAX_REDRAWS):
+                problem = generator()
+                if self.add(problem, generator_index):
+                    return problem
+            return problem  # Wertebereich des Generators erschöpft: Wiederholung hinnehmen
+        return draw
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        # memoryviews zuerst freigeben, sonst kann das Segment nicht geschlossen werden
+        for view in (self._table, self._entries, self._arena):
+            view.release()
+        self.shm.close()
+
+    def unlink(self):
+        self.close()
+        self.shm.unlink()
+        try:
+            os.remove(self._lock_path)
+        except FileNotFoundError:
+            pass
+
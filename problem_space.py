@@ -0,0 +1,216 @@
+import functools
+import random
+
+# -----------------------
+# Beschriebene Parameterräume
+# -----------------------
+#
+# Ein Generator wird als Liste von Varianten beschrieben; jede Variante hat
+# ein Gewicht (Anteil wie bisher im Code) und benannte Parameter, jeweils
+# Choice([...]), Range(a, b) oder eine Konstante. Damit ist die Zahl der
+# verschiedenen Aufgaben exakt bekannt, und jede Aufgabe hat einen Index
+# 0 <= i < Größe der Variante. Voraussetzung ist, dass die Textfunktion
+# verschiedene Parameter auch zu verschiedenen Texten macht.
+#
+# Ein einzelner Aufruf zieht wie bisher zufällig (über das Modul random, also
+# reproduzierbar mit random.seed). Der Sampler zieht dagegen ohne Zurücklegen:
+# pro Variante über eine zufällige Permutation der Indizes, die in O(1) pro
+# Zug ausgewertet wird, ohne die Indizes aufzuzählen.
+
+
+class Choice:
+    def __init__(self, values):
+        self.values = list(values)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, index):
+        return self.values[index]
+
+
+class Range:
+    """Ganze Zahlen von low bis high einschließlich (wie random.randint)."""
+
+    def __init__(self, low, high):
+        self.low = low
+        self.high = high
+
+    def __len__(self):
+        return self.high - self.low + 1
+
+    def __getitem__(self, index):
+        return self.low + index
+
+
+class Variant:
+    def __init__(self, weight, **fields):
+        self.weight = weight
+        self.fields = {name: field if isinstance(field, (Choice, Range)) else Choice([field]) for name, field in fields.items()}
+        self.size = 1
+        for field in self.fields.values():
+            self.size *= len(field)
+
+    def params(self, index):
+        """Parameter zum Index (gemischtes Stellenwertsystem über die Felder)."""
+        params = {}
+        for name, field in reversed(self.fields.items()):
+            index, digit = divmod(index, len(field))
+            params[name] = field[digit]
+        return params
+
+
+class ProblemGenerator:
+    """Generator mit beschriebenem Parameterraum; aufrufbar wie die bisherigen Generatorfunktionen."""
+
+    def __init__(self, render, variants, label):
+        functools.update_wrapper(self, render)
+        self.render = render
+        self.variants = variants
+        self.label = label
+        self.cardinality = sum(variant.size for variant in variants)
+
+    def problem(self, variant_index, index):
+        variant = self.variants[variant_index]
+        return self.render(**variant.params(index))
+
+    def __call__(self):
+        variant_index = _pick([variant.weight for variant in self.variants])
+        return self.problem(variant_index, random.randrange(self.variants[variant_index].size))
+
+
+def generator(*variants, label):
+    """Dekorator: macht aus einer Textfunktion (Parameter als Schlüsselwörter) einen ProblemGenerator."""
+    return lambda render: ProblemGenerator(render, list(variants), label)
+
+
+def seed_set(seed, index):
+    """Setzt den Zufallsgenerator für einen Satz; Ergebnis hängt nur von Seed und Satznummer ab."""
+    random.seed(f"{seed}:{index}")
+
+
+def _pick(weights):
+    # Wie random.choices(range(len(weights)), weights), aber ohne Liste als Ergebnis
+    point = random.random() * sum(weights)
+    for i, weight in enumerate(weights):
+        point -= weight
+        if point < 0 and weight > 0:
+            return i
+    return max(i for i, weight in enumerate(weights) if weight > 0)
+
+
+# -----------------------
+# Ziehen ohne Zurücklegen
+# -----------------------
+
+MASK64 = (1 << 64) - 1
+FEISTEL_ROUNDS = 4
+
+
+def _mix(value):
+    # splitmix64-Finalisierer
+    value = (value ^ (value >> 30)) * 0xBF58476D1CE4E5B9 & MASK64
+    value = (value ^ (value >> 27)) * 0x94D049BB133111EB & MASK64
+    return value ^ (value >> 31)
+
+
+class Permutation:
+    """Zufällige Permutation von range(size), bestimmt durch key; permutation[i] in O(1) (erwartet).
+
+    Ein Feistel-Netz über die nächste Zweierpotenz mit gerader Bitzahl ist eine
+    Bijektion; Werte außerhalb von range(size) werden erneut verschlüsselt
+    ("cycle walking"), im Mittel weniger als viermal.
+    """
+
+    def __init__(self, size, key):
+        self.size = size
+        self.half_bits = max(1, ((size - 1).bit_length() + 1) // 2)
+        self.half_mask = (1 << self.half_bits) - 1
+        self.keys = [_mix((key * FEISTEL_ROUNDS + i) & MASK64) for i in range(FEISTEL_ROUNDS)]
+
+    def _encrypt(self, value):
+        left, right = value >> self.half_bits, value & self.half_mask
+        for round_key in self.keys:
+            left, right = right, left ^ (_mix(right ^ round_key) & self.half_mask)
+        return (left << self.half_bits) | right
+
+    def __getitem__(self, index):
+        if not 0 <= index < self.size:
+            raise IndexError(index)
+        value = self._encrypt(index)
+        while value >= self.size:
+            value = self._encrypt(value)
+        return value
+
+
+class Sampler:
+    """Zieht Aufgaben ohne Zurücklegen aus beschriebenen Generatoren.
+
+    Pro Variante läuft ein Zähler j über die Positionen offset + j * stride der
+    Permutation. Mit stride = Anzahl Sätze und offset = Nummer des Satzes (ab 0)
+    bekommen die Sätze eines Laufs disjunkte Aufgaben, ohne voneinander zu
+    wissen. Ist eine Variante für diesen Satz erschöpft, wird nur noch aus den
+    übrigen gezogen; sind alle erschöpft, zieht der Generator wieder frei
+    (Wiederholungen sind dann unvermeidbar). Generatoren ohne Beschreibung
+    werden unverändert aufgerufen.
+    """
+
+    def __init__(self, generators, key, stride=1, offset=0):
+        self.stride = stride
+        self.offset = offset
+        self._state = {}
+        for g, generator in enumerate(generators):
+            if isinstance(generator, ProblemGenerator):
+                self._state[generator] = [
+                    [Permutation(variant.size, _mix(key * 1000003 + g * 1009 + v)), 0]
+                    for v, variant in enumerate(generator.variants)
+                ]
+        self._generators = list(generators)
+
+    def _position(self, draws):
+        return self.offset + draws * self.stride
+
+    def draw(self, generator):
+        state = self._state.get(generator)
+        if state is None:
+            return generator()
+        weights = [
+            variant.weight if self._position(draws) < variant.size else 0
+            for variant, (_, draws) in zip(generator.variants, state)
+        ]
+        if not any(weights):
+            return generator()
+        variant_index = _pick(weights)
+        permutation, draws = state[variant_index]
+        state[variant_index][1] = draws + 1
+        return generator.problem(variant_index, permutation[self._position(draws)])
+
+    def generators(self):
+        """Die Generatoren in gleicher Reihenfolge, jeweils ohne Zurücklegen."""
+        return [functools.partial(self.draw, generator) for generator in self._generators]
+
+
+def issue_sampler(generators, key, set_number, num_problems, per_set):
+    """Sampler für Satz set_number einer Ausgabe, deren Sätze sich key teilen.
+
+    Satz k zieht pro Variante aus einem eigenen Block von Positionen der
+    Permutation, so lang wie die höchste Zahl Aufgaben eines Generators in
+    einem Satz (per_set plus alle freien Plätze). Anders als mit stride =
+    Anzahl Sätze muss die Anzahl dafür nicht feststehen; der Vorrat in
+    worksheet_pool.py rendert Sätze, bevor jemand klickt.
+    """
+    block = num_problems - per_set * (len(generators) - 1)
+    return Sampler(generators, key, stride=1, offset=(set_number - 1) * block)
+
+
+def described(generators):
+    return all(isinstance(generator, ProblemGenerator) for generator in generators)
+
+
+def repeated_generators(generators, num_sets, per_set):
+    """[(Generator, benötigt)] für alle Generatoren, die weniger als num_sets * per_set verschiedene Aufgaben haben."""
+    needed = num_sets * per_set
+    return [
+        (generator, needed) for generator in generators
+        if isinstance(generator, ProblemGenerator) and generator.cardinality < needed
+    ]
@@ -0,0 +1,276 @@
+"""Aufgabenbank: vorab erzeugte LLM-Aufgaben in SQLite, für v11.
+
+    python question_bank.py build KEY --difficulty "Sehr schwer" --target 1000
+    python question_bank.py stats
+
+KEY ist der Schlüssel eines Lehrplans aus der Lehrplan-Bibliothek (siehe
+python syllabus_library.py list); der Groq-Schlüssel kommt aus GROQ_API_KEY.
+"build" eignet sich für einen nächtlichen Lauf; zusätzlich füllt v11 einen
+Eimer im Hintergrund nach, sobald er für eine Lehrkraft knapp wird.
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from contextlib import closing
+
+import llm_worksheets
+from storage import DATA_DIR
+from syllabus import content_hash
+
+# -----------------------
+# Aufgabenbank
+# -----------------------
+#
+# Jede Aufgabe gehört zu einem Eimer (Lehrplan-Hash, Schwierigkeit) und ist
+# nach Thema markiert. Ein Satz wird in einer Transaktion gezogen, reihum
+# über die Themen gemischt, und für die Lehrkraft als ausgegeben vermerkt;
+# dieselbe Lehrkraft erhält eine Aufgabe nie zweimal. Reicht der Vorrat
+# nicht für einen ganzen Satz, fragt v11 wie bisher das Modell.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS questions (
+    id INTEGER PRIMARY KEY,
+    syllabus_hash TEXT NOT NULL,
+    difficulty TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    text TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    UNIQUE (syllabus_hash, difficulty, text)
+);
+CREATE INDEX IF NOT EXISTS questions_by_topic ON questions (syllabus_hash, difficulty, topic);
+CREATE TABLE IF NOT EXISTS served (
+    user TEXT NOT NULL,
+    question_id INTEGER NOT NULL REFERENCES questions (id),
+    served_at REAL NOT NULL,
+    PRIMARY KEY (user, question_id)
+);
+"""
+
+BANK_PATH = os.path.join(DATA_DIR, "question_bank.sqlite3")
+QUERY_PARAM = "user"
+
+# Nachfüllen im Hintergrund, wenn einer Lehrkraft weniger als LOW_WATER
+# unbenutzte Aufgaben bleiben; ein Lauf erzeugt REFILL_QUESTIONS neue
+LOW_WATER = 100
+REFILL_QUESTIONS = 200
+QUESTIONS_PER_CALL = 50
+
+
+class QuestionBank:
+    """Geprüfte Aufgaben pro (Lehrplan-Hash, Schwierigkeit); von allen Sitzungen geteilt."""
+
+    def __init__(self, path=BANK_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._connect() as db:
+            db.executescript(SCHEMA)
+
+    def _connect(self):
+        # Eine Verbindung pro Aufruf: die Bank wird aus mehreren Threads genutzt.
+        return closing(sqlite3.connect(self.path, timeout=30, isolation_level=None))
+
+    def add(self, syllabus_hash, difficulty, questions):
+        """Speichert [(Thema, Aufgabe)]; bereits vorhandene Aufgaben werden übersprungen. Gibt die Zahl neuer zurück."""
+        now = time.time()
+        with self._connect() as db:
+            before = db.total_changes
+            db.execute("BEGIN")
+            db.executemany(
+                "INSERT OR IGNORE INTO questions (syllabus_hash, difficulty, topic, text, created_at) VALUES (?, ?, ?, ?, ?)",
+                [(syllabus_hash, difficulty, topic, text, now) for topic, text in questions],
+            )
+            db.execute("COMMIT")
+            return db.total_changes - before
+
+    def available(self, syllabus_hash, difficulty, user=None):
+        """Zahl der Aufgaben im Eimer; mit user nur die, die diese Lehrkraft noch nicht erhalten hat."""
+        with self._connect() as db:
+            return db.execute(
+                "SELECT COUNT(*) FROM questions q WHERE syllabus_hash = ? AND difficulty = ? "
+                "AND NOT EXISTS (SELECT 1 FROM served s WHERE s.user = ? AND s.question_id = q.id)",
+                (syllabus_hash, difficulty, user),
+            ).fetchone()[0]
+
+    def sample(self, syllabus_hash, difficulty, user, count):
+        """Zieht count Aufgaben, die user noch nicht erhalten hat, und vermerkt sie als ausgegeben.
+
+        Gibt die Aufgabentexte zurück oder None, wenn der Eimer nicht mehr genug enthält.
+        Gezählt und gezogen wird in SQLite (pro Thema ORDER BY random() LIMIT);
+        nach Python kommen nur die count gezogenen Aufgaben, nicht der ganze Eimer.
+        """
+        unserved = (
+            "FROM questions q WHERE syllabus_hash = ? AND difficulty = ? "
+            "AND NOT EXISTS (SELECT 1 FROM served s WHERE s.user = ? AND s.question_id = q.id)"
+        )
+        with self._connect() as db:
+            # IMMEDIATE: zwei gleichzeitige Anfragen derselben Lehrkraft ziehen nicht dieselben Aufgaben
+            db.execute("BEGIN IMMEDIATE")
+            counts = db.execute(f"SELECT topic, COUNT(*) {unserved} GROUP BY topic", (syllabus_hash, difficulty, user)).fetchall()
+            if sum(available for _, available in counts) < count:
+                db.execute("ROLLBACK")
+                return None
+            chosen = []
+            for topic, share in _topic_shares(counts, count).items():
+                chosen += db.execute(
+                    f"SELECT id, text {unserved} AND topic = ? ORDER BY random() LIMIT ?",
+                    (syllabus_hash, difficulty, user, topic, share),
+                ).fetchall()
+            random.shuffle(chosen)
+            now = time.time()
+            db.executemany(
+                "INSERT INTO served (user, question_id, served_at) VALUES (?, ?, ?)",
+                [(user, question_id, now) for question_id, _ in chosen],
+            )
+            db.execute("COMMIT")
+        return [text for _, text in chosen]
+
+    def stats(self):
+        """[(Lehrplan-Hash, Schwierigkeit, Thema, Anzahl)] über alle Eimer."""
+        with self._connect() as db:
+            return db.execute(
+                "SELECT syllabus_hash, difficulty, topic, COUNT(*) FROM questions "
+                "GROUP BY syllabus_hash, difficulty, topic ORDER BY syllabus_hash, difficulty, topic"
+            ).fetchall()
+
+
+def _topic_shares(counts, count):
+    # Reihum über die Themen (in zufälliger Reihenfolge), solange ein Thema noch Aufgaben hat
+    remaining = dict(counts)
+    topics = list(remaining)
+    random.shuffle(topics)
+    shares = dict.fromkeys(topics, 0)
+    while count:
+        for topic in topics:
+            if remaining[topic] and count:
+                remaining[topic] -= 1
+                shares[topic] += 1
+                count -= 1
+    return {topic: share for topic, share in shares.items() if share}
+
+
+def bank_or_model_set(bank, client, syllabus_text, difficulty, user, set_idx, questions_per_set):
+    """Text eines Satzes: aus der Bank, sonst vom Modell (wie llm_worksheets.generate_set).
+
+    Als Job-Schritt gedacht: gezogen und als ausgegeben vermerkt wird erst,
+    wenn der Schritt läuft, und der Job legt den Text gleich danach als
+    Checkpoint ab. Hängt sich ein Klick an einen laufenden Job an, wird
+    nichts gezogen; scheitert der Job, liefert der nächste Versuch die
+    gezogenen Aufgaben aus dem Checkpoint.
+    """
+    syllabus_hash = content_hash(syllabus_text.encode("utf-8"))
+    questions = bank.sample(syllabus_hash, difficulty, user, questions_per_set)
+    if questions is None:
+        return llm_worksheets.generate_set(client, syllabus_text, set_idx, questions_per_set)
+    return llm_worksheets.number_questions(questions, (set_idx - 1) * questions_per_set + 1)
+
+
+_refilling = set()
+_refilling_lock = threading.Lock()
+
+
+def refill_in_background(bank, client, syllabus_text, difficulty, user):
+    """Startet fill() in einem Hintergrund-Thread, falls user weniger als LOW_WATER Aufgaben bleiben.
+
+    Pro Eimer läuft höchstens ein Nachfüllen gleichzeitig.
+    """
+    syllabus_hash = content_hash(syllabus_text.encode("utf-8"))
+    if bank.available(syllabus_hash, difficulty, user) >= LOW_WATER:
+        return
+    key = (bank.path, syllabus_hash, difficulty)
+    with _refilling_lock:
+        if key in _refilling:
+            return
+        _refilling.add(key)
+
+    def run():
+        try:
+            fill(bank, client, syllabus_text, difficulty, REFILL_QUESTIONS)
+        except Exception:
+            pass  # die nächste Anfrage versucht es erneut
+        finally:
+            with _refilling_lock:
+                _refilling.discard(key)
+
+    threading.Thread(target=run, name="question-bank", daemon=True).start()
+
+
+_default_bank = None
+_default_lock = threading.Lock()
+
+
+def default_bank():
+    """Prozessweite Instanz, von allen Sitzungen geteilt."""
+    global _default_bank
+    with _default_lock:
+        if _default_bank is None:
+            _default_bank = QuestionBank()
+        return _default_bank
+
+
+# -----------------------
+# UI
+# -----------------------
+
+def current_user():
+    """Kennung der Lehrkraft für "keine Wiederholung".
+
+    Mit Streamlit-Login die E-Mail-Adresse, sonst eine zufällige ID in der URL
+    (?user=...), die mit einem Lesezeichen erhalten bleibt.
+    """
+    import streamlit as st  # erst hier: "build" und "stats" laufen ohne Streamlit
+    if st.user.get("is_logged_in") and st.user.get("email"):
+        return st.user.get("email")
+    user = st.query_params.get(QUERY_PARAM)
+    if not user:
+        user = st.query_params[QUERY_PARAM] = uuid.uuid4().hex[:12]
+    return user
+
+
+# -----------------------
+# Kommandozeile
+# -----------------------
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="Eimer eines Lehrplans füllen")
+    build.add_argument("key", help="Schlüssel aus der Lehrplan-Bibliothek (Präfix genügt)")
+    build.add_argument("--difficulty", choices=sorted(llm_worksheets.DIFFICULTIES), action="append")
+    build.add_argument("--target", type=int, default=1000, help="gewünschte Aufgaben pro Eimer")
+    commands.add_parser("stats", help="Aufgaben pro Eimer und Thema")
+    args = parser.parse_args(argv)
+
+    bank = default_bank()
+    if args.command == "stats":
+        for syllabus_hash, difficulty, topic, count in bank.stats():
+            print(f"{syllabus_hash[:12]}  {difficulty:12} {topic:22} {count:6}")
+        return 0
+
+    from syllabus_library import SyllabusLibrary
+    library = SyllabusLibrary()
+    keys = [entry["key"] for entry in library.entries() if entry["key"].startswith(args.key)]
+    if len(keys) != 1:
+        print(f"Kein eindeutiger Lehrplan für {args.key!r} ({len(keys)} Treffer)", file=sys.stderr)
+        return 1
+    syllabus_text = library.get(keys[0])["text"]
+    syllabus_hash = content_hash(syllabus_text.encode("utf-8"))
+    api_key = os.environ.get("GROQ_API_KEY")
+    if not api_key:
+        print("GROQ_API_KEY ist nicht gesetzt", file=sys.stderr)
+        return 1
+    client = llm_worksheets.groq_client(api_key)
+
+    for difficulty in args.difficulty or sorted(llm_worksheets.DIFFICULTIES):
+        missing = args.target - bank.available(syllabus_hash, difficulty)
+        added = fill(bank, client, syllabus_text, difficulty, missing) if missing > 0 else 0
+        print(f"{difficulty}: {added} neue Aufgaben, {bank.available(syllabus_hash, difficulty)} im Eimer")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
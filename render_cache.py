@@ -0,0 +1,171 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import cache_backend
+import docx_writer
+from storage import DATA_DIR
+
+# -----------------------
+# Inhaltsadressierter Cache für fertige Dokumente
+# -----------------------
+#
+# Schlüssel ist ein SHA-256 über die Eingaben (z. B. Seed und Satznummer), die
+# Vorlage und den Quelltext des erzeugenden Moduls. Ändert sich eine
+# Überschrift im Code oder die Vorlage, ergeben sich automatisch neue
+# Schlüssel; alte Einträge altern über die LRU-Verdrängung heraus.
+#
+# Genutzt wird er nur, wo sich Eingaben wiederholen: "seed_log.py regenerate"
+# und der HTTP-Dienst bei ausdrücklich angegebenem seed. Die Apps ziehen bei
+# jedem Klick neue Seeds, ein Cache brächte dort keine Treffer.
+#
+# Vor dem Rendern wird zusätzlich der gemeinsame Cache (cache_backend.py,
+# Namensraum "documents") gefragt, damit Replikate ihre Dokumente teilen.
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+_digests = {}
+_digests_lock = threading.Lock()
+
+
+def file_digest(path):
+    """SHA-256 einer Datei, einmal pro Prozess berechnet."""
+    with _digests_lock:
+        if path not in _digests:
+            with open(path, "rb") as f:
+                _digests[path] = hashlib.sha256(f.read()).hexdigest()
+        return _digests[path]
+
+
+def document_key(source_file, *records):
+    """Schlüssel für ein Dokument aus dem erzeugenden Modul und beliebigen JSON-fähigen Daten."""
+    payload = json.dumps(
+        [
+            file_digest(docx_writer.TEMPLATE_PATH),
+            file_digest(docx_writer.__file__),
+            file_digest(os.path.abspath(source_file)),
+            records,
+        ],
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class RenderCache:
+    """LRU-Cache für Dokument-Bytes auf der Festplatte, begrenzt auf `max_bytes`.
+
+    Die LRU-Reihenfolge wird im Speicher gehalten und beim Start aus den
+    Änderungszeiten der Dateien wiederhergestellt. Eine Instanz pro Prozess
+    wird von allen Streamlit-Sitzungen gemeinsam genutzt (siehe default_cache).
+    """
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory or os.path.join(DATA_DIR, "render_cache")
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # Schlüssel -> Größe in Bytes
+        self._size = 0
+        os.makedirs(self.directory, exist_ok=True)
+        self._load_index()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".bin")
+
+    def _load_index(self):
+        found = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".bin"):
+                    stat = os.stat(os.path.join(root, name))
+                    found.append((stat.st_mtime, name[:-4], stat.st_size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._size += size
+        self._evict()
+
+    def _evict(self):
+        while self._size > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self._size -= size
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            with self._lock:
+                self._size -= self._entries.pop(key, 0)
+            return None
+
+    def put(self, key, data):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._size += len(data) - self._entries.pop(key, 0)
+            self._entries[key] = len(data)
+            self._evict()
+
+    def __contains__(self, key):
+        """Liegt key auf diesem Rechner vor (ohne den gemeinsamen Cache zu fragen)?"""
+        with self._lock:
+            return key in self._entries
+
+    def store(self, key, data):
+        """Legt frisch gerenderte Bytes lokal und im gemeinsamen Cache ab."""
+        cache_backend.default_backend().set("documents", key, data)
+        self.put(key, data)
+
+    def get_or_render(self, key, render):
+        """Liefert die gespeicherten Bytes (lokal oder aus dem gemeinsamen Cache) oder ruft render() auf."""
+        data = self.get(key)
+        if data is None:
+            data = cache_backend.default_backend().get("documents", key)
+            if data is None:
+                data = render()
+                self.store(key, data)
+            else:
+                self.put(key, data)
+        return data
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def default_cache():
+    """Prozessweite Instanz, von allen Sitzungen geteilt."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = RenderCache()
+        return _default_cache
@@ -0,0 +1,282 @@
+"""Protokoll ausgegebener Aufgabensätze; jede Datei lässt sich aus dem Seed neu erzeugen.
+
+    python seed_log.py list [--issue ID]
+    python seed_log.py regenerate ID --output wiederhergestellt/
+    python seed_log.py regenerate ID --index 3 --output Set_3.docx   (nur ZIP-Ausgaben)
+
+Die prozeduralen Apps (v1, v2, v4, streamlit_app) erzeugen alle Sätze eines
+Downloads aus einem gemeinsamen Seed und der Satznummer und schreiben pro Satz eine Zeile nach data/issued_sets.log, statt
+das Dokument aufzubewahren (etwa 60 Bytes statt einiger zehn KB). "regenerate"
+erzeugt daraus byte-identisch dieselbe Datei: bei ZIP-Downloads die einzelnen
+Dokumente, bei Einzeldokumenten das ganze Dokument mit allen Sätzen.
+
+Das geht nur mit demselben Code-Stand. Die Version ist ein Hash über die App
+(Generatoren, Überschriften), die Module, die Aufgaben ziehen oder Dokumente
+schreiben (GENERATION_MODULES), die Vorlage und die python-docx-Version;
+Oberfläche, Jobs und dieses Protokoll gehören nicht dazu. Zu jeder Version steht der
+Git-Commit im Protokoll, der sich bei Bedarf mit "git worktree add" auschecken
+lässt.
+"""
+import argparse
+import hashlib
+import os
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from importlib import metadata
+
+import docx_writer
+import worker_pool
+import worksheet_pool
+import render_cache
+from render_cache import file_digest
+from storage import DATA_DIR
+
+# -----------------------
+# Protokoll
+# -----------------------
+#
+# Eine Zeile pro Satz, Tabulator-getrennt, nur angehängt:
+#
+#   <Zeit> <Version> <App> <Ausgabe-ID> <zip|docx> <Seed> <Satznummer>
+#
+# und einmal pro Code-Version:
+#
+#   #version <Version> <Git-Commit oder -> <python-docx-Version>
+#
+# Alle Sätze eines Downloads teilen sich Ausgabe-ID und Seed; "docx" heißt,
+# sie wurden zusammen als ein Dokument ausgegeben.
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+LOG_PATH = os.path.join(DATA_DIR, "issued_sets.log")
+VERSION_PREFIX = "#version"
+
+# Bestimmen zusammen mit der App die Bytes eines Satzes: Seed setzen und
+# Sampler, Aufteilung auf die Kategorien, Dokument schreiben
+GENERATION_MODULES = ["problem_space.py", "worksheet_pool.py", "worksheet_pipeline.py", "docx_writer.py"]
+
+
+def _python_docx_version():
+    try:
+        return metadata.version("python-docx")
+    except metadata.PackageNotFoundError:
+        return "-"
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short=12", "HEAD"],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip() or "-"
+    except (OSError, subprocess.CalledProcessError):
+        return "-"
+
+
+def code_version(path):
+    """Kurzer Hash über alles, was die Bytes eines Satzes der App path bestimmt."""
+    parts = [
+        file_digest(os.path.abspath(path)),
+        *(file_digest(os.path.join(ROOT, name)) for name in GENERATION_MODULES),
+        file_digest(docx_writer.TEMPLATE_PATH),
+        _python_docx_version(),
+    ]
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()[:12]
+
+
+def app_name(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+class Issue:
+    """Ein Download (alle Sätze eines Klicks): ID, gemeinsamer Seed und schon gerenderte Dokumente."""
+
+    def __init__(self, seed, ready=None):
+        self.id = uuid.uuid4().hex[:8]
+        self.seed = seed
+        self.ready = ready if ready is not None else {}
+
+
+def new_issue(pool=None):
+    """Neue Ausgabe; mit pool (ZIP-Download) übernimmt sie einen vorbereiteten Lauf aus dem Vorrat."""
+    if pool is None:
+        return Issue(worksheet_pool.new_seed())
+    return Issue(*pool.take())
+
+
+class SeedLog:
+    """Nur anhängendes Textprotokoll; von allen Sitzungen geteilt (siehe default_log)."""
+
+    def __init__(self, path=LOG_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._known_versions = None
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+    def _read_lines(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return [line.rstrip("\n").split("\t") for line in f if line.strip()]
+        except FileNotFoundError:
+            return []
+
+    def record(self, path, issue, output_format, seed, set_number):
+        version = code_version(path)
+        lines = []
+        with self._lock:
+            if self._known_versions is None:
+                self._known_versions = {fields[1] for fields in self._read_lines() if fields[0] == VERSION_PREFIX}
+            if version not in self._known_versions:
+                lines.append(f"{VERSION_PREFIX}\t{version}\t{_git_commit()}\t{_python_docx_version()}\n")
+                self._known_versions.add(version)
+            lines.append(f"{int(time.time())}\t{version}\t{app_name(path)}\t{issue}\t{output_format}\t{seed}\t{set_number}\n")
+            # Ein write() im Anhängemodus: Zeilen mehrerer Prozesse vermischen sich nicht
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("".join(lines))
+
+    def versions(self):
+        """Version -> (Git-Commit, python-docx-Version)."""
+        return {fields[1]: (fields[2], fields[3]) for fields in self._read_lines() if fields[0] == VERSION_PREFIX}
+
+    def entries(self, issue=None):
+        """Protokollierte Sätze als Dicts, optional nur einer Ausgabe-ID."""
+        entries = []
+        for fields in self._read_lines():
+            if fields[0] == VERSION_PREFIX:
+                continue
+            timestamp, version, app, entry_issue, output_format, seed, set_number = fields
+            if issue is None or entry_issue == issue:
+                entries.append({
+                    "time": int(timestamp), "version": version, "app": app, "issue": entry_issue,
+                    "format": output_format, "seed": int(seed), "set_number": int(set_number),
+                })
+        return entries
+
+
+_default_log = None
+_default_lock = threading.Lock()
+
+
+def default_log():
+    """Prozessweite Instanz, von allen Sitzungen geteilt."""
+    global _default_log
+    with _default_lock:
+        if _default_log is None:
+            _default_log = SeedLog()
+        return _default_log
+
+
+# -----------------------
+# Ausgabe in den Apps
+# -----------------------
+
+def issue_set(pool, set_number, issue):
+    """Dokument von Satz set_number für einen ZIP-Download: aus dem Lauf der Ausgabe oder frisch aus ihrem Seed; protokolliert."""
+    data = issue.ready.pop(set_number, None)
+    pool.count(data is not None)
+    if data is None:
+        data = worker_pool.call_in_process(worksheet_pool.__file__, "render_fresh", pool.path, issue.seed, set_number)
+    default_log().record(pool.path, issue.id, "zip", issue.seed, set_number)
+    return data
+
+
+def issue_problems(path, set_number, issue):
+    """Aufgaben von Satz set_number der App path für ein Einzeldokument, aus dem Seed der Ausgabe; protokolliert."""
+    problems = worker_pool.call_in_process(worksheet_pool.__file__, "generate_problems", path, issue.seed, set_number)
+    default_log().record(path, issue.id, "docx", issue.seed, set_number)
+    return problems
+
+
+# -----------------------
+# Wiederherstellen
+# -----------------------
+
+def regenerate(entries):
+    """Erzeugt die Datei(en) der Einträge neu: [(Dateiname, Bytes)].
+
+    Für "zip" ein Dokument pro Satz, für "docx" ein Dokument mit allen Sätzen der Ausgabe.
+    Löst ValueError aus, wenn der aktuelle Code-Stand nicht der protokollierte ist.
+    """
+    for entry in entries:
+        path = os.path.join(ROOT, entry["app"] + ".py")
+        if code_version(path) != entry["version"]:
+            raise ValueError(
+                f"Satz {entry['set_number']} von {entry['issue']} stammt von Version {entry['version']}, "
+                f"aktuell ist {code_version(path)}"
+            )
+    entries = sorted(entries, key=lambda entry: entry["set_number"])
+    files = []
+    for entry in entries:
+        path = os.path.join(ROOT, entry["app"] + ".py")
+        if entry["format"] == "zip":
+            # Gleiche Version und gleicher Seed ergeben dieselben Bytes: wiederholte Abrufe aus dem Render-Cache
+            data = render_cache.default_cache().get_or_render(
+                render_cache.document_key(path, "set", entry["version"], entry["seed"], entry["set_number"]),
+                lambda: worksheet_pool.render_fresh(path, entry["seed"], entry["set_number"]),
+            )
+            files.append((f"{entry['app']}_{entry['issue']}_Set_{entry['set_number']}.docx", data))
+    docx_entries = [entry for entry in entries if entry["format"] == "docx"]
+    if docx_entries:
+        path = os.path.join(ROOT, docx_entries[0]["app"] + ".py")
+        data = render_cache.default_cache().get_or_render(
+            render_cache.document_key(
+                path, "combined", docx_entries[0]["version"],
+                [(entry["seed"], entry["set_number"]) for entry in docx_entries],
+            ),
+            lambda: worker_pool.load_module(path).create_combined_word_document(
+                [worksheet_pool.generate_problems(path, entry["seed"], entry["set_number"]) for entry in docx_entries]
+            ),
+        )
+        files.append((f"{docx_entries[0]['app']}_{docx_entries[0]['issue']}.docx", data))
+    return files
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    listing = commands.add_parser("list", help="protokollierte Sätze anzeigen")
+    listing.add_argument("--issue")
+    rebuild = commands.add_parser("regenerate", help="Dateien einer Ausgabe neu erzeugen")
+    rebuild.add_argument("issue")
+    rebuild.add_argument("--index", type=int, help="nur dieser Satz (nur bei ZIP-Ausgaben)")
+    rebuild.add_argument("--output", required=True, help="Verzeichnis, oder Datei bei genau einem Ergebnis")
+    args = parser.parse_args(argv)
+
+    log = default_log()
+    if args.command == "list":
+        for entry in log.entries(args.issue):
+            stamp = time.strftime("%Y-%m-%d %H:%M", time.localtime(entry["time"]))
+            print(f"{stamp}  {entry['issue']}  {entry['app']:14} {entry['format']:4} Satz {entry['set_number']:3}  Seed {entry['seed']}")
+        return 0
+
+    entries = [entry for entry in log.entries(args.issue) if args.index is None or entry["set_number"] == args.index]
+    if args.index is not None and any(entry["format"] == "docx" for entry in entries):
+        # Ein Dokument mit nur diesem Satz wurde nie ausgegeben und wäre nicht byte-identisch
+        print(f"{args.issue} wurde als ein Dokument ausgegeben; --index gibt es nur für ZIP-Ausgaben", file=sys.stderr)
+        return 1
+    if not entries:
+        print(f"Keine Sätze für {args.issue} im Protokoll", file=sys.stderr)
+        return 1
+    try:
+        files = regenerate(entries)
+    except ValueError as e:
+        commit = log.versions().get(entries[0]["version"], ("-",))[0]
+        print(f"{e}. Passender Stand: Git-Commit {commit}", file=sys.stderr)
+        return 1
+
+    if len(files) == 1 and args.output.endswith(".docx"):
+        targets = [(args.output, files[0][1])]
+    else:
+        os.makedirs(args.output, exist_ok=True)
+        targets = [(os.path.join(args.output, name), data) for name, data in files]
+    for target, data in targets:
+        with open(target, "wb") as f:
+            f.write(data)
+        print(f"{target}  sha256 {hashlib.sha256(data).hexdigest()[:16]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+import json
+import threading
+from concurrent.futures import Future
+
+# -----------------------
+# Zusammenfassen gleichzeitiger identischer Anfragen
+# -----------------------
+#
+# Drücken mehrere Lehrkräfte kurz hintereinander mit demselben Lehrplan und
+# denselben Einstellungen auf "Generieren", führt nur die erste Sitzung die
+# Modellaufrufe aus; alle weiteren warten auf deren Ergebnis und erhalten
+# dieselbe Datei. Nach Abschluss wird der Schlüssel wieder freigegeben.
+
+
+def flight_key(*parts):
+    """Schlüssel aus JSON-fähigen Teilen, z. B. (Lehrplan-Hash, Schwierigkeit, Anzahl Sätze, Modus)."""
+    return json.dumps(parts, ensure_ascii=False, separators=(",", ":"))
+
+
+class SingleFlight:
+    """Höchstens ein laufender Aufruf pro Schlüssel; gleichzeitige Aufrufer teilen sein Ergebnis."""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.started = 0
+        self.shared = 0
+
+    def do(self, key, fn):
+        """Führt fn() aus oder wartet auf den laufenden Aufruf mit demselben Schlüssel.
+
+        Gibt (Ergebnis, geteilt) zurück; Ausnahmen werden an alle Wartenden weitergereicht.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+                self.started += 1
+            else:
+                self.shared += 1
+
+        if leader:
+            try:
+                future.set_result(fn())
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                with self._lock:
+                    del self._calls[key]
+        return future.result(), not leader
+
+    def in_flight(self, key):
+        with self._lock:
+            return key in self._calls
+
+
+_default_group = None
+_default_lock = threading.Lock()
+
+
+def default_group():
+    """Prozessweite Instanz, von allen Sitzungen geteilt."""
+    global _default_group
+    with _default_lock:
+        if _default_group is None:
+            _default_group = SingleFlight()
+        return _default_group
@@ -0,0 +1,15 @@
+import os
+
+# Lokales Datenverzeichnis für Caches, Bibliotheken und Protokolle.
+# Kann über die Umgebungsvariable MATHEAUFGABEN_DATA_DIR verlegt werden.
+DATA_DIR = os.environ.get(
+    "MATHEAUFGABEN_DATA_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"),
+)
+
+
+def data_path(*parts):
+    """Pfad innerhalb des Datenverzeichnisses; das übergeordnete Verzeichnis wird angelegt."""
+    path = os.path.join(DATA_DIR, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
@@ -1,161 +1,195 @@
 import streamlit as st
 import random
-from docx import Document
 from io import BytesIO
 import zipfile
+import docx_writer
+import artifacts
+import jobs
+import worker_pool
+import worksheet_pool
+import seed_log
+import worksheet_pipeline
+import functools
 import os
-import time
+import problem_space
+from problem_space import Choice, Range, Variant, generator
 
 # --- Generator Functions (Tough Problems - DEFINED HERE) ---
+# Jeder Generator beschreibt seinen Parameterraum (Varianten mit Gewicht und
+# Wertebereichen, siehe problem_space.py); so ist die Zahl verschiedener
+# Aufgaben bekannt und innerhalb eines Satzes wird ohne Zurücklegen gezogen.
 
 GENERATORS = []
 
 # --- Tough Arithmetic ---
-def generate_arithmetic_tough():
-    operator = random.choice(['+', '-', 'x', ':'])
-    if operator in ['+', '-']:
-        num1 = random.randint(100000, 999999999)
-        num2 = random.randint(10000, 9999999)
-        num3 = random.randint(100, 5000)
-        if operator == '-' and num1 < num2:
-            num1, num2 = num2, num1
-        pattern = random.choice([
-            f"Berechne: {num1} {operator} {num2} + {num3}",
-            f"Berechne: {num1} + {num2} - {num3}"
-        ])
-        return pattern
-    elif operator == 'x':
-        num1 = random.randint(100, 999)
-        num2 = random.randint(10, 999)
-        return f"Berechne schriftlich: {num1} x {num2}."
+@generator(
+    Variant(1/8, kind="chain", operator="+", num1=Range(100000, 999999999), num2=Range(10000, 9999999), num3=Range(100, 5000)),
+    # Minuend immer größer als der Subtrahend (früher durch Vertauschen)
+    Variant(1/8, kind="chain", operator="-", num1=Range(10000000, 999999999), num2=Range(10000, 9999999), num3=Range(100, 5000)),
+    Variant(1/4, kind="mixed", num1=Range(100000, 999999999), num2=Range(10000, 9999999), num3=Range(100, 5000)),
+    Variant(1/4, kind="multiply", num1=Range(100, 999), num2=Range(10, 999)),
+    # Der Rest hängt vom Divisor ab: eine Variante pro Divisor
+    *[Variant(1/60, kind="divide", divisor=divisor, quotient=Range(500, 2000), remainder=Range(0, divisor - 1)) for divisor in range(11, 26)],
+    label="Schriftliches Rechnen",
+)
+def generate_arithmetic_tough(kind, **p):
+    if kind == "chain":
+        return f"Berechne: {p['num1']} {p['operator']} {p['num2']} + {p['num3']}"
+    elif kind == "mixed":
+        return f"Berechne: {p['num1']} + {p['num2']} - {p['num3']}"
+    elif kind == "multiply":
+        return f"Berechne schriftlich: {p['num1']} x {p['num2']}."
     else:
-        divisor = random.randint(11, 25)
-        quotient = random.randint(500, 2000)
-        num1 = divisor * quotient + random.randint(0, divisor - 1)
-        return f"Berechne schriftlich: {num1} : {divisor} (mit Rest)."
+        num1 = p['divisor'] * p['quotient'] + p['remainder']
+        return f"Berechne schriftlich: {num1} : {p['divisor']} (mit Rest)."
 GENERATORS.append(generate_arithmetic_tough)
 
 # --- Tough Rounding ---
-def generate_rounding_tough():
-    num = random.randint(10000000, 999999999)
-    place = random.choice(['Millionen', 'Zehnmillionen', 'Hunderttausender'])
+@generator(
+    Variant(1, num=Range(10000000, 999999999), place=Choice(['Millionen', 'Zehnmillionen', 'Hunderttausender'])),
+    label="Runden",
+)
+def generate_rounding_tough(num, place):
     return f"Runde die Zahl {num} auf die nächsten {place}."
 GENERATORS.append(generate_rounding_tough)
 
 # --- Tough Order of Operations ---
-def generate_order_of_operations_tough():
-    a = random.randint(2, 5)
-    b = random.randint(5, 15)
-    c = random.randint(2, 5)
-    d = random.randint(10, 30)
-    e = random.randint(1, 3) 
-    pattern = random.choice([
-        f"Löse: ({b} - {c} + {d}) x {a}",
-        f"Löse: {d} + [{b} x ({c} + {a})]",
-        f"Löse: {a}**{e} + {b} x ({d} - {c})"
-    ])
-    return pattern
+@generator(
+    Variant(1/3, kind="brackets", a=Range(2, 5), b=Range(5, 15), c=Range(2, 5), d=Range(10, 30)),
+    Variant(1/3, kind="nested", a=Range(2, 5), b=Range(5, 15), c=Range(2, 5), d=Range(10, 30)),
+    Variant(1/3, kind="power", a=Range(2, 5), b=Range(5, 15), c=Range(2, 5), d=Range(10, 30), e=Range(1, 3)),
+    label="Rechenregeln",
+)
+def generate_order_of_operations_tough(kind, a, b, c, d, e=None):
+    if kind == "brackets":
+        return f"Löse: ({b} - {c} + {d}) x {a}"
+    elif kind == "nested":
+        return f"Löse: {d} + [{b} x ({c} + {a})]"
+    else:
+        return f"Löse: {a}**{e} + {b} x ({d} - {c})"
 GENERATORS.append(generate_order_of_operations_tough)
 
 # --- Tough Units Conversion ---
-def generate_units_conversion_tough():
-    unit_choice = random.choice(['Länge', 'Zeit', 'Masse'])
-    if unit_choice == 'Länge':
-        if random.choice([True, False]):
-            value = random.randint(100, 5000)
-            return f"Wandle um: {value} Zentimeter (cm) in Meter (m)."
-        else:
-            value = round(random.uniform(1.0, 10.0), 2)
-            return f"Wandle um: {value} Kilometer (km) in Meter (m)."
-    elif unit_choice == 'Zeit':
-        if random.choice([True, False]):
-            h = random.randint(4, 10)
-            m = random.randint(1, 59)
-            return f"Wandle um: {h} Stunden (h) und {m} Minuten (min) in Gesamtminuten."
-        else:
-            m = random.randint(70, 300)
-            return f"Wandle um: {m} Minuten (min) in Stunden (h) und Minuten (min)."
+@generator(
+    Variant(1/6, kind="cm", value=Range(100, 5000)),
+    Variant(1/6, kind="km", hundredths=Range(100, 1000)),
+    Variant(1/6, kind="h_min", h=Range(4, 10), m=Range(1, 59)),
+    Variant(1/6, kind="min", m=Range(70, 300)),
+    Variant(1/6, kind="g", value=Range(500, 9000)),
+    Variant(1/6, kind="t", hundredths=Range(10, 300)),
+    label="Einheiten",
+)
+def generate_units_conversion_tough(kind, **p):
+    if kind == "cm":
+        return f"Wandle um: {p['value']} Zentimeter (cm) in Meter (m)."
+    elif kind == "km":
+        return f"Wandle um: {p['hundredths'] / 100} Kilometer (km) in Meter (m)."
+    elif kind == "h_min":
+        return f"Wandle um: {p['h']} Stunden (h) und {p['m']} Minuten (min) in Gesamtminuten."
+    elif kind == "min":
+        return f"Wandle um: {p['m']} Minuten (min) in Stunden (h) und Minuten (min)."
+    elif kind == "g":
+        return f"Wandle um: {p['value']} Gramm (g) in Kilogramm (kg)."
     else:
-        if random.choice([True, False]):
-            value = random.randint(500, 9000)
-            return f"Wandle um: {value} Gramm (g) in Kilogramm (kg)."
-        else:
-            value = round(random.uniform(0.1, 3.0), 2)
-            return f"Wandle um: {value} Tonnen (t) in Kilogramm (kg)."
+        return f"Wandle um: {p['hundredths'] / 100} Tonnen (t) in Kilogramm (kg)."
 GENERATORS.append(generate_units_conversion_tough)
 
 # --- Tough Geometry/Area ---
-def generate_geometry_perimeter_area_tough():
-    choice = random.choice(['Fläche_Rück', 'Umfang_Rück', 'Zusammengesetzt'])
-    if choice == 'Fläche_Rück':
-        area = random.randint(100, 500)
-        width = random.randint(5, 20)
-        return f"Die Fläche eines Rechtecks beträgt {area} cm². Die Breite ist {width} cm. Berechne die Länge und den Umfang."
-    elif choice == 'Umfang_Rück':
-        perimeter = random.randint(80, 200)
-        length = random.randint(20, 50)
-        return f"Der Umfang eines Rechtecks ist {perimeter} m. Die Länge ist {length} m. Berechne die Breite und die Fläche."
+@generator(
+    Variant(1/3, kind="area", area=Range(100, 500), width=Range(5, 20)),
+    Variant(1/3, kind="perimeter", perimeter=Range(80, 200), length=Range(20, 50)),
+    Variant(1/3, kind="composite", l1=Range(10, 20), w1=Range(5, 10), l2=Range(5, 10), w2=Range(2, 5)),
+    label="Umfang und Fläche",
+)
+def generate_geometry_perimeter_area_tough(kind, **p):
+    if kind == "area":
+        return f"Die Fläche eines Rechtecks beträgt {p['area']} cm². Die Breite ist {p['width']} cm. Berechne die Länge und den Umfang."
+    elif kind == "perimeter":
+        return f"Der Umfang eines Rechtecks ist {p['perimeter']} m. Die Länge ist {p['length']} m. Berechne die Breite und die Fläche."
     else:
-        l1 = random.randint(10, 20)
-        w1 = random.randint(5, 10)
-        l2 = random.randint(5, 10)
-        w2 = random.randint(2, 5)
-        return f"Eine L-förmige Figur besteht aus zwei Rechtecken: R1 ({l1}x{w1} cm) und R2 ({l2}x{w2} cm). Berechne den Gesamtflächeninhalt."
+        return f"Eine L-förmige Figur besteht aus zwei Rechtecken: R1 ({p['l1']}x{p['w1']} cm) und R2 ({p['l2']}x{p['w2']} cm). Berechne den Gesamtflächeninhalt."
 GENERATORS.append(generate_geometry_perimeter_area_tough)
 
 # --- Tough Symmetry/Coordinates ---
-def generate_symmetry_tough():
-    if random.choice([True, False]):
-        figure = random.choice(['gleichschenkliges Trapez', 'Rhombus'])
+@generator(
+    Variant(1/2, figure=Choice(['gleichschenkliges Trapez', 'Rhombus'])),
+    Variant(1/2, x=Range(1, 5), y=Range(1, 5)),
+    label="Symmetrie und Koordinaten",
+)
+def generate_symmetry_tough(figure=None, x=None, y=None):
+    if figure:
         return f"Zeichnen Sie ein {figure} und bestimmen Sie die Anzahl seiner Symmetrieachsen."
     else:
-        x, y = random.randint(1, 5), random.randint(1, 5)
         return f"Der Punkt P({x}|{y}) wird an der y-Achse gespiegelt. Geben Sie die neuen Koordinaten P' an."
 GENERATORS.append(generate_symmetry_tough)
 
 # --- Tough Word Problem ---
-def generate_word_problem_tough():
-    item_count = random.randint(5, 15)
-    price = random.randint(2, 8)
-    weight_g = random.randint(100, 500)
+@generator(
+    Variant(1, item_count=Range(5, 15), price=Range(2, 8), weight_g=Range(100, 500)),
+    label="Textaufgabe",
+)
+def generate_word_problem_tough(item_count, price, weight_g):
     return f"Ein Händler kauft {item_count} Kisten Äpfel zu je {price}€ pro Kiste. Jede Kiste wiegt {weight_g} g. Wie viel bezahlt er insgesamt und wie schwer sind alle Kisten zusammen in Kilogramm?"
 GENERATORS.append(generate_word_problem_tough)
 
+# Mindestanzahl Aufgaben pro Generator und Satz
+MIN_PER_CATEGORY = 7
+
 # --- Document and Helper Functions ---
 
-def create_single_problem_set(num_problems=50):
+def create_single_problem_set(num_problems=50, generators=None):
     """Generiert eine Liste von 50 Aufgaben mit hoher Varianz."""
-    problems = []
-    min_per_category = 7 
-    required_problems = []
-    
-    for generator in GENERATORS:
-        for _ in range(min_per_category):
-            required_problems.append(generator)
-            
-    num_random_fill = num_problems - len(required_problems)
-    for _ in range(num_random_fill):
-        required_problems.append(random.choice(GENERATORS))
-        
-    random.shuffle(required_problems)
-    
-    for i, generator in enumerate(required_problems, 1):
-        problem = generator()
-        problems.append(f"{i}. {problem}")
-        
-    return problems
+    # Innerhalb des Satzes ohne Zurücklegen; die Apps übergeben die Generatoren der Ausgabe
+    # (worksheet_pool.generate_problems), sonst kommt der Schlüssel aus random
+    generators = generators or problem_space.Sampler(GENERATORS, random.getrandbits(64)).generators()
+    slots = worksheet_pipeline.allocate_slots(generators, num_problems, MIN_PER_CATEGORY)
+    return list(worksheet_pipeline.draw_problems(slots))
 
-def create_word_document(problems, set_number):
-    """Erstellt ein Word-Dokument (im Speicher) und gibt es als Bytes zurück."""
-    document = Document()
-    document.add_heading(f'Schwere Mathematikaufgaben Gymnasium Kl. 5 (Sachsen-Anhalt) - Set {set_number}', 0)
-    document.add_paragraph("Dies sind Übungen mit erhöhtem Schwierigkeitsgrad.")
+def create_word_document(problems, set_number, fast=False):
+    """Erstellt ein Word-Dokument (im Speicher) und gibt es als Bytes zurück.
+
+    Mit fast=True wird das Dokument direkt als OOXML geschrieben (siehe docx_writer.py).
+    """
+    title = f'Schwere Mathematikaufgaben Gymnasium Kl. 5 (Sachsen-Anhalt) - Set {set_number}'
+    intro = "Dies sind Übungen mit erhöhtem Schwierigkeitsgrad."
+    if fast:
+        return docx_writer.render_worksheet(title, intro, problems)
+    document = docx_writer.new_document()
+    document.add_heading(title, 0)
+    document.add_paragraph(intro)
     for problem in problems:
         document.add_paragraph(problem)
-    bio = BytesIO()
-    document.save(bio)
-    bio.seek(0)
-    return bio.getvalue()
+    return docx_writer.save_document(document)
+
+def combined_worksheets(problem_sets):
+    """(Titel, Einleitung, Aufgaben) je Satz für ein gemeinsames Dokument; liest problem_sets erst beim Schreiben."""
+    for set_number, problems in enumerate(problem_sets, 1):
+        yield f'Schwere Mathematikaufgaben Gymnasium Kl. 5 (Sachsen-Anhalt) - Set {set_number}', "Dies sind Übungen mit erhöhtem Schwierigkeitsgrad.", problems
+
+def create_combined_word_document(problem_sets):
+    """Schreibt alle Aufgabensätze in ein einziges Word-Dokument (Überschrift und Seitenumbruch pro Satz)."""
+    return docx_writer.render_combined_worksheets(combined_worksheets(problem_sets))
+
+def ready_sets():
+    """Vorrat fertig gerenderter Sätze dieser App (Satznummern 1 bis 10)."""
+    return worksheet_pool.default_pool(__file__, 10)
+
+def create_set_document(set_number, issue):
+    """Erzeugt einen neuen schweren Aufgabensatz und gibt das Word-Dokument als Bytes zurück."""
+    # Aus dem Lauf der Ausgabe oder frisch aus ihrem Seed; der Seed landet im Ausgabeprotokoll
+    return seed_log.issue_set(ready_sets(), set_number, issue)
+
+def create_zip_archive(documents):
+    """Packt die Dokumente der Sätze (in Reihenfolge) in ein ZIP-Archiv."""
+    zip_buffer = BytesIO()
+    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for i, docx_bytes in enumerate(documents, 1):
+            zf.writestr(f"Matheaufgaben_Set_SCHWER_{i}.docx", docx_bytes)
+    return zip_buffer.getvalue()
+
+def create_combined_document_in_process(problem_sets):
+    """create_combined_word_document in einem Worker-Prozess (jeder Klick hat neue Seeds, daher kein Render-Cache)."""
+    return worker_pool.call_in_process(__file__, "create_combined_word_document", problem_sets)
 
 # --- Streamlit Login and Main Program ---
 
@@ -205,52 +239,47 @@ def main_app():
         help="Der Pfad dient nur als Hinweis, der Download erfolgt über den Browser."
     )
     
+    single_document = st.checkbox(
+        "3. Alle Sätze in einer einzigen DOCX-Datei (ein Satz pro Seite)",
+        value=False,
+        help="Statt einer ZIP-Datei mit einem Dokument pro Satz. Deutlich kleiner und schneller, z. B. für Klassensätze mit 30+ Varianten."
+    )
+    
+    repeated = problem_space.repeated_generators(GENERATORS, int(num_sets), MIN_PER_CATEGORY)
+    if repeated:
+        st.warning(
+            "⚠️ Bei {} Sätzen wiederholen sich zwangsläufig Aufgaben: ".format(int(num_sets))
+            + ", ".join(f"{g.label} ({g.cardinality} verschiedene, mindestens {needed} benötigt)" for g, needed in repeated)
+        )
+
     st.markdown("---")
+    st.caption(f"📦 Vorrat: {ready_sets().summary()}")
 
     # NEU: Der Generierungs-Button ist Primary
-    if st.button(f"Starte Generierung von {num_sets} Sätzen und erstelle ZIP-Datei", type="primary"):
-        
-        # 1. ZIP-Archiv im Speicher vorbereiten
-        zip_buffer = BytesIO()
-        
-        # NEU: Verwende st.status für klare visuelle Rückmeldung
-        with st.status("🛠️ Starte die Generierung...", expanded=True) as status:
-            
-            with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
-                
-                for i in range(1, int(num_sets) + 1):
-                    # Statusmeldung für jedes Set
-                    status.write(f"➡️ **Set {i}/{num_sets}:** Erstelle 50 schwere Aufgaben...")
-                    
-                    # Generiere und erstelle Word-Datei (als Bytes)
-                    problems = create_single_problem_set(num_problems=50)
-                    docx_bytes = create_word_document(problems, i)
-                    filename = f"Matheaufgaben_Set_SCHWER_{i}.docx"
-                    
-                    # Füge die Word-Datei zur ZIP-Datei hinzu
-                    zf.writestr(filename, docx_bytes)
-                    status.write(f"✅ **Set {i}/{num_sets}:** Erfolgreich zur ZIP-Datei hinzugefügt.")
-                
-                status.update(label="📦 Komprimiere und finalisiere das ZIP-Archiv...", state="running")
-                time.sleep(1) # Simulate compression time
-            
-            # Schließe den ZIP-Vorgang im Buffer ab
-            zip_buffer.seek(0)
-            
-            # Finale Statusmeldung
-            status.update(label=f"🎉 {num_sets} Aufgabensätze sind bereit zum Download!", state="complete", expanded=False)
-        
-        st.markdown("---")
+    if st.button(f"Starte Generierung von {num_sets} Sätzen und erstelle {'DOCX-Datei' if single_document else 'ZIP-Datei'}", type="primary"):
+        # Die Generierung läuft als Hintergrund-Job weiter, auch wenn die Seite neu lädt
+        issue = seed_log.new_issue(None if single_document else ready_sets())
+        if single_document:
+            jobs.start_job(
+                f"{num_sets} schwere Sätze als DOCX-Datei",
+                [functools.partial(seed_log.issue_problems, __file__, i, issue) for i in range(1, int(num_sets) + 1)],
+                create_combined_document_in_process,
+                file_name="Matheaufgaben_Klasse_5_SCHWER.docx",
+                mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+            )
+        else:
+            jobs.start_job(
+                f"{num_sets} schwere Sätze als ZIP-Datei",
+                [functools.partial(create_set_document, i, issue) for i in range(1, int(num_sets) + 1)],
+                create_zip_archive,
+                file_name="Matheaufgaben_Klasse_5_SCHWER.zip",
+                mime="application/zip"
+            )
         st.markdown(f"**ℹ️ Hinweis:** Die Dateien wären lokal unter dem Pfad: `{download_location}` gespeichert worden.")
-        
-        # 2. Streamlit Download Button für das ZIP-Archiv (Typ ist standardmäßig 'secondary' oder kann weggelassen werden)
-        st.download_button(
-            label="Alle Sätze als ZIP-Datei herunterladen",
-            data=zip_buffer,
-            file_name="Matheaufgaben_Klasse_5_SCHWER.zip",
-            mime="application/zip",
-            key='download_zip_button'
-        )
+
+    # Fortschritt laufender Jobs; fertige Dateien bleiben bis zur Verdrängung herunterladbar
+    jobs.show_jobs()
+    artifacts.show_download_buttons("📥 Erstellte Dateien")
 
 # Hauptfunktion, die den Login-Zustand verwaltet
 if __name__ == "__main__":
@@ -0,0 +1,383 @@
+import hashlib
+import io
+import re
+import threading
+import zipfile
+import xml.etree.ElementTree as ET
+from collections import Counter, OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import cache_backend
+
+# PyPDF2 und python-docx werden erst beim ersten Gebrauch importiert: die Apps
+# sollen ohne hochgeladene Datei nicht auf diese Pakete warten.
+
+# -----------------------
+# Text extrahieren
+# -----------------------
+
+def extract_pages_from_pdf(file):
+    """Liest den Text jeder PDF-Seite einzeln aus (leere Seiten bleiben leer)."""
+    import PyPDF2
+    pdf_reader = PyPDF2.PdfReader(file)
+    return [page.extract_text() or "" for page in pdf_reader.pages]
+
+
+def extract_text_from_pdf(file):
+    text = ""
+    for extracted in extract_pages_from_pdf(file):
+        if extracted:
+            text += extracted + "\n"
+    return text
+
+
+def extract_text_from_docx_object_model(file):
+    """Bisheriger Weg über python-docx: lädt das ganze Dokument, liest nur Absätze (keine Tabellen)."""
+    from docx import Document
+    doc = Document(file)
+    return "\n".join([para.text for para in doc.paragraphs])
+
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+MC_FALLBACK = "{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback"
+CELL_SEPARATOR = " | "
+
+
+def iter_docx_blocks(file):
+    """Liest word/document.xml per iterparse und liefert Absätze und Tabellenzeilen in Dokumentreihenfolge.
+
+    Tabellenzeilen werden als eine Zeile mit " | " zwischen den Zellen geliefert.
+    Absätze aus Textfeldern (w:txbxContent) folgen dem Absatz, in dem das
+    Textfeld verankert ist; die VML-Ersatzdarstellung (mc:Fallback) wird
+    übersprungen, sonst käme jedes Textfeld doppelt vor.
+    Bereits verarbeitete Elemente werden sofort verworfen, der Speicherbedarf bleibt konstant.
+    """
+    with zipfile.ZipFile(file) as zf, zf.open("word/document.xml") as xml:
+        body = None
+        # Offene Absätze und Zellen von außen nach innen (Tabellen in Zellen, Textfelder in Absätzen).
+        # Absatz: (Textteile, fertige Blöcke seiner Textfelder); Zelle: (None, fertige Blöcke).
+        open_blocks = []
+        rows = []    # Zellen der offenen Zeilen
+        fallback = 0
+
+        for event, elem in ET.iterparse(xml, events=("start", "end")):
+            tag = elem.tag
+            if tag == MC_FALLBACK:
+                fallback += 1 if event == "start" else -1
+                continue
+            if fallback:
+                continue
+            if event == "start":
+                if tag == W + "p":
+                    open_blocks.append(([], []))
+                elif tag == W + "tc":
+                    open_blocks.append((None, []))
+                elif tag == W + "tr":
+                    rows.append([])
+                elif tag == W + "body":
+                    body = elem
+                continue
+
+            parts = open_blocks[-1][0] if open_blocks else None
+            if tag == W + "t":
+                if parts is not None and elem.text:
+                    parts.append(elem.text)
+            elif tag == W + "tab":
+                if parts is not None:
+                    parts.append("\t")
+            elif tag in (W + "br", W + "cr"):
+                if parts is not None:
+                    parts.append("\n")
+            elif tag == W + "p":
+                parts, boxed = open_blocks.pop()
+                blocks = ["".join(parts)] + boxed
+                if open_blocks:
+                    open_blocks[-1][1].extend(blocks)
+                else:
+                    yield from blocks
+                    body.clear()
+            elif tag == W + "tc":
+                _, paragraphs = open_blocks.pop()
+                rows[-1].append(" ".join(p for p in paragraphs if p))
+            elif tag == W + "tr":
+                row = CELL_SEPARATOR.join(rows.pop())
+                if open_blocks:
+                    open_blocks[-1][1].append(row)
+                else:
+                    yield row
+            elif tag == W + "tbl" and not open_blocks:
+                body.clear()
+
+
+def extract_text_from_docx(file):
+    return "\n".join(iter_docx_blocks(file))
+
+
+# -----------------------
+# Normalisierung
+# -----------------------
+
+# Zeilen am Seitenrand, die für Kopf-/Fußzeilen in Frage kommen
+EDGE_LINES = 3
+
+# Anteil der Seiten, auf denen eine Randzeile vorkommen muss, um als Boilerplate zu gelten
+REPEAT_RATIO = 0.5
+
+CHARS_PER_TOKEN = 4
+
+PAGE_NUMBER_RE = re.compile(
+    r"^(?:[-–—]?\s*\d{1,4}\s*[-–—]?|(?:seite|page|s\.)\s*\d{1,4}(?:\s*(?:von|of|/)\s*\d{1,4})?|\d{1,4}\s*/\s*\d{1,4})$",
+    re.IGNORECASE,
+)
+HYPHEN_BREAK_RE = re.compile(r"(\w)-\n(\w+)")
+
+# Nach einem Ergänzungsstrich ("Grund- und Leistungskurs") bleibt der Strich stehen
+SUSPENDED_HYPHEN_WORDS = {"und", "oder", "bzw", "sowie"}
+SPACES_RE = re.compile(r"[ \t\u00a0\u2009]+")
+BLANK_LINES_RE = re.compile(r"\n{3,}")
+
+
+def _fingerprint(line):
+    """Ziffern werden maskiert, damit "Seite 3" und "Seite 4" denselben Abdruck haben."""
+    return SPACES_RE.sub(" ", re.sub(r"\d+", "#", line)).strip().lower()
+
+
+def _edge_lines(lines):
+    """Indizes der ersten und letzten nichtleeren Zeilen einer Seite.
+
+    Kurze Seiten haben keinen Rand: sonst wäre jede ihrer Zeilen eine Randzeile.
+    """
+    filled = [i for i, line in enumerate(lines) if line.strip()]
+    if len(filled) <= 2 * EDGE_LINES:
+        return set()
+    return set(filled[:EDGE_LINES] + filled[-EDGE_LINES:])
+
+
+def find_repeated_lines(pages):
+    """Ermittelt die Abdrücke von Kopf- und Fußzeilen, die sich über viele Seiten wiederholen."""
+    if len(pages) < 2:
+        return set()
+    counts = Counter()
+    for page in pages:
+        lines = page.splitlines()
+        counts.update({_fingerprint(lines[i]) for i in _edge_lines(lines)})
+    threshold = max(2, int(len(pages) * REPEAT_RATIO))
+    return {fp for fp, count in counts.items() if fp and count >= threshold}
+
+
+def _dehyphenate(text):
+    # "Kompetenz-\nbereiche" -> "Kompetenzbereiche", "Sachsen-\nAnhalt" -> "Sachsen-Anhalt",
+    # "Grund-\nund Leistungskurs" -> "Grund- und Leistungskurs"
+    def join(match):
+        left, right = match.group(1), match.group(2)
+        if right in SUSPENDED_HYPHEN_WORDS:
+            return f"{left}- {right}"
+        if left.isalpha() and right.islower():
+            return left + right
+        return f"{left}-{right}"
+    return HYPHEN_BREAK_RE.sub(join, text)
+
+
+def estimate_tokens(text):
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def normalize_syllabus(pages):
+    """Entfernt Kopf-/Fußzeilen, Seitenzahlen und Trennstriche und fasst Leerraum zusammen.
+
+    Gibt den bereinigten Text und einen Bericht über die Einsparung zurück.
+    """
+    raw_text = "\n".join(pages)
+    repeated = find_repeated_lines(pages)
+    removed_lines = 0
+    kept_pages = []
+
+    for page in pages:
+        kept = []
+        lines = page.splitlines()
+        edge = _edge_lines(lines)
+        for i, line in enumerate(lines):
+            stripped = SPACES_RE.sub(" ", line).strip()
+            if not stripped:
+                kept.append("")
+                continue
+            if i in edge and (PAGE_NUMBER_RE.match(stripped) or _fingerprint(stripped) in repeated):
+                removed_lines += 1
+                continue
+            kept.append(stripped)
+        kept_pages.append("\n".join(kept).strip())
+
+    text = "\n".join(page for page in kept_pages if page)
+    text = _dehyphenate(text)
+    text = BLANK_LINES_RE.sub("\n\n", text).strip()
+
+    report = {
+        "pages": len(pages),
+        "removed_lines": removed_lines,
+        "chars_before": len(raw_text),
+        "chars_after": len(text),
+        "tokens_before": estimate_tokens(raw_text),
+        "tokens_after": estimate_tokens(text),
+    }
+    return text, report
+
+
+REPORT_TEXTS = {
+    "de": "🧹 Bereinigt: {removed} Kopf-/Fußzeilen entfernt, {before:,} → {after:,} Zeichen "
+          "(≈ {tokens_before:,} → {tokens_after:,} Tokens, −{percent:.0f} %)",
+    "en": "🧹 Cleaned: removed {removed} header/footer lines, {before:,} → {after:,} characters "
+          "(≈ {tokens_before:,} → {tokens_after:,} tokens, −{percent:.0f} %)",
+}
+
+
+def format_report(report, lang="de"):
+    saved = report["chars_before"] - report["chars_after"]
+    percent = 100 * saved / report["chars_before"] if report["chars_before"] else 0
+    return REPORT_TEXTS[lang].format(
+        removed=report["removed_lines"],
+        before=report["chars_before"],
+        after=report["chars_after"],
+        tokens_before=report["tokens_before"],
+        tokens_after=report["tokens_after"],
+        percent=percent,
+    )
+
+
+def extract_syllabus(file, filetype):
+    """Extrahiert und normalisiert einen Lehrplan. Gibt (Text, Bericht) zurück."""
+    entry = ingest_syllabus(file, filetype)
+    return entry["text"], entry["report"]
+
+
+# -----------------------
+# Themenindex und Kurzfassung
+# -----------------------
+
+HEADING_RE = re.compile(r"^(?:\d+(?:\.\d+)*\.?|[IVX]+\.)\s+([A-ZÄÖÜ][^.;:]{2,80})$")
+TOPIC_KEYWORDS_RE = re.compile(r"^(?:Kompetenzbereich|Themenbereich|Lernbereich|Leitidee|Thema)\b", re.IGNORECASE)
+
+# Länge der Kurzfassung und Kontext pro Thema (Zeichen)
+DIGEST_CHARS = 6000
+DIGEST_CONTEXT = 240
+
+
+def build_topic_index(text):
+    """Findet nummerierte Überschriften und Themenbereiche; gibt [(Thema, Zeichenposition)] zurück."""
+    topics = []
+    seen = set()
+    offset = 0
+    for line in text.split("\n"):
+        stripped = line.strip()
+        match = HEADING_RE.match(stripped)
+        if match or TOPIC_KEYWORDS_RE.match(stripped) and len(stripped) <= 100:
+            if stripped.lower() not in seen:
+                seen.add(stripped.lower())
+                topics.append((stripped, offset))
+        offset += len(line) + 1
+    return topics
+
+
+def build_digest(text, topics):
+    """Kurzfassung aus jeder Überschrift und dem Anfang des zugehörigen Abschnitts."""
+    if not topics:
+        return text[:DIGEST_CHARS]
+    parts = []
+    length = 0
+    ends = [offset for _, offset in topics[1:]] + [len(text)]
+    for (topic, offset), end in zip(topics, ends):
+        start = offset + len(topic)
+        context = SPACES_RE.sub(" ", text[start:min(end, start + DIGEST_CONTEXT)].replace("\n", " ")).strip()
+        part = f"{topic}: {context}"
+        if length + len(part) > DIGEST_CHARS:
+            break
+        parts.append(part)
+        length += len(part) + 1
+    return "\n".join(parts)
+
+
+def ingest_syllabus(file, filetype):
+    """Erzeugt alle Artefakte eines Lehrplans: Rohtext, bereinigter Text, Bericht, Themenindex, Kurzfassung."""
+    if filetype == "pdf":
+        pages = extract_pages_from_pdf(file)
+    elif filetype == "docx":
+        pages = [extract_text_from_docx(file)]
+    else:
+        raise ValueError(f"Nicht unterstütztes Dateiformat: {filetype}")
+    text, report = normalize_syllabus(pages)
+    topics = build_topic_index(text)
+    return {
+        "raw_text": "\n".join(pages),
+        "text": text,
+        "report": report,
+        "topics": topics,
+        "digest": build_digest(text, topics),
+    }
+
+
+# -----------------------
+# Hintergrund-Extraktion
+# -----------------------
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class SyllabusIngestor:
+    """Extrahiert und normalisiert hochgeladene Lehrpläne in einem Hintergrund-Thread.
+
+    Jeder Inhalt (SHA-256) wird nur einmal verarbeitet; die letzten `max_entries`
+    Ergebnisse bleiben als Futures zwischengespeichert. Mit einer `library`
+    (siehe syllabus_library.py) werden Ergebnisse dauerhaft abgelegt und bei
+    erneutem Hochladen ohne Extraktion wiederverwendet.
+    """
+
+    def __init__(self, max_workers=2, max_entries=32, library=None):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="syllabus")
+        self._futures = OrderedDict()
+        self._lock = threading.Lock()
+        self.max_entries = max_entries
+        self.library = library
+
+    def _ingest(self, key, data, filetype, name):
+        if self.library is not None:
+            entry = self.library.get(key)
+            if entry is None:
+                # Ein anderes Replikat hat den Lehrplan vielleicht schon verarbeitet
+                entry = cache_backend.get_json("syllabus", key)
+                if entry is None:
+                    entry = ingest_syllabus(io.BytesIO(data), filetype)
+                    cache_backend.set_json("syllabus", key, entry)
+                entry["topics"] = [tuple(topic) for topic in entry["topics"]]
+                self.library.add(key, name or f"{key[:12]}.{filetype}", filetype, data, entry)
+            return entry["text"], entry["report"]
+        return extract_syllabus(io.BytesIO(data), filetype)
+
+    def _remember(self, key, future):
+        self._futures[key] = future
+        self._futures.move_to_end(key)
+        while len(self._futures) > self.max_entries:
+            self._futures.popitem(last=False)
+
+    def submit(self, data, filetype, name=None):
+        """Startet die Extraktion (falls nötig) und gibt sofort ein Future auf (Text, Bericht) zurück."""
+        key = content_hash(data)
+        with self._lock:
+            future = self._futures.get(key)
+            if future is None or (future.done() and future.exception() is not None):
+                future = self._executor.submit(self._ingest, key, data, filetype, name)
+            self._remember(key, future)
+        return future
+
+    def load(self, key):
+        """Future auf einen bereits in der Bibliothek abgelegten Lehrplan."""
+        with self._lock:
+            future = self._futures.get(key)
+            if future is None:
+                future = Future()
+                entry = self.library.get(key)
+                if entry is None:
+                    future.set_exception(KeyError(key))
+                    return future
+                future.set_result((entry["text"], entry["report"]))
+            self._remember(key, future)
+        return future
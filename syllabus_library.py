@@ -0,0 +1,180 @@
+import io
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import closing
+
+from storage import DATA_DIR
+from syllabus import content_hash, ingest_syllabus
+
+# -----------------------
+# Lehrplan-Bibliothek
+# -----------------------
+#
+# Metadaten liegen in SQLite, die Texte im Dateisystem:
+#
+#   data/syllabus_library/library.sqlite3
+#   data/syllabus_library/<hash[:2]>/<hash>/{original.pdf,raw.txt,normalized.txt,digest.txt,topics.json}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS syllabi (
+    key TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    filetype TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    report TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used_at REAL NOT NULL
+)
+"""
+
+ARTIFACT_FILES = {
+    "raw_text": "raw.txt",
+    "text": "normalized.txt",
+    "digest": "digest.txt",
+}
+
+# Beim Start automatisch eingelesene Lehrpläne
+WARM_DIR = os.path.join(DATA_DIR, "syllabi")
+
+
+class SyllabusLibrary:
+    """Dauerhafte Ablage verarbeiteter Lehrpläne, adressiert über den SHA-256 des Dateiinhalts."""
+
+    def __init__(self, root=None):
+        self.root = root or os.path.join(DATA_DIR, "syllabus_library")
+        os.makedirs(self.root, exist_ok=True)
+        self.db_path = os.path.join(self.root, "library.sqlite3")
+        with self._connect() as db:
+            db.execute(SCHEMA)
+
+    def _connect(self):
+        # Eine Verbindung pro Aufruf: die Bibliothek wird aus mehreren Threads genutzt.
+        return closing(sqlite3.connect(self.db_path, timeout=30, isolation_level=None))
+
+    def _entry_dir(self, key):
+        return os.path.join(self.root, key[:2], key)
+
+    def __contains__(self, key):
+        with self._connect() as db:
+            return db.execute("SELECT 1 FROM syllabi WHERE key = ?", (key,)).fetchone() is not None
+
+    def entries(self):
+        """Alle Einträge nach Namen sortiert (stabile Reihenfolge für Auswahllisten)."""
+        with self._connect() as db:
+            rows = db.execute(
+                "SELECT key, name, filetype, size, report, created_at, last_used_at "
+                "FROM syllabi ORDER BY name, created_at"
+            ).fetchall()
+        return [
+            {
+                "key": key, "name": name, "filetype": filetype, "size": size,
+                "report": json.loads(report), "created_at": created_at, "last_used_at": last_used_at,
+            }
+            for key, name, filetype, size, report, created_at, last_used_at in rows
+        ]
+
+    def get(self, key):
+        """Lädt alle Artefakte eines Eintrags oder None, falls der Lehrplan unbekannt ist.
+
+        Fehlen Dateien des Eintrags oder sind sie unlesbar, gilt er ebenfalls
+        als unbekannt; ingest() bzw. SyllabusIngestor legen ihn dann neu an.
+        """
+        with self._connect() as db:
+            row = db.execute("SELECT report FROM syllabi WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            db.execute("UPDATE syllabi SET last_used_at = ? WHERE key = ?", (time.time(), key))
+
+        entry_dir = self._entry_dir(key)
+        entry = {"report": json.loads(row[0])}
+        try:
+            for field, filename in ARTIFACT_FILES.items():
+                with open(os.path.join(entry_dir, filename), encoding="utf-8") as f:
+                    entry[field] = f.read()
+            with open(os.path.join(entry_dir, "topics.json"), encoding="utf-8") as f:
+                entry["topics"] = [tuple(topic) for topic in json.load(f)]
+        except (OSError, ValueError) as e:
+            print(f"Lehrplan {key[:12]} unvollständig, wird neu eingelesen: {e}", file=sys.stderr)
+            return None
+        return entry
+
+    def add(self, key, name, filetype, data, entry):
+        """Legt Originaldatei und Artefakte ab. Die Zeile in SQLite wird zuletzt geschrieben,
+        sodass nur vollständige Einträge sichtbar sind."""
+        entry_dir = self._entry_dir(key)
+        os.makedirs(entry_dir, exist_ok=True)
+        with open(os.path.join(entry_dir, f"original.{filetype}"), "wb") as f:
+            f.write(data)
+        for field, filename in ARTIFACT_FILES.items():
+            with open(os.path.join(entry_dir, filename), "w", encoding="utf-8") as f:
+                f.write(entry[field])
+        with open(os.path.join(entry_dir, "topics.json"), "w", encoding="utf-8") as f:
+            json.dump(entry["topics"], f, ensure_ascii=False)
+
+        now = time.time()
+        with self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO syllabi (key, name, filetype, size, report, created_at, last_used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, name, filetype, len(data), json.dumps(entry["report"]), now, now),
+            )
+
+    def ingest(self, data, filetype, name):
+        """Verarbeitet eine Datei, falls sie noch nicht (vollständig) in der Bibliothek liegt. Gibt den Schlüssel zurück."""
+        key = content_hash(data)
+        if key not in self or self.get(key) is None:
+            self.add(key, name, filetype, data, ingest_syllabus(io.BytesIO(data), filetype))
+        return key
+
+    def warm(self, directory=WARM_DIR):
+        """Liest alle PDF/DOCX-Dateien eines Verzeichnisses ein, die noch fehlen. Gibt die Anzahl neuer Einträge zurück.
+
+        Eine defekte Datei wird gemeldet und übersprungen: warm() läuft beim
+        Start der Apps, und eine einzelne Datei darf sie nicht lahmlegen.
+        """
+        if not os.path.isdir(directory):
+            return 0
+        added = 0
+        for filename in sorted(os.listdir(directory)):
+            filetype = filename.rsplit(".", 1)[-1].lower()
+            if filetype not in ("pdf", "docx"):
+                continue
+            try:
+                with open(os.path.join(directory, filename), "rb") as f:
+                    data = f.read()
+                if content_hash(data) not in self:
+                    self.ingest(data, filetype, filename)
+                    added += 1
+            except Exception as e:
+                print(f"{filename} übersprungen: {type(e).__name__}: {e}", file=sys.stderr)
+        return added
+
+    def warm_in_background(self, directory=WARM_DIR):
+        """warm() in einem Hintergrund-Thread, damit der erste Seitenaufbau nicht auf die Extraktion wartet.
+
+        Neue Einträge erscheinen in entries(), sobald sie fertig sind (beim nächsten Rerun).
+        """
+        thread = threading.Thread(target=self.warm, args=(directory,), name="syllabus-warm", daemon=True)
+        thread.start()
+        return thread
+
+
+def format_entry(entry):
+    """Anzeige für Auswahllisten: Name, Seiten und Textlänge."""
+    report = entry["report"]
+    return f"{entry['name']} ({report['pages']} S., {report['chars_after']:,} Zeichen)"
+
+
+if __name__ == "__main__":
+    # python syllabus_library.py warm [VERZEICHNIS]  |  python syllabus_library.py list
+    library = SyllabusLibrary()
+    command = sys.argv[1] if len(sys.argv) > 1 else "list"
+    if command == "warm":
+        directory = sys.argv[2] if len(sys.argv) > 2 else WARM_DIR
+        print(f"{library.warm(directory)} neue Lehrpläne aus {directory} eingelesen.")
+    for entry in library.entries():
+        print(entry["key"][:12], format_entry(entry))
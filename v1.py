@@ -1,8 +1,15 @@
 import streamlit as st
 import random
-from docx import Document
 from io import BytesIO
 import zipfile
+import docx_writer
+import artifacts
+import jobs
+import worker_pool
+import worksheet_pool
+import seed_log
+import worksheet_pipeline
+import functools
 import os
 
 # --- Generator Functions (Enhanced to maximize internal randomness) ---
@@ -149,47 +156,62 @@ def generate_word_problem():
 GENERATORS.append(generate_word_problem)
 
 
+# Mindestanzahl Aufgaben pro Generator und Satz
+MIN_PER_CATEGORY = 5
+
 # --- Dokumenten- und Streamlit-Funktionen ---
 
-def create_single_problem_set(num_problems=50):
+def create_single_problem_set(num_problems=50, generators=None):
     """Generiert eine Liste von 50 Aufgaben, indem zufällig aus allen Generatoren gezogen wird."""
-    problems = []
-    
-    # Stellen Sie sicher, dass jede Kategorie mindestens 5 Mal vorkommt, der Rest ist zufällig
-    min_per_category = 5
-    required_problems = []
-    
-    # Füge mindestens 5 Probleme von jedem Typ hinzu
-    for generator in GENERATORS:
-        for _ in range(min_per_category):
-            required_problems.append(generator)
-            
-    # Füge zusätzliche zufällige Generatoren hinzu, bis 50 erreicht sind
-    num_random_fill = num_problems - len(required_problems)
-    for _ in range(num_random_fill):
-        required_problems.append(random.choice(GENERATORS))
-        
-    # Mische die Liste der Generatoren, um die Reihenfolge völlig zufällig zu machen
-    random.shuffle(required_problems)
-    
-    # Generiere die Probleme
-    for i, generator in enumerate(required_problems, 1):
-        problem = generator()
-        problems.append(f"{i}. {problem}")
-        
-    return problems
-
-
-def create_word_document(problems, set_number):
-    """Erstellt ein Word-Dokument (im Speicher) und gibt es als Bytes zurück."""
-    document = Document()
-    document.add_heading(f'Mathematikaufgaben Gymnasium Kl. 5 (Sachsen-Anhalt) - Set {set_number}', 0)
+    generators = generators or GENERATORS
+    # Jede Kategorie mindestens MIN_PER_CATEGORY-mal, der Rest zufällig, in zufälliger Reihenfolge
+    slots = worksheet_pipeline.allocate_slots(generators, num_problems, MIN_PER_CATEGORY)
+    return list(worksheet_pipeline.draw_problems(slots))
+
+
+def create_word_document(problems, set_number, fast=False):
+    """Erstellt ein Word-Dokument (im Speicher) und gibt es als Bytes zurück.
+
+    Mit fast=True wird das Dokument direkt als OOXML geschrieben (siehe docx_writer.py).
+    """
+    title = f'Mathematikaufgaben Gymnasium Kl. 5 (Sachsen-Anhalt) - Set {set_number}'
+    if fast:
+        return docx_writer.render_worksheet(title, None, problems)
+    document = docx_writer.new_document()
+    document.add_heading(title, 0)
     for problem in problems:
         document.add_paragraph(problem)
-    bio = BytesIO()
-    document.save(bio)
-    bio.seek(0)
-    return bio.getvalue()
+    return docx_writer.save_document(document)
+
+def combined_worksheets(problem_sets):
+    """(Titel, Einleitung, Aufgaben) je Satz für ein gemeinsames Dokument; liest problem_sets erst beim Schreiben."""
+    for set_number, problems in enumerate(problem_sets, 1):
+        yield f'Mathematikaufgaben Gymnasium Kl. 5 (Sachsen-Anhalt) - Set {set_number}', None, problems
+
+def create_combined_word_document(problem_sets):
+    """Schreibt alle Aufgabensätze in ein einziges Word-Dokument (Überschrift und Seitenumbruch pro Satz)."""
+    return docx_writer.render_combined_worksheets(combined_worksheets(problem_sets))
+
+def ready_sets():
+    """Vorrat fertig gerenderter Sätze dieser App (Satznummern 1 bis 30)."""
+    return worksheet_pool.default_pool(__file__, 30)
+
+def create_set_document(set_number, issue):
+    """Erzeugt einen neuen Aufgabensatz und gibt das Word-Dokument als Bytes zurück."""
+    # Aus dem Lauf der Ausgabe oder frisch aus ihrem Seed; der Seed landet im Ausgabeprotokoll
+    return seed_log.issue_set(ready_sets(), set_number, issue)
+
+def create_zip_archive(documents):
+    """Packt die Dokumente der Sätze (in Reihenfolge) in ein ZIP-Archiv."""
+    zip_buffer = BytesIO()
+    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for i, docx_bytes in enumerate(documents, 1):
+            zf.writestr(f"Matheaufgaben_Set_{i}.docx", docx_bytes)
+    return zip_buffer.getvalue()
+
+def create_combined_document_in_process(problem_sets):
+    """create_combined_word_document in einem Worker-Prozess (jeder Klick hat neue Seeds, daher kein Render-Cache)."""
+    return worker_pool.call_in_process(__file__, "create_combined_word_document", problem_sets)
 
 def main():
     st.set_page_config(page_title="Matheaufgaben Generator (Gymnasium 5)", layout="centered")
@@ -212,42 +234,38 @@ def main():
         help="Der Browser kann Dateien nicht direkt dorthin speichern. Der Pfad dient nur als Hinweis."
     )
     
+    single_document = st.checkbox(
+        "3. Alle Sätze in einer einzigen DOCX-Datei (ein Satz pro Seite)",
+        value=False,
+        help="Statt einer ZIP-Datei mit einem Dokument pro Satz. Deutlich kleiner und schneller, z. B. für Klassensätze mit 30+ Varianten."
+    )
+    
     st.markdown("---")
+    st.caption(f"📦 Vorrat: {ready_sets().summary()}")
 
-    if st.button(f"Starte Generierung von {num_sets} Sätzen und erstelle ZIP-Datei"):
-        st.subheader("⬇️ Generierung gestartet...")
-        
-        # 1. ZIP-Archiv im Speicher vorbereiten
-        zip_buffer = BytesIO()
-        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
-            
-            for i in range(1, int(num_sets) + 1):
-                # Generiere und erstelle Word-Datei (als Bytes)
-                with st.spinner(f"Generiere Aufgabensatz {i} (50 Aufgaben)..."):
-                    # HOHE RANDOMISIERUNG: Jeder Satz ist ein Unikat, da die Generatoren zufällig gemischt werden
-                    problems = create_single_problem_set(num_problems=50)
-                    docx_bytes = create_word_document(problems, i)
-                    filename = f"Matheaufgaben_Set_{i}.docx"
-                    
-                    # Füge die Word-Datei zur ZIP-Datei hinzu
-                    zf.writestr(filename, docx_bytes)
-                    st.success(f"✅ Aufgabensatz {i} fertiggestellt und dem ZIP hinzugefügt.")
-        
-        # Gehe an den Anfang des Puffers
-        zip_buffer.seek(0)
-        
-        st.markdown("---")
+    if st.button(f"Starte Generierung von {num_sets} Sätzen und erstelle {'DOCX-Datei' if single_document else 'ZIP-Datei'}"):
+        # Die Generierung läuft als Hintergrund-Job weiter, auch wenn die Seite neu lädt
+        issue = seed_log.new_issue(None if single_document else ready_sets())
+        if single_document:
+            jobs.start_job(
+                f"{num_sets} Sätze als DOCX-Datei",
+                [functools.partial(seed_log.issue_problems, __file__, i, issue) for i in range(1, int(num_sets) + 1)],
+                create_combined_document_in_process,
+                file_name="Matheaufgaben_Klasse_5_Sets.docx",
+                mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+            )
+        else:
+            jobs.start_job(
+                f"{num_sets} Sätze als ZIP-Datei",
+                [functools.partial(create_set_document, i, issue) for i in range(1, int(num_sets) + 1)],
+                create_zip_archive,
+                file_name="Matheaufgaben_Klasse_5_Sets.zip",
+                mime="application/zip"
+            )
         st.markdown(f"**ℹ️ Hinweis:** Die Dateien wären lokal unter dem Pfad: `{download_location}` gespeichert worden.")
-        
-        # 2. Streamlit Download Button für das ZIP-Archiv
-        st.download_button(
-            label="Alle Sätze als ZIP-Datei herunterladen",
-            data=zip_buffer,
-            file_name="Matheaufgaben_Klasse_5_Sets.zip",
-            mime="application/zip",
-            key='download_zip_button'
-        )
-        st.balloons()
+
+    jobs.show_jobs()
+    artifacts.show_download_buttons("📥 Erstellte Dateien")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,26 +1,11 @@
 import streamlit as st
-from groq import Groq
-import PyPDF2
-from docx import Document
-import tempfile
+import docx_writer
 import io
-
-# -----------------------
-# Hilfsfunktionen: Text extrahieren
-# -----------------------
-
-def extract_text_from_pdf(file):
-    pdf_reader = PyPDF2.PdfReader(file)
-    text = ""
-    for page in pdf_reader.pages:
-        extracted = page.extract_text()
-        if extracted:
-            text += extracted + "\n"
-    return text
-
-def extract_text_from_docx(file):
-    doc = Document(file)
-    return "\n".join([para.text for para in doc.paragraphs])
+from syllabus import SyllabusIngestor, content_hash, format_report
+from syllabus_library import SyllabusLibrary, format_entry
+from artifacts import save_artifact, show_download_buttons
+import checkpoints
+import singleflight
 
 # -----------------------
 # Streamlit UI
@@ -55,9 +40,25 @@ if "groq" not in st.secrets or "api_key" not in st.secrets["groq"]:
     st.stop()
 
 API_KEY = st.secrets["groq"]["api_key"]
-client = Groq(api_key=API_KEY)
 
-syllabus_text = ""
+@st.cache_resource
+def get_groq_client(api_key):
+    # groq wird erst beim ersten Generieren importiert
+    from groq import Groq
+    return Groq(api_key=api_key)
+
+
+@st.cache_resource
+def get_syllabus_library():
+    library = SyllabusLibrary()
+    library.warm_in_background()
+    return library
+
+@st.cache_resource
+def get_syllabus_ingestor():
+    return SyllabusIngestor(library=get_syllabus_library())
+
+syllabus_future = None
 
 # -----------------------
 # Datei verarbeiten
@@ -66,26 +67,42 @@ syllabus_text = ""
 if uploaded_file:
     filetype = uploaded_file.name.split(".")[-1].lower()
 
-    with tempfile.NamedTemporaryFile(delete=False) as tmp:
-        tmp.write(uploaded_file.read())
-        tmp_path = tmp.name
-
-    if filetype == "pdf":
-        st.info("📄 Text wird aus dem PDF extrahiert …")
-        syllabus_text = extract_text_from_pdf(tmp_path)
-
-    elif filetype == "docx":
-        st.info("📄 Text wird aus dem DOCX extrahiert …")
-        syllabus_text = extract_text_from_docx(tmp_path)
-
+    if filetype in ("pdf", "docx"):
+        syllabus_future = get_syllabus_ingestor().submit(uploaded_file.getvalue(), filetype, uploaded_file.name)
+        if not syllabus_future.done():
+            st.info("⏳ Text wird im Hintergrund extrahiert – die Einstellungen können schon gewählt werden.")
+        elif syllabus_future.exception() is not None:
+            st.error(f"Text konnte nicht extrahiert werden: {syllabus_future.exception()}")
+        else:
+            st.caption(format_report(syllabus_future.result()[1]))
     else:
         st.error("❌ Nicht unterstütztes Dateiformat.")
 
+else:
+    library_entries = get_syllabus_library().entries()
+    if library_entries:
+        library_choice = st.selectbox(
+            "… oder einen bereits verarbeiteten Lehrplan wählen",
+            options=library_entries,
+            index=None,
+            format_func=format_entry,
+            placeholder="Lehrplan-Bibliothek"
+        )
+        if library_choice:
+            syllabus_future = get_syllabus_ingestor().load(library_choice["key"])
+            st.caption(format_report(library_choice["report"]))
+
 # -----------------------
 # Aufgabeneinstellungen
 # -----------------------
 
-if syllabus_text:
+@st.fragment
+def generation_panel(syllabus_future):
+    """Einstellungen, Generierung und Downloads.
+
+    Als Fragment läuft bei einer Widget-Änderung nur dieser Bereich neu,
+    nicht der Datei-Upload und die Textextraktion darüber.
+    """
     st.subheader("⚙️ Aufgabeneinstellungen")
 
     num_sets = st.number_input(
@@ -120,21 +137,39 @@ if syllabus_text:
     # -----------------------
 
     if st.button("📘 Aufgabensätze generieren (DOCX)"):
+        if not syllabus_future.done():
+            with st.spinner("Warte auf die Textextraktion …"):
+                syllabus_future.exception()
+        try:
+            syllabus_text, report = syllabus_future.result()
+        except Exception as e:
+            st.error(f"Text konnte nicht extrahiert werden: {e}")
+            st.stop()
+
+        # Ein neuer Versuch mit denselben Eingaben setzt beim ersten fehlenden Teil fort
+        checkpoint_store = checkpoints.default_store()
+        job_id = checkpoints.resumable_job_id(__file__, content_hash(syllabus_text.encode("utf-8")), difficulty, num_sets)
+        resumed = len(checkpoint_store.completed(job_id))
+        if resumed:
+            st.info(f"↩️ {resumed} von {num_sets} Sätzen sind bereits fertig – es wird dort fortgesetzt.")
+
         with st.spinner("✏️ Aufgabensätze werden erstellt …"):
 
-            doc = Document()
-            doc.add_heading("Mathematik – Aufgabensätze Klasse 5", 0)
-            doc.add_paragraph(
-                "Erstellt gemäß Lehrplan Gymnasium Sachsen-Anhalt "
-                "und den Kompetenzformulierungen der KMK.\n"
-            )
+            # Erstellt das ganze Dokument; gleichzeitige identische Anfragen teilen sich einen Lauf
+            def build_document():
+                doc = docx_writer.new_document()
+                doc.add_heading("Mathematik – Aufgabensätze Klasse 5", 0)
+                doc.add_paragraph(
+                    "Erstellt gemäß Lehrplan Gymnasium Sachsen-Anhalt "
+                    "und den Kompetenzformulierungen der KMK.\n"
+                )
 
-            question_number_global = 1
+                question_number_global = 1
 
-            for set_idx in range(1, num_sets + 1):
-                doc.add_heading(f"Aufgabensatz {set_idx}", level=1)
+                for set_idx in range(1, num_sets + 1):
+                    doc.add_heading(f"Aufgabensatz {set_idx}", level=1)
 
-                prompt = f"""
+                    prompt = f"""
 Du bist ein erfahrener deutscher Mathematiklehrer am Gymnasium.
 
 Erstelle auf Grundlage des folgenden **Lehrplans für die Jahrgangsstufe 5
@@ -163,32 +198,51 @@ Lehrplan:
 {syllabus_text}
 """
 
-                response = client.chat.completions.create(
-                    model="llama-3.3-70b-versatile",
-                    messages=[{"role": "user", "content": prompt}]
-                )
-
-                questions_text = response.choices[0].message.content
-
-                for line in questions_text.split("\n"):
-                    if line.strip():
-                        doc.add_paragraph(line.strip())
-
-                question_number_global += questions_per_set
-
-            # -----------------------
-            # DOCX speichern
-            # -----------------------
-
-            doc_io = io.BytesIO()
-            doc.save(doc_io)
-            doc_io.seek(0)
+                    # Schon von einem abgebrochenen Lauf gespeichert? Dann das Modell nicht erneut fragen
+                    questions_text = checkpoint_store.get(job_id, set_idx - 1)
+                    if questions_text is None:
+                        response = get_groq_client(API_KEY).chat.completions.create(
+                            model="llama-3.3-70b-versatile",
+                            messages=[{"role": "user", "content": prompt}]
+                        )
+                        questions_text = response.choices[0].message.content
+                        checkpoint_store.put(job_id, set_idx - 1, questions_text)
+
+                    for line in questions_text.split("\n"):
+                        if line.strip():
+                            doc.add_paragraph(line.strip())
+
+                    question_number_global += questions_per_set
+
+                # -----------------------
+                # DOCX speichern
+                # -----------------------
+
+                doc_io = io.BytesIO()
+                doc.save(doc_io)
+                return doc_io.getvalue()
+
+            docx_bytes, shared = singleflight.default_group().do(
+                singleflight.flight_key(content_hash(syllabus_text.encode("utf-8")), difficulty, num_sets, "v10"),
+                build_document
+            )
+            checkpoint_store.discard(job_id)
+            if shared:
+                st.info("🤝 Dieselben Aufgabensätze wurden gerade schon in einer anderen Sitzung erstellt – das Ergebnis wird mitbenutzt.")
 
             st.success("✅ DOCX-Datei erfolgreich erstellt!")
 
-            st.download_button(
-                label="📥 Aufgabensätze herunterladen (DOCX)",
-                data=doc_io,
+            save_artifact(
+                docx_bytes,
                 file_name=f"mathematik_klasse5_{difficulty}_{num_sets}_aufgabensaetze.docx",
-                mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+                mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+                label=f"📥 Aufgabensätze herunterladen (DOCX, {difficulty}, {num_sets} Sätze)"
             )
+
+    # Downloads (bleiben über Reruns erhalten)
+    show_download_buttons("📥 Erstellte Dateien")
+
+if syllabus_future is not None:
+    generation_panel(syllabus_future)
+else:
+    show_download_buttons("📥 Erstellte Dateien")
@@ -1,26 +1,13 @@
 import streamlit as st
-from groq import Groq
-import PyPDF2
-from docx import Document
-import tempfile
-import io
-
-# -----------------------
-# Hilfsfunktionen
-# -----------------------
-
-def extract_text_from_pdf(file):
-    pdf_reader = PyPDF2.PdfReader(file)
-    text = ""
-    for page in pdf_reader.pages:
-        extracted = page.extract_text()
-        if extracted:
-            text += extracted + "\n"
-    return text
-
-def extract_text_from_docx(file):
-    doc = Document(file)
-    return "\n".join([para.text for para in doc.paragraphs])
+from syllabus import SyllabusIngestor, content_hash, format_report
+from syllabus_library import SyllabusLibrary, format_entry
+from artifacts import show_download_buttons
+import jobs
+import checkpoints
+from singleflight import flight_key
+import functools
+from llm_worksheets import DIFFICULTIES, build_document, generate_set, groq_client
+import question_bank
 
 # -----------------------
 # UI
@@ -56,8 +43,22 @@ if "groq" not in st.secrets or "api_key" not in st.secrets["groq"]:
     st.error("❌ GROQ API-Schlüssel fehlt.")
     st.stop()
 
-client = Groq(api_key=st.secrets["groq"]["api_key"])
-syllabus_text = ""
+@st.cache_resource
+def get_groq_client(api_key):
+    # groq wird erst beim ersten Generieren importiert
+    return groq_client(api_key)
+
+@st.cache_resource
+def get_syllabus_library():
+    library = SyllabusLibrary()
+    library.warm_in_background()
+    return library
+
+@st.cache_resource
+def get_syllabus_ingestor():
+    return SyllabusIngestor(library=get_syllabus_library())
+
+syllabus_future = None
 
 # -----------------------
 # Datei lesen
@@ -66,20 +67,42 @@ syllabus_text = ""
 if uploaded_file:
     filetype = uploaded_file.name.split(".")[-1].lower()
 
-    with tempfile.NamedTemporaryFile(delete=False) as tmp:
-        tmp.write(uploaded_file.read())
-        tmp_path = tmp.name
-
-    if filetype == "pdf":
-        syllabus_text = extract_text_from_pdf(tmp_path)
-    elif filetype == "docx":
-        syllabus_text = extract_text_from_docx(tmp_path)
+    if filetype in ("pdf", "docx"):
+        syllabus_future = get_syllabus_ingestor().submit(uploaded_file.getvalue(), filetype, uploaded_file.name)
+        if not syllabus_future.done():
+            st.info("⏳ Text wird im Hintergrund extrahiert – die Einstellungen können schon gewählt werden.")
+        elif syllabus_future.exception() is not None:
+            st.error(f"Text konnte nicht extrahiert werden: {syllabus_future.exception()}")
+        else:
+            st.caption(format_report(syllabus_future.result()[1]))
+    else:
+        st.error("❌ Nicht unterstütztes Dateiformat.")
+
+else:
+    library_entries = get_syllabus_library().entries()
+    if library_entries:
+        library_choice = st.selectbox(
+            "… oder einen bereits verarbeiteten Lehrplan wählen",
+            options=library_entries,
+            index=None,
+            format_func=format_entry,
+            placeholder="Lehrplan-Bibliothek"
+        )
+        if library_choice:
+            syllabus_future = get_syllabus_ingestor().load(library_choice["key"])
+            st.caption(format_report(library_choice["report"]))
 
 # -----------------------
 # Einstellungen
 # -----------------------
 
-if syllabus_text:
+@st.fragment
+def generation_panel(syllabus_future):
+    """Einstellungen, Generierung, Jobs und Downloads.
+
+    Als Fragment läuft bei einer Widget-Änderung nur dieser Bereich neu,
+    nicht der Datei-Upload und die Textextraktion darüber.
+    """
     st.subheader("⚙️ Einstellungen")
 
     num_sets = st.number_input(
@@ -93,15 +116,10 @@ if syllabus_text:
 
     difficulty = st.select_slider(
         "Formaler Schwierigkeitsgrad:",
-        options=["Schwer", "Sehr schwer"],
+        options=list(DIFFICULTIES),
         value="Sehr schwer"
     )
 
-    difficulty_explanations = {
-        "Schwer": "anspruchsvolle Aufgaben mit mehreren Denk- und Rechenschritten",
-        "Sehr schwer": "hohe kognitive Anforderungen, Vergleich, Begründung, Transfer"
-    }
-
     st.write("🔍 **Hinweis:** Inhalt Klasse 5, Denkanspruch mindestens Klasse 6")
 
     # -----------------------
@@ -109,89 +127,68 @@ if syllabus_text:
     # -----------------------
 
     if st.button("🔥 Anspruchsvolle Aufgabensätze generieren"):
-        with st.spinner("Aufgaben werden erstellt …"):
-
-            doc = Document()
-            doc.add_heading("Mathematik – Anspruchsvolle Aufgabensätze", 0)
-            doc.add_paragraph(
-                "Lehrplan Klasse 5 (Gymnasium Sachsen-Anhalt)\n"
-                "Anforderungsniveau: Klasse 6 / erhöhte Kompetenzstufe\n"
-            )
-
-            question_number_global = 1
-
-            for set_idx in range(1, num_sets + 1):
-                doc.add_heading(f"Aufgabensatz {set_idx}", level=1)
-
-                prompt = f"""
-Du bist ein sehr erfahrener deutscher Mathematiklehrer am Gymnasium
-mit Schwerpunkt auf leistungsstarken Lerngruppen.
-
-Erstelle **genau {questions_per_set} unterschiedliche Mathematikaufgaben**
-auf Grundlage des folgenden **Lehrplans Klasse 5 (Gymnasium Sachsen-Anhalt)**.
-
-🎯 ZIEL:
-- Inhaltlich Klasse 5
-- **Denk- und Anspruchsniveau mindestens Klasse 6**
-
-🔀 ZUFÄLLIGKEIT (sehr wichtig):
-- Verteile die Aufgaben **zufällig und ausgewogen** auf alle Lehrplanbereiche
-- Verwende **unterschiedliche Zahlenräume, Kontexte, Darstellungen**
-- Vermeide erkennbare Muster oder Wiederholungen
-- Jede Aufgabe soll sich klar von den anderen unterscheiden
-
-📘 DIDAKTISCHE VORGABEN (KMK-Stil):
-- Schulbuchnahe, präzise Formulierungen
-- Klare Arbeitsaufträge
-- Häufig mehrschrittige Lösungswege erforderlich
-- Vergleichs-, Begründungs- und Transferaufgaben einbauen
-
-📌 AUFGABENTYPEN (mischen):
-- Anspruchsvolle Textaufgaben
-- Mehrschrittige Rechnungen
-- Geometrische Denkaufgaben
-- Brüche & natürliche Zahlen kombiniert
-- Sachprobleme mit Auswahl relevanter Informationen
-- Logische Schlussfolgerungen und Vergleiche
-
-🚫 STRIKT:
-- **Keine Lösungen**
-- **Keine Hinweise**
-- **Keine Zwischenschritte**
-
-🔢 Nummerierung:
-- Fortlaufend ab {question_number_global}
-
-📚 Lehrplan:
-{syllabus_text}
-"""
-
-                response = client.chat.completions.create(
-                    model="llama-3.3-70b-versatile",
-                    messages=[{"role": "user", "content": prompt}]
-                )
-
-                questions_text = response.choices[0].message.content
-
-                for line in questions_text.split("\n"):
-                    if line.strip():
-                        doc.add_paragraph(line.strip())
-
-                question_number_global += questions_per_set
-
-            # -----------------------
-            # Speichern
-            # -----------------------
-
-            output = io.BytesIO()
-            doc.save(output)
-            output.seek(0)
-
-            st.success("✅ Anspruchsvolle Aufgabensätze erstellt!")
-
-            st.download_button(
-                label="📥 DOCX herunterladen",
-                data=output,
-                file_name=f"mathematik_anspruchsvoll_klasse5_6_{num_sets}_sets.docx",
-                mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-            )
+        if not syllabus_future.done():
+            with st.spinner("Warte auf die Textextraktion …"):
+                syllabus_future.exception()
+        try:
+            syllabus_text, report = syllabus_future.result()
+        except Exception as e:
+            st.error(f"Text konnte nicht extrahiert werden: {e}")
+            st.stop()
+
+        syllabus_hash = content_hash(syllabus_text.encode("utf-8"))
+
+        # Nach einem Abbruch setzt ein neuer Versuch mit denselben Eingaben beim ersten fehlenden Satz fort
+        # (pro Lehrkraft: Sätze aus der Bank sind für sie gezogen)
+        user = question_bank.current_user()
+        job_id = checkpoints.resumable_job_id(__file__, syllabus_hash, difficulty, num_sets, user)
+        completed_sets = checkpoints.default_store().completed(job_id)
+        if completed_sets:
+            st.info(f"↩️ {len(completed_sets)} von {num_sets} Sätzen sind bereits fertig – es wird dort fortgesetzt.")
+
+        # Fehlende Sätze zuerst aus der Aufgabenbank, nur bei leerem Eimer vom Modell.
+        # Gezogen wird erst im Job-Schritt, damit nur ausgelieferte Aufgaben als ausgegeben gelten.
+        client = get_groq_client(st.secrets["groq"]["api_key"])
+        bank = question_bank.default_bank()
+        missing_sets = num_sets - len(completed_sets)
+        banked_sets = min(missing_sets, bank.available(syllabus_hash, difficulty, user) // questions_per_set)
+        if banked_sets:
+            steps = [
+                functools.partial(question_bank.bank_or_model_set, bank, client, syllabus_text, difficulty, user, set_idx, questions_per_set)
+                for set_idx in range(1, num_sets + 1)
+            ]
+        else:
+            steps = [
+                functools.partial(generate_set, client, syllabus_text, set_idx, questions_per_set)
+                for set_idx in range(1, num_sets + 1)
+            ]
+        question_bank.refill_in_background(bank, client, syllabus_text, difficulty, user)
+        if banked_sets:
+            st.info(f"📚 Voraussichtlich {banked_sets} von {missing_sets} fehlenden Sätzen aus der Aufgabenbank.")
+
+        started_id = jobs.start_job(
+            f"{num_sets} anspruchsvolle Sätze ({difficulty})",
+            steps,
+            build_document,
+            file_name=f"mathematik_anspruchsvoll_klasse5_6_{num_sets}_sets.docx",
+            mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+            job_id=job_id,
+            checkpoints=checkpoints.default_store(),
+            # Gleiche Eingaben aus einer anderen Sitzung, die gerade laufen, werden mitbenutzt
+            # (nur bei reiner Modell-Generierung; Sätze aus der Bank sind pro Lehrkraft gezogen)
+            flight_key=None if banked_sets else flight_key(syllabus_hash, difficulty, num_sets, "v11")
+        )
+        if started_id != job_id:
+            st.info("🤝 Dieselben Aufgabensätze werden gerade schon erstellt – das Ergebnis wird mitbenutzt.")
+        else:
+            st.success("✅ Generierung gestartet – sie läuft auch weiter, wenn die Seite neu geladen wird.")
+
+    # Jobs und Downloads (bleiben über Reruns erhalten)
+    jobs.show_jobs()
+    show_download_buttons("📥 Erstellte Dateien")
+
+if syllabus_future is not None:
+    generation_panel(syllabus_future)
+else:
+    jobs.show_jobs()
+    show_download_buttons("📥 Erstellte Dateien")
@@ -1,8 +1,10 @@
 import streamlit as st
 import random
-from docx import Document
 from io import BytesIO
 import zipfile
+import docx_writer
+import worksheet_pool
+import seed_log
 import os
 import time # Optional: Nur für eine kurze Verzögerung im Spinner
 
@@ -154,16 +156,34 @@ def create_single_problem_set(num_problems=50):
     return problems
 
 
-def create_word_document(problems, set_number):
-    """Erstellt ein Word-Dokument (im Speicher) und gibt es als Bytes zurück."""
-    document = Document()
-    document.add_heading(f'Mathematikaufgaben Gymnasium Kl. 5 (Sachsen-Anhalt) - Set {set_number}', 0)
+def create_word_document(problems, set_number, fast=False):
+    """Erstellt ein Word-Dokument (im Speicher) und gibt es als Bytes zurück.
+
+    Mit fast=True wird das Dokument direkt als OOXML geschrieben (siehe docx_writer.py).
+    """
+    title = f'Mathematikaufgaben Gymnasium Kl. 5 (Sachsen-Anhalt) - Set {set_number}'
+    if fast:
+        return docx_writer.render_worksheet(title, None, problems)
+    document = docx_writer.new_document()
+    document.add_heading(title, 0)
     for problem in problems:
         document.add_paragraph(problem)
-    bio = BytesIO()
-    document.save(bio)
-    bio.seek(0)
-    return bio.getvalue()
+    return docx_writer.save_document(document)
+
+def create_combined_word_document(problem_sets):
+    """Schreibt alle Aufgabensätze in ein einziges Word-Dokument (Überschrift und Seitenumbruch pro Satz)."""
+    return docx_writer.render_combined_worksheets(
+        (
+            f'Mathematikaufgaben Gymnasium Kl. 5 (Sachsen-Anhalt) - Set {set_number}',
+            None,
+            problems,
+        )
+        for set_number, problems in enumerate(problem_sets, 1)
+    )
+
+def ready_sets():
+    """Vorrat fertig gerenderter Sätze dieser App (Satznummern 1 bis 30)."""
+    return worksheet_pool.default_pool(__file__, 30)
 
 def main():
     st.set_page_config(page_title="Matheaufgaben Generator (Gymnasium 5)", layout="centered")
@@ -186,9 +206,31 @@ def main():
         help="Der Browser kann Dateien nicht direkt dorthin speichern. Der Pfad dient nur als Hinweis."
     )
     
+    single_document = st.checkbox(
+        "3. Alle Sätze in einer einzigen DOCX-Datei (ein Satz pro Seite)",
+        value=False,
+        help="Statt einer ZIP-Datei mit einem Dokument pro Satz. Deutlich kleiner und schneller, z. B. für Klassensätze mit 30+ Varianten."
+    )
+    
     st.markdown("---")
+    st.caption(f"📦 Vorrat: {ready_sets().summary()}")
+
+    if st.button(f"Starte Generierung von {num_sets} Sätzen und erstelle {'DOCX-Datei' if single_document else 'ZIP-Datei'}"):
+        issue = seed_log.new_issue(None if single_document else ready_sets())
+        if single_document:
+            with st.spinner(f"Generiere {num_sets} Aufgabensätze in einem Dokument..."):
+                problem_sets = [seed_log.issue_problems(__file__, i, issue) for i in range(1, int(num_sets) + 1)]
+                docx_bytes = create_combined_word_document(problem_sets)
+            st.success(f"✅ {num_sets} Aufgabensätze in einer DOCX-Datei erstellt ({len(docx_bytes) / 1024:.0f} KB).")
+            st.download_button(
+                label="Alle Sätze als DOCX-Datei herunterladen",
+                data=docx_bytes,
+                file_name="Matheaufgaben_Klasse_5_Sets.docx",
+                mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+                key='download_docx_button'
+            )
+            return
 
-    if st.button(f"Starte Generierung von {num_sets} Sätzen und erstelle ZIP-Datei"):
         
         # 1. ZIP-Archiv im Speicher vorbereiten
         zip_buffer = BytesIO()
@@ -201,8 +243,8 @@ def main():
                 
                 for i in range(1, int(num_sets) + 1):
                     # Generiere und erstelle Word-Datei (als Bytes)
-                    problems = create_single_problem_set(num_problems=50)
-                    docx_bytes = create_word_document(problems, i)
+                    # Aus dem Lauf der Ausgabe oder frisch aus ihrem Seed; der Seed landet im Ausgabeprotokoll
+                    docx_bytes = seed_log.issue_set(ready_sets(), i, issue)
                     filename = f"Matheaufgaben_Set_{i}.docx"
                     
                     # Füge die Word-Datei zur ZIP-Datei hinzu
@@ -1,6 +1,6 @@
 import streamlit as st
 import random
-from docx import Document
+import docx_writer
 from io import BytesIO
 import zipfile
 import os
@@ -30,7 +30,7 @@ def create_single_problem_set(num_problems=50):
 
 def create_word_document(problems, set_number):
     """Erstellt ein Word-Dokument (im Speicher) und gibt es als Bytes zurück."""
-    document = Document()
+    document = docx_writer.new_document()
     document.add_heading(f'Schwere Mathematikaufgaben Gymnasium Kl. 5 (Sachsen-Anhalt) - Set {set_number}', 0)
     document.add_paragraph("Dies sind Übungen mit erhöhtem Schwierigkeitsgrad.")
     for problem in problems:
@@ -1,12 +1,18 @@
 import streamlit as st
 import random
-from docx import Document
 from io import BytesIO
 import zipfile
+import docx_writer
+import worksheet_pool
+import seed_log
+import problem_space
+from problem_space import Choice, Range, Variant, generator
 import os
 import time # Used for simulated processing time/clearer status updates
 
 # --- Generator Functions (Tough Problems - DEFINED HERE) ---
+# Symmetrie und Textaufgabe haben kleine Parameterräume und sind deshalb
+# beschrieben (siehe problem_space.py); die übrigen ziehen frei.
 
 GENERATORS = []
 
@@ -101,37 +107,44 @@ def generate_geometry_perimeter_area_tough():
 GENERATORS.append(generate_geometry_perimeter_area_tough)
 
 # --- Tough Symmetry/Coordinates ---
-def generate_symmetry_tough():
-    if random.choice([True, False]):
-        figure = random.choice(['gleichschenkliges Trapez', 'Rhombus'])
+@generator(
+    Variant(1/2, figure=Choice(['gleichschenkliges Trapez', 'Rhombus'])),
+    Variant(1/2, x=Range(1, 5), y=Range(1, 5)),
+    label="Symmetrie und Koordinaten",
+)
+def generate_symmetry_tough(figure=None, x=None, y=None):
+    if figure:
         return f"Zeichnen Sie ein {figure} und bestimmen Sie die Anzahl seiner Symmetrieachsen."
     else:
-        x, y = random.randint(1, 5), random.randint(1, 5)
         return f"Der Punkt P({x}|{y}) wird an der y-Achse gespiegelt. Geben Sie die neuen Koordinaten P' an."
 GENERATORS.append(generate_symmetry_tough)
 
 # --- Tough Word Problem ---
-def generate_word_problem_tough():
-    item_count = random.randint(5, 15)
-    price = random.randint(2, 8)
-    weight_g = random.randint(100, 500)
+@generator(
+    Variant(1, item_count=Range(5, 15), price=Range(2, 8), weight_g=Range(100, 500)),
+    label="Textaufgabe",
+)
+def generate_word_problem_tough(item_count, price, weight_g):
     return f"Ein Händler kauft {item_count} Kisten Äpfel zu je {price}€ pro Kiste. Jede Kiste wiegt {weight_g} g. Wie viel bezahlt er insgesamt und wie schwer sind alle Kisten zusammen in Kilogramm?"
 GENERATORS.append(generate_word_problem_tough)
 
+# Mindestanzahl Aufgaben pro Generator und Satz
+MIN_PER_CATEGORY = 7
+
 # --- Document and Helper Functions (Unchanged Logic) ---
 
-def create_single_problem_set(num_problems=50):
+def create_single_problem_set(num_problems=50, generators=None):
     problems = []
-    min_per_category = 7 
+    generators = generators or GENERATORS
     required_problems = []
     
-    for generator in GENERATORS:
-        for _ in range(min_per_category):
+    for generator in generators:
+        for _ in range(MIN_PER_CATEGORY):
             required_problems.append(generator)
             
     num_random_fill = num_problems - len(required_problems)
     for _ in range(num_random_fill):
-        required_problems.append(random.choice(GENERATORS))
+        required_problems.append(random.choice(generators))
         
     random.shuffle(required_problems)
     
@@ -141,16 +154,28 @@ def create_single_problem_set(num_problems=50):
         
     return problems
 
-def create_word_document(problems, set_number):
-    document = Document()
-    document.add_heading(f'Schwere Mathematikaufgaben Gymnasium Kl. 5 (Sachsen-Anhalt) - Set {set_number}', 0)
-    document.add_paragraph("Dies sind Übungen mit erhöhtem Schwierigkeitsgrad.")
+def create_word_document(problems, set_number, fast=False):
+    title = f'Schwere Mathematikaufgaben Gymnasium Kl. 5 (Sachsen-Anhalt) - Set {set_number}'
+    intro = "Dies sind Übungen mit erhöhtem Schwierigkeitsgrad."
+    if fast:
+        return docx_writer.render_worksheet(title, intro, problems)
+    document = docx_writer.new_document()
+    document.add_heading(title, 0)
+    document.add_paragraph(intro)
     for problem in problems:
         document.add_paragraph(problem)
-    bio = BytesIO()
-    document.save(bio)
-    bio.seek(0)
-    return bio.getvalue()
+    return docx_writer.save_document(document)
+
+def create_combined_word_document(problem_sets):
+    """Schreibt alle Aufgabensätze in ein einziges Word-Dokument (Überschrift und Seitenumbruch pro Satz)."""
+    return docx_writer.render_combined_worksheets(
+        (
+            f'Schwere Mathematikaufgaben Gymnasium Kl. 5 (Sachsen-Anhalt) - Set {set_number}',
+            "Dies sind Übungen mit erhöhtem Schwierigkeitsgrad.",
+            problems,
+        )
+        for set_number, problems in enumerate(problem_sets, 1)
+    )
 
 # --- Streamlit Login and Main Program ---
 
@@ -177,6 +202,10 @@ def login_form():
             else:
                 st.error("Ungültiger Benutzername oder Passwort.")
 
+def ready_sets():
+    """Vorrat fertig gerenderter Sätze dieser App (Satznummern 1 bis 10)."""
+    return worksheet_pool.default_pool(__file__, 10)
+
 def main_app():
     """Die Hauptanwendung, die nur nach erfolgreichem Login angezeigt wird."""
     st.title("💪 Matheaufgaben Generator (Hoher Schwierigkeitsgrad)")
@@ -198,9 +227,38 @@ def main_app():
         help="Der Pfad dient nur als Hinweis, der Download erfolgt über den Browser."
     )
     
+    single_document = st.checkbox(
+        "3. Alle Sätze in einer einzigen DOCX-Datei (ein Satz pro Seite)",
+        value=False,
+        help="Statt einer ZIP-Datei mit einem Dokument pro Satz. Deutlich kleiner und schneller, z. B. für Klassensätze mit 30+ Varianten."
+    )
+    
+    repeated = problem_space.repeated_generators(GENERATORS, int(num_sets), MIN_PER_CATEGORY)
+    if repeated:
+        st.warning(
+            "⚠️ Bei {} Sätzen wiederholen sich zwangsläufig Aufgaben: ".format(int(num_sets))
+            + ", ".join(f"{g.label} ({g.cardinality} verschiedene, mindestens {needed} benötigt)" for g, needed in repeated)
+        )
+
     st.markdown("---")
+    st.caption(f"📦 Vorrat: {ready_sets().summary()}")
+
+    if st.button(f"Starte Generierung von {num_sets} Sätzen und erstelle {'DOCX-Datei' if single_document else 'ZIP-Datei'}"):
+        issue = seed_log.new_issue(None if single_document else ready_sets())
+        if single_document:
+            with st.spinner(f"Generiere {num_sets} Aufgabensätze in einem Dokument..."):
+                problem_sets = [seed_log.issue_problems(__file__, i, issue) for i in range(1, int(num_sets) + 1)]
+                docx_bytes = create_combined_word_document(problem_sets)
+            st.success(f"✅ {num_sets} Aufgabensätze in einer DOCX-Datei erstellt ({len(docx_bytes) / 1024:.0f} KB).")
+            st.download_button(
+                label="Alle Sätze als DOCX-Datei herunterladen",
+                data=docx_bytes,
+                file_name="Matheaufgaben_Klasse_5_SCHWER.docx",
+                mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+                key='download_docx_button'
+            )
+            return
 
-    if st.button(f"Starte Generierung von {num_sets} Sätzen und erstelle ZIP-Datei"):
         
         # 1. ZIP-Archiv im Speicher vorbereiten
         zip_buffer = BytesIO()
@@ -215,8 +273,8 @@ def main_app():
                     status.write(f"➡️ **Set {i}/{num_sets}:** Erstelle 50 schwere Aufgaben...")
                     
                     # Generiere und erstelle Word-Datei (als Bytes)
-                    problems = create_single_problem_set(num_problems=50)
-                    docx_bytes = create_word_document(problems, i)
+                    # Aus dem Lauf der Ausgabe oder frisch aus ihrem Seed; der Seed landet im Ausgabeprotokoll
+                    docx_bytes = seed_log.issue_set(ready_sets(), i, issue)
                     filename = f"Matheaufgaben_Set_SCHWER_{i}.docx"
                     
                     # Füge die Word-Datei zur ZIP-Datei hinzu
@@ -1,6 +1,5 @@
 import streamlit as st
-from openai import OpenAI
-from docx import Document
+import docx_writer
 from io import BytesIO
 import zipfile
 import time
@@ -89,7 +88,7 @@ def generate_problems_with_ai(client, set_num, num_problems=50):
 # --- Document Helper ---
 
 def create_word_document(problems, set_number):
-    document = Document()
+    document = docx_writer.new_document()
     document.add_heading(f'Gymnasium Kl. 5 (Sachsen-Anhalt) - AI Set {set_number}', 0)
     document.add_paragraph("Generiert basierend auf dem aktuellen Rahmenlehrplan.")
     
@@ -138,6 +137,8 @@ def main():
             st.error(t['error_api'])
             return
 
+        # openai erst beim Start der Generierung importieren (schnellerer Seitenaufbau)
+        from openai import OpenAI
         client = OpenAI(api_key=api_key)
         zip_buffer = BytesIO()
         
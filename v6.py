@@ -1,6 +1,5 @@
 import streamlit as st
-import google.generativeai as genai
-from docx import Document
+import docx_writer
 from io import BytesIO
 import zipfile
 import time
@@ -45,6 +44,8 @@ def generate_problems_with_gemini(api_key, set_num, num_problems=50):
     """
     Uses Google Gemini to generate a structured list of math problems.
     """
+    # Erst hier importieren: google.generativeai zieht grpc und protobuf nach sich
+    import google.generativeai as genai
     genai.configure(api_key=api_key)
     
     # Use 'gemini-1.5-flash' for speed or 'gemini-1.5-pro' for complex reasoning
@@ -83,7 +84,7 @@ def generate_problems_with_gemini(api_key, set_num, num_problems=50):
 # --- Document Helper ---
 
 def create_word_document(problems, set_number):
-    document = Document()
+    document = docx_writer.new_document()
     document.add_heading(f'Set {set_number}', 0)
     document.add_paragraph("Generiert mit Google Gemini basierend auf dem Rahmenlehrplan.")
     for problem in problems:
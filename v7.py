@@ -1,27 +1,5 @@
 import streamlit as st
-from groq import Groq
-import PyPDF2
-from docx import Document
-import tempfile
-
-# -----------------------
-# Utility: Extract text
-# -----------------------
-
-def extract_text_from_pdf(file):
-    pdf_reader = PyPDF2.PdfReader(file)
-    text = ""
-    for page in pdf_reader.pages:
-        extracted = page.extract_text()
-        if extracted:
-            text += extracted + "\n"
-    return text
-
-
-def extract_text_from_docx(file):
-    doc = Document(file)
-    return "\n".join([para.text for para in doc.paragraphs])
-
+from syllabus import SyllabusIngestor, format_report
 
 # -----------------------
 # Streamlit App UI
@@ -46,9 +24,18 @@ if "groq" not in st.secrets or "api_key" not in st.secrets["groq"]:
     st.stop()
 
 API_KEY = st.secrets["groq"]["api_key"]
-client = Groq(api_key=API_KEY)
 
-syllabus_text = ""
+@st.cache_resource
+def get_groq_client(api_key):
+    # groq is only imported on the first generation
+    from groq import Groq
+    return Groq(api_key=api_key)
+
+@st.cache_resource
+def get_syllabus_ingestor():
+    return SyllabusIngestor()
+
+syllabus_future = None
 
 # -----------------------
 # File Processing
@@ -57,24 +44,14 @@ syllabus_text = ""
 if uploaded_file:
     filetype = uploaded_file.name.split(".")[-1].lower()
 
-    with tempfile.NamedTemporaryFile(delete=False) as tmp:
-        tmp.write(uploaded_file.read())
-        tmp_path = tmp.name
-
-    if filetype == "pdf":
-        st.info("Extracting text from PDF…")
-        try:
-            syllabus_text = extract_text_from_pdf(tmp_path)
-        except Exception as e:
-            st.error(f"Failed to extract PDF: {e}")
-
-    elif filetype == "docx":
-        st.info("Extracting text from DOCX…")
-        try:
-            syllabus_text = extract_text_from_docx(tmp_path)
-        except Exception as e:
-            st.error(f"Failed to extract DOCX: {e}")
-
+    if filetype in ("pdf", "docx"):
+        syllabus_future = get_syllabus_ingestor().submit(uploaded_file.getvalue(), filetype)
+        if not syllabus_future.done():
+            st.info("⏳ Extracting text in the background – you can already choose the settings.")
+        elif syllabus_future.exception() is not None:
+            st.error(f"Failed to extract {filetype.upper()}: {syllabus_future.exception()}")
+        else:
+            st.caption(format_report(syllabus_future.result()[1], lang="en"))
     else:
         st.error("Unsupported file type.")
 
@@ -83,13 +60,23 @@ if uploaded_file:
 # Show Preview + Generate Questions
 # -----------------------
 
-if syllabus_text:
-    st.subheader("📄 Extracted Syllabus Text (Preview)")
-    st.text_area("", syllabus_text[:4000], height=300)
+if syllabus_future is not None:
+    if syllabus_future.done() and syllabus_future.exception() is None:
+        st.subheader("📄 Extracted Syllabus Text (Preview)")
+        st.text_area("", syllabus_future.result()[0][:4000], height=300)
 
     st.subheader("🧠 Generate 50 Tough Math Questions")
 
     if st.button("Generate Questions"):
+        if not syllabus_future.done():
+            with st.spinner("Waiting for text extraction…"):
+                syllabus_future.exception()
+        try:
+            syllabus_text, report = syllabus_future.result()
+        except Exception as e:
+            st.error(f"Failed to extract {filetype.upper()}: {e}")
+            st.stop()
+
         with st.spinner("Generating 50 challenging questions with Groq…"):
             prompt = f"""
             You are an expert mathematics teacher.
@@ -110,7 +97,7 @@ if syllabus_text:
             {syllabus_text}
             """
 
-            response = client.chat.completions.create(
+            response = get_groq_client(API_KEY).chat.completions.create(
                 model="llama-3.3-70b-versatile",
                 messages=[{"role": "user", "content": prompt}]
             )
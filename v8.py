@@ -1,27 +1,9 @@
 import streamlit as st
-from groq import Groq
-import PyPDF2
-from docx import Document
-import tempfile
+import docx_writer
 import io
 import math
-
-# -----------------------
-# Utility: Extract text
-# -----------------------
-
-def extract_text_from_pdf(file):
-    pdf_reader = PyPDF2.PdfReader(file)
-    text = ""
-    for page in pdf_reader.pages:
-        extracted = page.extract_text()
-        if extracted:
-            text += extracted + "\n"
-    return text
-
-def extract_text_from_docx(file):
-    doc = Document(file)
-    return "\n".join([para.text for para in doc.paragraphs])
+from syllabus import SyllabusIngestor, content_hash, format_report
+import checkpoints
 
 # -----------------------
 # Streamlit App UI
@@ -47,9 +29,19 @@ if "groq" not in st.secrets or "api_key" not in st.secrets["groq"]:
     st.stop()
 
 API_KEY = st.secrets["groq"]["api_key"]
-client = Groq(api_key=API_KEY)
 
-syllabus_text = ""
+@st.cache_resource
+def get_groq_client(api_key):
+    # groq is only imported on the first generation
+    from groq import Groq
+    return Groq(api_key=api_key)
+
+
+@st.cache_resource
+def get_syllabus_ingestor():
+    return SyllabusIngestor()
+
+syllabus_future = None
 
 # -----------------------
 # File Processing
@@ -58,24 +50,14 @@ syllabus_text = ""
 if uploaded_file:
     filetype = uploaded_file.name.split(".")[-1].lower()
 
-    with tempfile.NamedTemporaryFile(delete=False) as tmp:
-        tmp.write(uploaded_file.read())
-        tmp_path = tmp.name
-
-    if filetype == "pdf":
-        st.info("Extracting text from PDF…")
-        try:
-            syllabus_text = extract_text_from_pdf(tmp_path)
-        except Exception as e:
-            st.error(f"Failed to extract PDF: {e}")
-
-    elif filetype == "docx":
-        st.info("Extracting text from DOCX…")
-        try:
-            syllabus_text = extract_text_from_docx(tmp_path)
-        except Exception as e:
-            st.error(f"Failed to extract DOCX: {e}")
-
+    if filetype in ("pdf", "docx"):
+        syllabus_future = get_syllabus_ingestor().submit(uploaded_file.getvalue(), filetype)
+        if not syllabus_future.done():
+            st.info("⏳ Extracting text in the background – you can already choose the settings.")
+        elif syllabus_future.exception() is not None:
+            st.error(f"Failed to extract {filetype.upper()}: {syllabus_future.exception()}")
+        else:
+            st.caption(format_report(syllabus_future.result()[1], lang="en"))
     else:
         st.error("Unsupported file type.")
 
@@ -83,7 +65,13 @@ if uploaded_file:
 # Question settings
 # -----------------------
 
-if syllabus_text:
+@st.fragment
+def generation_panel(syllabus_future):
+    """Settings and generation.
+
+    As a fragment, changing a widget only reruns this panel,
+    not the upload handling and text extraction above.
+    """
     st.subheader("⚙️ Question Settings")
 
     num_questions = st.number_input(
@@ -110,9 +98,25 @@ if syllabus_text:
     st.write(f"**Difficulty selected:** {difficulty} — {difficulty_explanations[difficulty]}")
 
     if st.button("Generate Questions DOCX"):
+        if not syllabus_future.done():
+            with st.spinner("Waiting for text extraction…"):
+                syllabus_future.exception()
+        try:
+            syllabus_text, report = syllabus_future.result()
+        except Exception as e:
+            st.error(f"Failed to extract syllabus text: {e}")
+            st.stop()
+
+        # A retry with the same inputs resumes at the first missing part
+        checkpoint_store = checkpoints.default_store()
+        job_id = checkpoints.resumable_job_id(__file__, content_hash(syllabus_text.encode("utf-8")), difficulty, num_questions)
+        resumed = len(checkpoint_store.completed(job_id))
+        if resumed:
+            st.info(f"↩️ {resumed} chunk(s) were already generated by an interrupted run – resuming from there.")
+
         with st.spinner(f"Generating {num_questions} questions at {difficulty} difficulty…"):
             
-            doc = Document()
+            doc = docx_writer.new_document()
             doc.add_heading(f"{num_questions} {difficulty} Math Questions", 0)
             doc.add_paragraph("Generated from Sachsen-Anhalt Gymnasium Grade 5 syllabus.\n")
             
@@ -146,12 +150,15 @@ if syllabus_text:
                 {syllabus_text}
                 """
 
-                response = client.chat.completions.create(
-                    model="llama-3.3-70b-versatile",
-                    messages=[{"role": "user", "content": prompt}]
-                )
-
-                questions_text = response.choices[0].message.content
+                # Already checkpointed by an interrupted run? Then don't ask the model again
+                questions_text = checkpoint_store.get(job_id, chunk_idx)
+                if questions_text is None:
+                    response = get_groq_client(API_KEY).chat.completions.create(
+                        model="llama-3.3-70b-versatile",
+                        messages=[{"role": "user", "content": prompt}]
+                    )
+                    questions_text = response.choices[0].message.content
+                    checkpoint_store.put(job_id, chunk_idx, questions_text)
 
                 # Add questions to DOCX
                 for line in questions_text.split("\n"):
@@ -165,6 +172,7 @@ if syllabus_text:
             doc_io = io.BytesIO()
             doc.save(doc_io)
             doc_io.seek(0)
+            checkpoint_store.discard(job_id)
 
             st.success(f"DOCX file ready with {num_questions} questions! 🎉")
 
@@ -174,3 +182,6 @@ if syllabus_text:
                 file_name=f"math_questions_{difficulty}_{num_questions}.docx",
                 mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
             )
+
+if syllabus_future is not None:
+    generation_panel(syllabus_future)
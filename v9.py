@@ -1,26 +1,11 @@
 import streamlit as st
-from groq import Groq
-import PyPDF2
-from docx import Document
-import tempfile
+import docx_writer
 import io
-
-# -----------------------
-# Utility: Extract text
-# -----------------------
-
-def extract_text_from_pdf(file):
-    pdf_reader = PyPDF2.PdfReader(file)
-    text = ""
-    for page in pdf_reader.pages:
-        extracted = page.extract_text()
-        if extracted:
-            text += extracted + "\n"
-    return text
-
-def extract_text_from_docx(file):
-    doc = Document(file)
-    return "\n".join([para.text for para in doc.paragraphs])
+from syllabus import SyllabusIngestor, content_hash, format_report
+from syllabus_library import SyllabusLibrary, format_entry
+from artifacts import save_artifact, show_download_buttons
+import checkpoints
+import singleflight
 
 # -----------------------
 # Streamlit App UI
@@ -46,9 +31,25 @@ if "groq" not in st.secrets or "api_key" not in st.secrets["groq"]:
     st.stop()
 
 API_KEY = st.secrets["groq"]["api_key"]
-client = Groq(api_key=API_KEY)
 
-syllabus_text = ""
+@st.cache_resource
+def get_groq_client(api_key):
+    # groq is only imported on the first generation
+    from groq import Groq
+    return Groq(api_key=api_key)
+
+
+@st.cache_resource
+def get_syllabus_library():
+    library = SyllabusLibrary()
+    library.warm_in_background()
+    return library
+
+@st.cache_resource
+def get_syllabus_ingestor():
+    return SyllabusIngestor(library=get_syllabus_library())
+
+syllabus_future = None
 
 # -----------------------
 # File Processing
@@ -57,32 +58,42 @@ syllabus_text = ""
 if uploaded_file:
     filetype = uploaded_file.name.split(".")[-1].lower()
 
-    with tempfile.NamedTemporaryFile(delete=False) as tmp:
-        tmp.write(uploaded_file.read())
-        tmp_path = tmp.name
-
-    if filetype == "pdf":
-        st.info("Extracting text from PDF…")
-        try:
-            syllabus_text = extract_text_from_pdf(tmp_path)
-        except Exception as e:
-            st.error(f"Failed to extract PDF: {e}")
-
-    elif filetype == "docx":
-        st.info("Extracting text from DOCX…")
-        try:
-            syllabus_text = extract_text_from_docx(tmp_path)
-        except Exception as e:
-            st.error(f"Failed to extract DOCX: {e}")
-
+    if filetype in ("pdf", "docx"):
+        syllabus_future = get_syllabus_ingestor().submit(uploaded_file.getvalue(), filetype, uploaded_file.name)
+        if not syllabus_future.done():
+            st.info("⏳ Extracting text in the background – you can already choose the settings.")
+        elif syllabus_future.exception() is not None:
+            st.error(f"Failed to extract {filetype.upper()}: {syllabus_future.exception()}")
+        else:
+            st.caption(format_report(syllabus_future.result()[1], lang="en"))
     else:
         st.error("Unsupported file type.")
 
+else:
+    library_entries = get_syllabus_library().entries()
+    if library_entries:
+        library_choice = st.selectbox(
+            "…or pick a previously processed syllabus",
+            options=library_entries,
+            index=None,
+            format_func=format_entry,
+            placeholder="Syllabus library"
+        )
+        if library_choice:
+            syllabus_future = get_syllabus_ingestor().load(library_choice["key"])
+            st.caption(format_report(library_choice["report"], lang="en"))
+
 # -----------------------
 # Question settings
 # -----------------------
 
-if syllabus_text:
+@st.fragment
+def generation_panel(syllabus_future):
+    """Settings, generation and downloads.
+
+    As a fragment, changing a widget only reruns this panel,
+    not the upload handling and text extraction above.
+    """
     st.subheader("⚙️ Question Settings")
 
     num_sets = st.number_input(
@@ -112,18 +123,36 @@ if syllabus_text:
     st.write(f"**Each set will contain:** {questions_per_set} questions")
 
     if st.button("Generate Sets (DOCX)"):
+        if not syllabus_future.done():
+            with st.spinner("Waiting for text extraction…"):
+                syllabus_future.exception()
+        try:
+            syllabus_text, report = syllabus_future.result()
+        except Exception as e:
+            st.error(f"Failed to extract syllabus text: {e}")
+            st.stop()
+
+        # A retry with the same inputs resumes at the first missing part
+        checkpoint_store = checkpoints.default_store()
+        job_id = checkpoints.resumable_job_id(__file__, content_hash(syllabus_text.encode("utf-8")), difficulty, num_sets)
+        resumed = len(checkpoint_store.completed(job_id))
+        if resumed:
+            st.info(f"↩️ {resumed} of {num_sets} sets were already generated by an interrupted run – resuming from there.")
+
         with st.spinner(f"Generating {num_sets} sets at {difficulty} difficulty…"):
             
-            doc = Document()
-            doc.add_heading(f"Interactive Math Question Sets", 0)
-            doc.add_paragraph("Generated from Sachsen-Anhalt Gymnasium Grade 5 syllabus.\n")
+            # Builds the whole document; identical concurrent requests share one run
+            def build_document():
+                doc = docx_writer.new_document()
+                doc.add_heading(f"Interactive Math Question Sets", 0)
+                doc.add_paragraph("Generated from Sachsen-Anhalt Gymnasium Grade 5 syllabus.\n")
 
-            question_number_global = 1
+                question_number_global = 1
 
-            for set_idx in range(1, num_sets+1):
-                doc.add_heading(f"Set {set_idx}", level=1)
+                for set_idx in range(1, num_sets+1):
+                    doc.add_heading(f"Set {set_idx}", level=1)
 
-                prompt = f"""
+                    prompt = f"""
                 You are an expert mathematics teacher.
 
                 Based on the following **grade 5 Gymnasium syllabus for Sachsen-Anhalt**, 
@@ -145,30 +174,49 @@ if syllabus_text:
                 {syllabus_text}
                 """
 
-                response = client.chat.completions.create(
-                    model="llama-3.3-70b-versatile",
-                    messages=[{"role": "user", "content": prompt}]
-                )
-
-                questions_text = response.choices[0].message.content
-
-                # Add questions to DOCX
-                for line in questions_text.split("\n"):
-                    if line.strip():
-                        doc.add_paragraph(line.strip())
-
-                question_number_global += questions_per_set
-
-            # Save DOCX to BytesIO
-            doc_io = io.BytesIO()
-            doc.save(doc_io)
-            doc_io.seek(0)
+                    # Already checkpointed by an interrupted run? Then don't ask the model again
+                    questions_text = checkpoint_store.get(job_id, set_idx - 1)
+                    if questions_text is None:
+                        response = get_groq_client(API_KEY).chat.completions.create(
+                            model="llama-3.3-70b-versatile",
+                            messages=[{"role": "user", "content": prompt}]
+                        )
+                        questions_text = response.choices[0].message.content
+                        checkpoint_store.put(job_id, set_idx - 1, questions_text)
+
+                    # Add questions to DOCX
+                    for line in questions_text.split("\n"):
+                        if line.strip():
+                            doc.add_paragraph(line.strip())
+
+                    question_number_global += questions_per_set
+
+                # Save DOCX to BytesIO
+                doc_io = io.BytesIO()
+                doc.save(doc_io)
+                return doc_io.getvalue()
+
+            docx_bytes, shared = singleflight.default_group().do(
+                singleflight.flight_key(content_hash(syllabus_text.encode("utf-8")), difficulty, num_sets, "v9"),
+                build_document
+            )
+            checkpoint_store.discard(job_id)
+            if shared:
+                st.info("🤝 The same sets were already being generated in another session – sharing that result.")
 
             st.success(f"DOCX file ready with {num_sets} sets! 🎉")
 
-            st.download_button(
-                label="📥 Download All Sets (DOCX)",
-                data=doc_io,
+            save_artifact(
+                docx_bytes,
                 file_name=f"math_question_sets_{difficulty}_{num_sets}sets.docx",
-                mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+                mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+                label=f"📥 Download All Sets (DOCX, {difficulty}, {num_sets} sets)"
             )
+
+    # Downloads (survive reruns until evicted)
+    show_download_buttons("📥 Generated files")
+
+if syllabus_future is not None:
+    generation_panel(syllabus_future)
+else:
+    show_download_buttons("📥 Generated files")
@@ -0,0 +1,367 @@
+import importlib
+import math
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+
+
+# -----------------------
+# Begrenzter Worker-Pool mit Gegendruck
+# -----------------------
+#
+# Hüllt einen concurrent.futures-Executor ein und begrenzt die Zahl der
+# angenommenen, noch nicht fertigen Aufgaben. Ist die Warteschlange voll,
+# wird sofort PoolSaturated ausgelöst, statt Anfragen unbegrenzt zu stauen;
+# der HTTP-Dienst antwortet dann mit 503 und Retry-After.
+
+
+class PoolSaturated(Exception):
+    """Die Warteschlange ist voll; retry_after gibt eine Schätzung in Sekunden."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Warteschlange voll, erneut versuchen in {retry_after} s")
+        self.retry_after = retry_after
+
+
+class WorkerPool:
+    def __init__(self, executor, workers, max_pending):
+        self.executor = executor
+        self.workers = workers
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._avg_seconds = None
+        self.completed = 0
+        self.rejected = 0
+
+    def retry_after(self):
+        """Geschätzte Sekunden, bis die aktuelle Warteschlange abgearbeitet ist (mindestens 1)."""
+        with self._lock:
+            avg = self._avg_seconds or 1.0
+            return max(1, math.ceil(self._pending / self.workers * avg))
+
+    def _reserve(self, count):
+        with self._lock:
+            if self._pending + count > self.max_pending:
+                self.rejected += 1
+                rejected = True
+            else:
+                self._pending += count
+                rejected = False
+        if rejected:
+            raise PoolSaturated(self.retry_after())
+
+    def submit_many(self, fn, args_list):
+        """Nimmt alle Aufgaben an oder keine; gibt die Futures in Reihenfolge zurück."""
+        args_list = list(args_list)
+        self._reserve(len(args_list))
+        return [self._submit(fn, args) for args in args_list]
+
+    def imap(self, fn, args_list, window, timeout=None):
+        """Nimmt alle Aufgaben an oder keine (wie submit_many); gibt die Ergebnisse in Reihenfolge als OrderedResults zurück.
+
+        Dem Verbraucher laufen höchstens window Aufgaben voraus, sodass nie
+        mehr als window Ergebnisse auf einmal im Speicher liegen. Der Aufrufer
+        muss close() aufrufen (auch wenn er nie iteriert hat), damit nicht
+        verbrauchte Aufgaben ihren Platz in der Warteschlange freigeben.
+        """
+        args_list = list(args_list)
+        self._reserve(len(args_list))
+        return OrderedResults(self, fn, args_list, window, timeout)
+
+    def _release(self, count):
+        with self._lock:
+            self._pending -= count
+
+    def _submit(self, fn, args):
+        # fn läuft im Executor (ggf. in einem anderen Prozess) und meldet seine Laufzeit mit
+        outer = Future()
+
+        def done(inner):
+            try:
+                result, seconds = inner.result()
+            except BaseException as e:
+                self._done(None)
+                if not outer.cancelled():
+                    outer.set_exception(e)
+            else:
+                self._done(seconds)
+                if not outer.cancelled():
+                    outer.set_result(result)
+
+        inner = self.executor.submit(_timed, fn, args)
+        # Abbrechen des äußeren Futures nimmt noch nicht gestartete Aufgaben aus der Warteschlange
+        outer.add_done_callback(lambda f: f.cancelled() and inner.cancel())
+        inner.add_done_callback(done)
+        return outer
+
+    def submit(self, fn, *args):
+        future, = self.submit_many(fn, [args])
+        return future
+
+    def _done(self, seconds):
+        with self._lock:
+            self._pending -= 1
+            self.completed += 1
+            if seconds is not None:
+                # Gleitender Mittelwert der Laufzeit für Retry-After
+                self._avg_seconds = seconds if self._avg_seconds is None else 0.9 * self._avg_seconds + 0.1 * seconds
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "pending": self._pending,
+                "max_pending": self.max_pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_task_seconds": self._avg_seconds,
+            }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class OrderedResults:
+    """Ergebnisse von WorkerPool.imap in Reihenfolge; reicht erst beim Verbrauch neue Aufgaben ein.
+
+    close() verwirft die Aufgaben, die noch warten oder laufen, und gibt die
+    Plätze der nie eingereichten frei; laufende geben ihren Platz frei, sobald
+    sie fertig sind. Nach einem Fehler oder dem letzten Ergebnis wird close()
+    selbst aufgerufen.
+    """
+
+    def __init__(self, pool, fn, args_list, window, timeout):
+        self._pool = pool
+        self._fn = fn
+        self._waiting = deque(args_list)
+        self._running = deque()
+        self._window = window
+        self._timeout = timeout
+        self._closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._closed:
+            raise StopIteration
+        while self._waiting and len(self._running) < self._window:
+            self._running.append(self._pool._submit(self._fn, self._waiting.popleft()))
+        if not self._running:
+            self.close()
+            raise StopIteration
+        try:
+            return self._running.popleft().result(self._timeout)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        for future in self._running:
+            future.cancel()
+        self._running.clear()
+        self._pool._release(len(self._waiting))
+        self._waiting.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __del__(self):
+        self.close()
+
+
+# -----------------------
+# Fair geteilter Pool für alle Sitzungen
+# -----------------------
+#
+# Jede Sitzung (Nutzer) hat eine eigene Warteschlange. Frei werdende Worker
+# werden reihum an die Nutzer mit wartenden Aufgaben vergeben, und ein Nutzer
+# belegt höchstens max_per_user Worker gleichzeitig. Ein 30-Satz-Job wartet
+# so hinter dem 1-Satz-Auftrag einer anderen Lehrkraft, nicht umgekehrt.
+# Dem Executor werden nie mehr Aufgaben übergeben, als Worker frei sind;
+# die Reihenfolge bestimmt allein dieser Pool.
+
+
+class FairPool:
+    def __init__(self, executor, workers, max_per_user=None):
+        self.executor = executor
+        self.workers = workers
+        self.max_per_user = max_per_user or max(1, workers // 2)
+        self._lock = threading.Lock()
+        self._queues = {}  # Nutzer -> deque[(Future, fn, args)]
+        self._turns = deque()  # Nutzer mit wartenden Aufgaben, reihum
+        self._running = {}  # Nutzer -> Zahl laufender Aufgaben
+        self._busy = 0
+        self._avg_seconds = None
+        self.completed = 0
+
+    def submit(self, user, fn, *args):
+        """Reiht fn(*args) in die Warteschlange von user ein und gibt ein Future zurück.
+
+        Wartende Aufgaben lassen sich mit future.cancel() zurückziehen.
+        """
+        future = Future()
+        with self._lock:
+            if user not in self._queues:
+                self._queues[user] = deque()
+                self._turns.append(user)
+            self._queues[user].append((future, fn, args))
+            ready = self._take()
+        self._start(ready)
+        return future
+
+    def _take(self):
+        # Unter self._lock: wählt reihum die Aufgaben, die jetzt starten dürfen
+        ready = []
+        while self._busy < self.workers and self._turns:
+            for _ in range(len(self._turns)):
+                user = self._turns[0]
+                self._turns.rotate(-1)
+                if self._running.get(user, 0) < self.max_per_user:
+                    break
+            else:
+                break  # alle Nutzer mit wartenden Aufgaben haben ihr Kontingent ausgeschöpft
+            queue = self._queues[user]
+            future, fn, args = queue.popleft()
+            if not queue:
+                del self._queues[user]
+                self._turns.remove(user)
+            if not future.set_running_or_notify_cancel():
+                continue  # abgebrochen, während sie wartete
+            self._running[user] = self._running.get(user, 0) + 1
+            self._busy += 1
+            ready.append((user, future, fn, args))
+        return ready
+
+    def _start(self, ready):
+        for user, future, fn, args in ready:
+            try:
+                inner = self.executor.submit(_timed, fn, args)
+            except BaseException as e:
+                self._finish(user, future, None, e)
+            else:
+                inner.add_done_callback(lambda inner, user=user, future=future: self._collect(user, future, inner))
+
+    def _collect(self, user, future, inner):
+        try:
+            result, seconds = inner.result()
+        except BaseException as e:
+            self._finish(user, future, None, e)
+        else:
+            self._finish(user, future, seconds, None, result)
+
+    def _finish(self, user, future, seconds, error, result=None):
+        with self._lock:
+            self._busy -= 1
+            self._running[user] -= 1
+            if not self._running[user]:
+                del self._running[user]
+            self.completed += 1
+            if seconds is not None:
+                self._avg_seconds = seconds if self._avg_seconds is None else 0.9 * self._avg_seconds + 0.1 * seconds
+            ready = self._take()
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+        self._start(ready)
+
+    def load(self, user):
+        """(laufend, wartend) für die Aufgaben eines Nutzers."""
+        with self._lock:
+            return self._running.get(user, 0), len(self._queues.get(user, ()))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_per_user": self.max_per_user,
+                "running": self._busy,
+                "queued": sum(len(queue) for queue in self._queues.values()),
+                "users": len(self._running.keys() | self._queues.keys()),
+                "completed": self.completed,
+                "avg_task_seconds": self._avg_seconds,
+            }
+
+    def shutdown(self):
+        with self._lock:
+            waiting = [future for queue in self._queues.values() for future, _, _ in queue]
+            self._queues.clear()
+            self._turns.clear()
+        for future in waiting:
+            future.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+# -----------------------
+# Rechenintensives in Prozessen
+# -----------------------
+#
+# Die Skripte aller Sitzungen laufen als Threads eines Prozesses und teilen
+# sich den GIL. Das Schreiben der Word-Dokumente wird daher an einen
+# prozessweiten Prozess-Pool abgegeben. Übergeben werden Dateipfad und
+# Funktionsname, weil Streamlit die App als __main__ ausführt und ihre
+# Funktionen so nicht per pickle übertragbar sind.
+
+_default_processes = None
+_default_lock = threading.Lock()
+
+
+def default_processes():
+    """Prozessweiter Prozess-Pool (ein Prozess pro CPU-Kern), von allen Sitzungen geteilt."""
+    global _default_processes
+    with _default_lock:
+        if _default_processes is None:
+            # forkserver statt fork: der Streamlit-Server ist bereits mehrfädig
+            _default_processes = ProcessPoolExecutor(os.cpu_count(), mp_context=multiprocessing.get_context("forkserver"))
+        return _default_processes
+
+
+_foreground_calls = 0
+_foreground_lock = threading.Lock()
+
+
+def call_in_process(path, function_name, *args):
+    """Ruft function_name(*args) aus der Datei path (z. B. __file__ einer App) im Prozess-Pool auf und wartet."""
+    global _foreground_calls
+    with _foreground_lock:
+        _foreground_calls += 1
+    try:
+        return default_processes().submit(_call_module_function, path, function_name, args).result()
+    finally:
+        with _foreground_lock:
+            _foreground_calls -= 1
+
+
+def foreground_calls():
+    """Zahl laufender call_in_process-Aufrufe; 0 heißt, keine Sitzung wartet auf den Prozess-Pool."""
+    with _foreground_lock:
+        return _foreground_calls
+
+
+def load_module(path):
+    """Importiert die App-Datei path unter ihrem Dateinamen (auch in Worker-Prozessen)."""
+    directory, name = os.path.split(os.path.splitext(os.path.abspath(path))[0])
+    if directory not in sys.path:
+        sys.path.insert(0, directory)
+    return importlib.import_module(name)
+
+
+def _call_module_function(path, function_name, args):
+    return getattr(load_module(path), function_name)(*args)
+
+
+def _timed(fn, args):
+    start = time.perf_counter()
+    return fn(*args), time.perf_counter() - start
@@ -0,0 +1,64 @@
+import random
+import zipfile
+
+import docx_writer
+
+# -----------------------
+# Verzögerte Verarbeitungskette für prozedurale Sätze
+# -----------------------
+#
+#   allocate_slots     Generator je Aufgabenplatz (Mindestanzahl pro Kategorie, Rest zufällig, gemischt)
+#   draw_problems      nummerierte Aufgabentexte
+#   docx_writer.worksheet_blocks / combined_worksheet_blocks
+#                      XML-Absätze
+#   write_combined_document / write_archive
+#                      Dokument (über docx_writer.write_document) bzw. Archiv-Einträge direkt in einen Strom
+#
+# Jede Stufe ist ein Generator und zieht erst beim Verbrauch aus der vorigen.
+# Im Speicher liegt damit nur, was gerade geschrieben wird, nicht alle Sätze,
+# und der HTTP-Dienst kann den ersten Satz senden, während die übrigen noch
+# entstehen.
+
+
+def allocate_slots(generators, num_problems, min_per_category):
+    """Generator je Platz: jeder mindestens min_per_category-mal, der Rest zufällig, in zufälliger Reihenfolge.
+
+    Gleiche Verteilung wie eine aufgefüllte und gemischte Liste, aber es
+    werden nur die Restzahlen pro Kategorie gehalten.
+    """
+    counts = [min_per_category] * len(generators)
+    for _ in range(num_problems - sum(counts)):
+        counts[random.randrange(len(generators))] += 1
+    remaining = sum(counts)
+    while remaining:
+        point = random.randrange(remaining)
+        for i, count in enumerate(counts):
+            if point < count:
+                break
+            point -= count
+        counts[i] -= 1
+        remaining -= 1
+        yield generators[i]
+
+
+def draw_problems(slots):
+    """Nummerierte Aufgabentexte ("1. ...") zu den Plätzen."""
+    for i, generator in enumerate(slots, 1):
+        yield f"{i}. {generator()}"
+
+
+def write_archive(fileobj, members, compression=zipfile.ZIP_STORED):
+    """Schreibt (Name, Bytes) als ZIP-Einträge, jeden sobald er erzeugt ist; fileobj muss nicht seekbar sein."""
+    with zipfile.ZipFile(fileobj, "w", compression) as zf:
+        for name, data in members:
+            # Fester Zeitstempel wie in docx_writer: gleiche Sätze ergeben dasselbe Archiv
+            info = zipfile.ZipInfo(name, date_time=docx_writer.ZIP_DATE_TIME)
+            info.compress_type = compression
+            zf.writestr(info, data)
+            if hasattr(fileobj, "flush"):
+                fileobj.flush()
+
+
+def write_combined_document(fileobj, worksheets):
+    """Schreibt (Titel, Einleitung, Aufgaben) nacheinander als ein DOCX in fileobj."""
+    docx_writer.write_document(fileobj, docx_writer.combined_worksheet_blocks(worksheets))
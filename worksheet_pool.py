@@ -0,0 +1,161 @@
+import os
+import random
+import threading
+import time
+from collections import deque
+
+import problem_space
+import worker_pool
+from problem_space import seed_set
+
+# -----------------------
+# Vorrat fertig gerenderter Aufgabensätze
+# -----------------------
+#
+# Die prozeduralen Apps (v1/v2 Standard, v4/streamlit_app schwer) erzeugen
+# jeden Satz erst beim Klick. Stattdessen hält ein Hintergrund-Thread pro App
+# SIZE vorbereitete Läufe bereit: ein frischer Seed und die fertigen Dokumente
+# der Sätze 1..slots dazu. Alle Sätze einer Ausgabe teilen sich den Seed, damit
+# sie sich nicht überschneiden (siehe problem_space.issue_sampler); eine
+# Anfrage entnimmt deshalb einen ganzen Lauf und nutzt die ersten N Sätze.
+#
+# Fällt der Vorrat unter REFILL_BELOW Läufe, füllt der Thread wieder auf,
+# kleine Satznummern aller Läufe zuerst, aber nur im Leerlauf (keine Sitzung
+# wartet auf den Prozess-Pool). Fehlt einem Lauf ein Satz, rendert die App
+# ihn wie bisher aus dem Seed des Laufs.
+
+SIZE = int(os.environ.get("MATHEAUFGABEN_POOL_SIZE", 2))
+REFILL_BELOW = int(os.environ.get("MATHEAUFGABEN_POOL_REFILL_BELOW", 1))
+
+# Wartezeit des Füll-Threads, solange Sitzungen rendern
+IDLE_POLL_SECONDS = 0.2
+
+
+def new_seed():
+    return random.SystemRandom().randrange(2 ** 32)
+
+
+def generate_problems(path, seed, set_number):
+    """Aufgaben von Satz set_number der App path aus (Seed, Satznummer).
+
+    Setzt den globalen Zufallsgenerator und gehört daher in einen Worker-Prozess,
+    nicht in den Streamlit-Prozess, in dem mehrere Sitzungen gleichzeitig ziehen.
+    """
+    module = worker_pool.load_module(path)
+    seed_set(seed, set_number)
+    if not any(isinstance(generator, problem_space.ProblemGenerator) for generator in module.GENERATORS):
+        return module.create_single_problem_set(num_problems=50)
+    # Der Seed ist der Schlüssel der ganzen Ausgabe; jeder Satz zieht aus eigenen Blöcken
+    sampler = problem_space.issue_sampler(module.GENERATORS, seed, set_number, 50, module.MIN_PER_CATEGORY)
+    return module.create_single_problem_set(num_problems=50, generators=sampler.generators())
+
+
+def render_fresh(path, seed, set_number):
+    """Satz der App path aus (Seed, Satznummer) als DOCX-Bytes; läuft im Prozess-Pool."""
+    problems = generate_problems(path, seed, set_number)
+    return worker_pool.load_module(path).create_word_document(problems, set_number)
+
+
+class WorksheetPool:
+    """Vorbereitete Läufe einer App (Seed und Dokumente der Sätze 1..slots), von allen Sitzungen geteilt."""
+
+    def __init__(self, path, slots, size=SIZE, refill_below=REFILL_BELOW):
+        self.path = path
+        self.slots = slots
+        self.size = size
+        self.refill_below = refill_below
+        self.hits = 0
+        self.misses = 0
+        self._runs = deque()  # (Seed, {Satznummer: Bytes})
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._wake.set()  # beim Start vollständig füllen
+        threading.Thread(target=self._fill, name=f"pool-{os.path.basename(path)}", daemon=True).start()
+
+    def take(self):
+        """Entnimmt den ältesten Lauf als (Seed, {Satznummer: Bytes}); ohne Vorrat ein neuer Seed ohne Dokumente."""
+        with self._lock:
+            run = self._runs.popleft() if self._runs else (new_seed(), {})
+            if len(self._runs) < self.refill_below:
+                self._wake.set()
+        return run
+
+    def count(self, hit):
+        """Zählt einen Satz als Treffer (lag im Lauf bereit) oder Fehlschlag."""
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _next_slot(self):
+        # Kleinste fehlende Satznummer über alle Läufe zuerst; die meisten Anfragen sind klein
+        with self._lock:
+            while len(self._runs) < self.size:
+                self._runs.append((new_seed(), {}))
+            missing = [
+                (set_number, i) for i, (_, ready) in enumerate(self._runs)
+                for set_number in range(1, self.slots + 1) if set_number not in ready
+            ]
+            if not missing:
+                return None
+            set_number, i = min(missing)
+            return self._runs[i], set_number
+
+    def _fill(self):
+        while not self._closed:
+            self._wake.wait()
+            self._wake.clear()
+            while not self._closed:
+                slot = self._next_slot()
+                if slot is None:
+                    break
+                if worker_pool.foreground_calls():
+                    time.sleep(IDLE_POLL_SECONDS)
+                    continue
+                (seed, ready), set_number = slot
+                try:
+                    data = worker_pool.default_processes().submit(render_fresh, self.path, seed, set_number).result()
+                except Exception:
+                    # z. B. Prozess-Pool beendet; der nächste take() versucht es erneut
+                    break
+                # Auch wenn der Lauf inzwischen entnommen wurde: gleiche Bytes wie ein frisches Rendern
+                with self._lock:
+                    ready[set_number] = data
+
+    def stats(self):
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "ready": sum(len(ready) for _, ready in self._runs),
+                "capacity": self.slots * self.size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / requests if requests else None,
+            }
+
+    def summary(self):
+        """Kurzer Stand für die Seite, z. B. "58/60 Sätze bereit, Trefferquote 95 % (19 von 20)"."""
+        stats = self.stats()
+        text = f"{stats['ready']}/{stats['capacity']} Sätze bereit"
+        if stats["hit_rate"] is None:
+            return text
+        return f"{text}, Trefferquote {stats['hit_rate']:.0%} ({stats['hits']} von {stats['hits'] + stats['misses']})"
+
+    def close(self):
+        self._closed = True
+        self._wake.set()
+
+
+_default_pools = {}
+_default_lock = threading.Lock()
+
+
+def default_pool(path, slots):
+    """Prozessweiter Vorrat der App-Datei path (z. B. __file__); der erste Aufruf startet das Füllen."""
+    key = os.path.abspath(path)
+    with _default_lock:
+        if key not in _default_pools:
+            _default_pools[key] = WorksheetPool(key, slots)
+        return _default_pools[key]